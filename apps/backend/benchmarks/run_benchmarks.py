@@ -0,0 +1,230 @@
+"""Benchmark data loading and every /api/* endpoint on synthetic datasets.
+
+Every scale runs in a fresh interpreter so that peak memory is per dataset. It
+measures load_data() from CSV (empty parsed-table cache) and from the cache,
+the peak resident set size, and per endpoint the latency of the first request
+(which builds lazy payloads) and the percentiles of the following ones.
+Reports are JSON keyed by commit; pass --compare with an older report to print
+the ratio of every number.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scales small,medium --output bench.json
+    python benchmarks/run_benchmarks.py --scales small --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from generate_data import SCALES, generate_dataset  # noqa: E402
+
+DEFAULT_DATA_DIR = os.path.join(BENCHMARKS_DIR, 'data')
+
+# Endpoints that change server state; they are not benchmarked
+SKIPPED_ENDPOINTS = {
+    'POST /api/admin/reload': 'reloads the dataset',
+    'POST /api/scenarios/{scenario_id}/improve': 'adds a derived scenario and runs for its whole time budget',
+}
+
+def sample_requests(snapshot):
+    """Route path -> (url, query params, JSON body) of a representative request"""
+    stores_df, workers_df = snapshot.stores_df, snapshot.workers_df
+    store_id = str(stores_df['id'].iat[0])
+    worker_id = str(snapshot.active_workers_df['worker_id'].iat[0])
+    latitude = float(stores_df['latitude'].median())
+    longitude = float(stores_df['longitude'].median())
+
+    return {
+        '/api/coverage/chain-stores/{chain_name}': (f"/api/coverage/chain-stores/{snapshot.store_dimension.chains[0]}", {}, None),
+        '/api/coverage/agent-stores/{agent_name}': (f"/api/coverage/agent-stores/{workers_df['name'].iat[0]}", {}, None),
+        '/api/maps/stores/bbox': ('/api/maps/stores/bbox', {
+            'min_lat': latitude - 0.05, 'min_lon': longitude - 0.05, 'max_lat': latitude + 0.05, 'max_lon': longitude + 0.05
+        }, None),
+        '/api/maps/distance': ('/api/maps/distance', {'origin': f"HOME_{worker_id}", 'destination': store_id}, None),
+        '/api/maps/stores/clusters': ('/api/maps/stores/clusters', {'zoom': 10}, None),
+        '/api/maps/stores/nearby': ('/api/maps/stores/nearby', {'lat': latitude, 'lon': longitude, 'radius_km': 5}, None),
+        '/api/maps/stores/nearest': ('/api/maps/stores/nearest', {'lat': latitude, 'lon': longitude, 'k': 10}, None),
+        '/api/maps/agents/nearest': ('/api/maps/agents/nearest', {'store_id': store_id, 'k': 10}, None),
+        '/api/maps/routes/{process_type}': ('/api/maps/routes/optimized', {}, None),
+        '/api/maps/routes/{process_type}/paths': ('/api/maps/routes/optimized/paths', {'agent_id': worker_id}, None),
+        '/api/maps/routes/{process_type}/export': ('/api/maps/routes/optimized/export', {}, None),
+        '/api/what-if': ('/api/what-if', {}, {'edits': [
+            {'type': 'deactivate_agent', 'agent_id': worker_id},
+            {'type': 'set_store_visits', 'store_id': store_id, 'min_weekly_visits': 3, 'max_weekly_visits': 3}
+        ]}),
+    }
+
+def percentile_ms(samples, q):
+    """q-th percentile of latencies in seconds, in milliseconds"""
+    return round(float(np.percentile(samples, q)) * 1000, 3) if samples else None
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def benchmark_dataset(requests: int) -> dict:
+    """Benchmark the dataset in DATA_DIR; runs in its own interpreter"""
+    import main
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+
+    if main.DATA_CACHE_DIR:
+        shutil.rmtree(main.DATA_CACHE_DIR, ignore_errors=True)
+    started = time.perf_counter()
+    main.load_data()
+    load_csv_seconds = time.perf_counter() - started
+    load_peak_rss_mb = peak_rss_mb()
+
+    started = time.perf_counter()
+    main.load_data()
+    load_cached_seconds = time.perf_counter() - started
+
+    snapshot = main.get_snapshot()
+    samples = sample_requests(snapshot)
+
+    # No context manager: the startup event would load the data a third time
+    client = TestClient(main.app)
+    endpoints = {}
+    for route in main.app.routes:
+        if not isinstance(route, APIRoute) or not route.path.startswith('/api'):
+            continue
+        for method in sorted(route.methods):
+            name = f"{method} {route.path}"
+            if name in SKIPPED_ENDPOINTS:
+                continue
+            url, params, body = samples.get(route.path, (route.path, {}, None))
+
+            latencies = []
+            for _ in range(requests + 1):
+                started = time.perf_counter()
+                response = client.request(method, url, params=params, json=body)
+                latencies.append(time.perf_counter() - started)
+
+            endpoints[name] = {
+                'status': response.status_code,
+                'bytes': len(response.content),
+                'first_ms': round(latencies[0] * 1000, 3),
+                'p50_ms': percentile_ms(latencies[1:], 50),
+                'p95_ms': percentile_ms(latencies[1:], 95),
+                'p99_ms': percentile_ms(latencies[1:], 99),
+            }
+
+    return {
+        'stores': len(snapshot.stores_df),
+        'workers': len(snapshot.workers_df),
+        'visits': {scenario_id: len(visits) for scenario_id, visits in snapshot.scenarios.scenarios.items()},
+        'load_csv_seconds': round(load_csv_seconds, 3),
+        'load_cached_seconds': round(load_cached_seconds, 3),
+        'load_peak_rss_mb': load_peak_rss_mb,
+        'peak_rss_mb': peak_rss_mb(),
+        'endpoints': endpoints,
+    }
+
+def run_scale(scale: str, data_dir: str, requests: int) -> dict:
+    """Generate a scale's dataset if missing and benchmark it in a subprocess"""
+    scale_dir = os.path.join(data_dir, scale)
+    if not os.path.exists(os.path.join(scale_dir, 'result.csv')):
+        print(f"Generating {scale} dataset in {scale_dir}", file=sys.stderr)
+        generate_dataset(scale_dir, **SCALES[scale])
+
+    env = dict(os.environ, DATA_DIR=scale_dir, DATA_RELOAD_INTERVAL='0', PYTHONPATH=BACKEND_DIR)
+    env.pop('DATA_CACHE_DIR', None)
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', '--requests', str(requests)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, check=True
+    )
+    return json.loads(completed.stdout)
+
+def git_commit() -> str:
+    """Commit of the benchmarked tree, with a -dirty suffix for local changes"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def ratio(current, baseline) -> str:
+    """current / baseline as 'x1.23', '-' when either is missing"""
+    if not current or not baseline:
+        return '-'
+    return f"x{current / baseline:.2f}"
+
+def print_report(report: dict, baseline: dict = None):
+    """Print a report as text tables, with ratios to the baseline report if given"""
+    print(f"commit {report['commit']}  python {report['python']}  {report['platform']}")
+    if baseline:
+        print(f"compared with commit {baseline['commit']} (ratios current / baseline)")
+
+    for scale, result in report['scales'].items():
+        base = (baseline or {}).get('scales', {}).get(scale, {})
+        print(f"\n== {scale}: {result['stores']} stores, {result['workers']} workers, visits {result['visits']}")
+        for key in ('load_csv_seconds', 'load_cached_seconds', 'load_peak_rss_mb', 'peak_rss_mb'):
+            line = f"{key:<22}{result[key]:>12}"
+            if base:
+                line += f"  {ratio(result[key], base.get(key)):>8}"
+            print(line)
+
+        print(f"\n{'endpoint':<58}{'status':>7}{'bytes':>12}{'first ms':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, stats in result['endpoints'].items():
+            line = f"{name:<58}{stats['status']:>7}{stats['bytes']:>12}{stats['first_ms']:>11}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+            base_stats = base.get('endpoints', {}).get(name)
+            if base_stats:
+                line += f"  first {ratio(stats['first_ms'], base_stats['first_ms'])} p50 {ratio(stats['p50_ms'], base_stats['p50_ms'])}"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='small', help=f"comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='where generated datasets are kept between runs')
+    parser.add_argument('--requests', type=int, default=20, help='timed requests per endpoint after the first one')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='JSON report of an earlier run to compare with')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(benchmark_dataset(args.requests), sys.stdout)
+        return
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scales {unknown}")
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'requests': args.requests,
+        'scales': {scale: run_scale(scale, args.data_dir, args.requests) for scale in scales},
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,39 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Mapping, Tuple, Callable
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+import os
+import io
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
 import pandas as pd
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Match
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from pydantic_core import to_json
 import re
 from datetime import datetime, time
+from time import monotonic, perf_counter
 import logging
 
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): cache entries are not coordinated across processes
+    fcntl = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -136,6 +162,18 @@ class HourlyDistribution(BaseModel):
 class VisitTimeDistribution(BaseModel):
     hourly_distribution: List[HourlyDistribution]
 
+class TimeHistogramBin(BaseModel):
+    start: str
+    visits: int
+    average_on_site: float
+    peak_on_site: int
+
+class VisitTimeHistogram(BaseModel):
+    scenario: str
+    bin_minutes: int
+    visits: int
+    bins: List[TimeHistogramBin]
+
 class StoreLocation(BaseModel):
     store_id: str
     name: str
@@ -149,6 +187,35 @@ class StoreLocation(BaseModel):
 class StoresData(BaseModel):
     stores: List[StoreLocation]
 
+class NearbyStore(StoreLocation):
+    distance_km: float
+
+class NearbyStoresData(BaseModel):
+    stores: List[NearbyStore]
+
+class ChainCount(BaseModel):
+    chain: str
+    count: int
+
+class StoreCluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    sales: int
+    total_min_weekly_visits: int
+    total_max_weekly_visits: int
+    chains: List[ChainCount]
+    store_id: Optional[str] = None
+
+class LocationDistance(BaseModel):
+    origin: str
+    destination: str
+    distance_km: Optional[float]
+
+class StoreClustersData(BaseModel):
+    zoom: int
+    clusters: List[StoreCluster]
+
 class AgentLocation(BaseModel):
     agent_id: str
     name: str
@@ -159,6 +226,16 @@ class AgentLocation(BaseModel):
 class AgentsData(BaseModel):
     agents: List[AgentLocation]
 
+class NearbyAgent(BaseModel):
+    agent_id: str
+    name: str
+    home_latitude: float
+    home_longitude: float
+    distance_km: float
+
+class NearbyAgentsData(BaseModel):
+    agents: List[NearbyAgent]
+
 class RouteVisit(BaseModel):
     store_id: str
     arrival_time: str
@@ -174,6 +251,20 @@ class Route(BaseModel):
 class RoutesData(BaseModel):
     routes: List[Route]
 
+class RouteLeg(BaseModel):
+    store_id: str
+    distance_km: Optional[float]
+
+class RoutePath(BaseModel):
+    agent_id: str
+    day: str
+    encoded_path: str
+    distance_km: float
+    legs: List[RouteLeg]
+
+class RoutePathsData(BaseModel):
+    routes: List[RoutePath]
+
 class AllStoreData(BaseModel):
     store_id: str
     name: str
@@ -199,232 +290,2097 @@ class TimeDistribution(BaseModel):
 class AgentTimeDistribution(BaseModel):
     distribution: List[TimeDistribution]
 
-# Global data storage
-stores_df = None
-workers_df = None
-manual_df = None
-result_df = None
+class DashboardPage(BaseModel):
+    kpis: KPIMetrics
+    efficiency_comparison: EfficiencyComparison
+    store_chain_distribution: StoreChainDistribution
+    agent_time_distribution: AgentTimeDistribution
 
-def load_data():
-    """Load and preprocess all CSV data files"""
-    global stores_df, workers_df, manual_df, result_df
-    
+class BeforeAfterPage(BaseModel):
+    kpis: KPIMetrics
+    metrics: MetricsComparison
+    agent_performance: AgentPerformanceComparison
+    store_performance: StorePerformanceComparison
+    weekly_distribution: WeeklyDistributionData
+
+class CoveragePage(BaseModel):
+    agent_performance: AgentCoverageData
+    store_chain_analysis: StoreChainAnalysis
+    visit_time_distribution: VisitTimeDistribution
+    all_stores: AllStoresData
+
+class ScenarioInfo(BaseModel):
+    scenario_id: str
+    visits: int
+    agents: int
+    builtin: bool
+
+class ScenariosData(BaseModel):
+    scenarios: List[ScenarioInfo]
+
+class RouteValidationSummary(BaseModel):
+    agent_id: str
+    day: str
+    visits: int
+    violating_visits: int
+    violations: Dict[str, int]
+
+class ValidationSummary(BaseModel):
+    scenario: str
+    visits: int
+    violating_visits: int
+    violations: Dict[str, int]
+    routes: List[RouteValidationSummary]
+
+class VisitViolation(BaseModel):
+    agent_id: str
+    day: str
+    store_id: str
+    arrival_time: str
+    departure_time: str
+    violations: List[str]
+
+class VisitViolationsData(BaseModel):
+    visits: List[VisitViolation]
+
+class WhatIfEdit(BaseModel):
+    type: str
+    agent_id: Optional[str] = None
+    reassign: bool = True
+    from_agent: Optional[str] = None
+    to_agent: Optional[str] = None
+    day: Optional[str] = None
+    store_id: Optional[str] = None
+    min_weekly_visits: Optional[int] = None
+    max_weekly_visits: Optional[int] = None
+
+class WhatIfRequest(BaseModel):
+    edits: List[WhatIfEdit]
+
+class WhatIfAgentChange(BaseModel):
+    agent_id: str
+    active: bool
+    visits_before: int
+    visits_after: int
+
+class WhatIfStoreChange(BaseModel):
+    store_id: str
+    min_weekly_visits: int
+    max_weekly_visits: int
+    visits_before: int
+    visits_after: int
+
+class WhatIfDayChange(BaseModel):
+    day: str
+    visits_before: int
+    visits_after: int
+
+class WhatIfResult(BaseModel):
+    kpis: KPIMetrics
+    metrics: List[ComparisonMetric]
+    agents: List[WhatIfAgentChange]
+    stores: List[WhatIfStoreChange]
+    days: List[WhatIfDayChange]
+    unassigned_visits: int
+    elapsed_ms: float
+
+class RouteImprovementRequest(BaseModel):
+    time_budget_seconds: float = 2.0
+    exclude_agents: List[str] = []
+    exclude_stores: List[str] = []
+
+class UnassignedVisit(BaseModel):
+    agent_id: str
+    day: str
+    store_id: str
+    reason: str
+
+class RouteImprovementResult(BaseModel):
+    scenario_id: str
+    base_scenario: str
+    travel_minutes_before: int
+    travel_minutes_after: int
+    late_minutes_before: int
+    late_minutes_after: int
+    changed_routes: int
+    moves: Dict[str, int]
+    unassigned_visits: List[UnassignedVisit]
+    elapsed_seconds: float
+
+class DataVersion(BaseModel):
+    version: int
+    source_hash: str
+    loaded_at: datetime
+
+class ReloadStatus(DataVersion):
+    reloaded: bool
+
+# Data directory holding the routing CSV files
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+DATA_FILES = {
+    'stores': 'stores.csv',
+    'workers': 'workers.csv',
+    'manual': 'manual_optimization.csv',
+    'result': 'result.csv'
+}
+
+# Additional optimizer results, one scenario per CSV named <scenario_id>.csv
+SCENARIOS_SUBDIR = 'scenarios'
+
+# Built-in scenarios backed by manual_optimization.csv and result.csv
+BUILTIN_SCENARIOS = {
+    'manual': 'manual',
+    'optimized': 'result'
+}
+
+# Scenarios compared when an endpoint is called without scenario parameters
+DEFAULT_BEFORE_SCENARIO = 'manual'
+DEFAULT_AFTER_SCENARIO = 'optimized'
+
+# /api/all-stores fields, sort keys (prefix '-' for descending) and coverage filters
+STORE_TABLE_FIELDS = list(AllStoreData.model_fields)
+STORE_SORT_KEYS = ('name', 'sales', 'weekly_visits')
+STORE_COVERAGE_FILTERS = ('visited', 'unvisited', 'sufficient', 'insufficient')
+
+# Visit time histograms cover one day in bins that divide it evenly
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_HISTOGRAM_BIN_MINUTES = 15
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+
+# Average number of points per cell of the spatial grid indexes
+GRID_POINTS_PER_CELL = 8
+
+# Store marker clustering: zoom levels 0..MAX_CLUSTER_ZOOM, cells of CLUSTER_CELL_PX
+# web mercator pixels (256 px tiles)
+MAX_CLUSTER_ZOOM = 16
+CLUSTER_CELL_PX = 64
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+# Route improvement: wall-clock budget cap in seconds, penalty per late minute (in
+# travel minutes) and nearest agents considered when relocating a visit
+ROUTE_IMPROVEMENT_MAX_SECONDS = float(os.getenv('ROUTE_IMPROVEMENT_MAX_SECONDS', '30'))
+ROUTE_LATE_MINUTE_PENALTY = 1000
+ROUTE_RELOCATE_CANDIDATE_AGENTS = 8
+
+# Route validation codes; code i is bit 1 << i of RouteValidation.codes
+VISIT_VIOLATION_CODES = [
+    'unknown_store',        # store_id_destination missing from stores.csv
+    'unknown_agent',        # worker_id missing from workers.csv
+    'invalid_time',         # unparsable arrival/departure time or missing service_min/trip_time
+    'before_store_open',    # arrival before <day>_open
+    'after_store_close',    # departure after <day>_close
+    'before_shift_start',   # left home (arrival - trip_time) before <day>_shift_start
+    'after_shift_end',      # departure after <day>_shift_end
+    'service_duration',     # weekly service_min of the store outside min/max_service_duration
+    'visit_duration',       # departure - arrival outside min/max_visit_duration
+    'duration_mismatch',    # departure - arrival differs from service_min
+    'chain'                 # arrival earlier than the previous departure (or shift start) + trip_time
+]
+
+# Derived scenarios (e.g. improved routes) kept per dataset version, oldest dropped first
+MAX_DERIVED_SCENARIOS = int(os.getenv('MAX_DERIVED_SCENARIOS', '16'))
+
+# Routes encoded per chunk of a streamed route export
+ROUTE_EXPORT_CHUNK_ROUTES = 200
+
+# Number of before/after scenario comparisons kept per dataset version
+SCENARIO_COMPARISON_CACHE_ENTRIES = int(os.getenv('SCENARIO_COMPARISON_CACHE_ENTRIES', '32'))
+
+# Directory for the columnar cache of parsed tables (empty string disables it)
+DATA_CACHE_DIR = os.getenv('DATA_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+
+# Bump when the cached layout or the table parsing changes
+CACHE_FORMAT_VERSION = 2
+
+# Largest number of points (stores plus worker homes) for the precomputed distance
+# matrix; larger datasets compute distances on demand. The matrix takes 4 bytes per
+# pair, 64 MiB at the default, which fits next to the dataset in a 512Mi container
+DISTANCE_MATRIX_MAX_POINTS = int(os.getenv('DISTANCE_MATRIX_MAX_POINTS', '4096'))
+
+# Matrix cells computed per chunk while building the distance matrix
+DISTANCE_MATRIX_CHUNK_CELLS = 1 << 22
+
+# Seconds between checks of the data files for changes (0 disables the watcher)
+DATA_RELOAD_INTERVAL = float(os.getenv('DATA_RELOAD_INTERVAL', '30'))
+
+# Token required by the admin endpoints; without one they are disabled
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+# Cache-Control sent with /api responses; clients may store them but must revalidate
+API_CACHE_CONTROL = os.getenv('API_CACHE_CONTROL', 'no-cache')
+
+# Number of encoded response bodies kept in memory
+RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '256'))
+
+# Mixed into every ETag so a new deployment never matches bodies cached by an old one
+# (K_REVISION is set by Cloud Run for each revision)
+ETAG_SALT = os.getenv('K_REVISION', app.version)
+
+# Compute pool for blocking analytics work: worker threads, concurrent requests per
+# endpoint and seconds before a request gives up (503 while queued, 504 while running)
+COMPUTE_WORKERS = int(os.getenv('COMPUTE_WORKERS', '4'))
+COMPUTE_ENDPOINT_CONCURRENCY = int(os.getenv('COMPUTE_ENDPOINT_CONCURRENCY', '2'))
+COMPUTE_TIMEOUT_SECONDS = float(os.getenv('COMPUTE_TIMEOUT_SECONDS', '30'))
+
+# Histogram buckets of the /metrics endpoint: request and span durations in seconds,
+# response sizes in bytes
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# Requests slower than this many seconds log their timing spans (0 disables it)
+SLOW_REQUEST_PROFILE_SECONDS = float(os.getenv('SLOW_REQUEST_PROFILE_SECONDS', '0'))
+
+# Effective working minutes per agent per week (see agent_utilization)
+EFFECTIVE_MINUTES_PER_AGENT_PER_WEEK = (5 * 9 * 60) + (1 * 4.5 * 60)  # 2970 minutes
+
+DAYS_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Map day names if they're different
+DAY_NAME_MAPPING = {
+    'mon': 'Monday', 'tue': 'Tuesday', 'wed': 'Wednesday', 'thu': 'Thursday',
+    'fri': 'Friday', 'sat': 'Saturday', 'sun': 'Sunday',
+    'monday': 'Monday', 'tuesday': 'Tuesday', 'wednesday': 'Wednesday',
+    'thursday': 'Thursday', 'friday': 'Friday', 'saturday': 'Saturday', 'sunday': 'Sunday',
+    'lunes': 'Monday', 'martes': 'Tuesday', 'miércoles': 'Wednesday', 'miercoles': 'Wednesday',
+    'jueves': 'Thursday', 'viernes': 'Friday', 'sábado': 'Saturday', 'sabado': 'Saturday', 'domingo': 'Sunday'
+}
+
+# Metrics
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Count one observation"""
+        self.counts[next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))] += 1
+        self.sum += value
+
+class MetricsRegistry:
+    """Counters, gauges and histograms keyed by metric name and label values.
+
+    Every metric family is declared once with its type, help text and label names;
+    render() writes all families in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.families = {}
+
+    def declare(self, name: str, kind: str, help_text: str, label_names, buckets=None):
+        """Declare a metric family; kind is 'counter', 'gauge' or 'histogram'"""
+        self.families[name] = {'kind': kind, 'help': help_text, 'labels': tuple(label_names), 'buckets': buckets, 'values': {}}
+
+    def add(self, name: str, labels, amount: float = 1):
+        """Add to a counter or gauge"""
+        family = self.families[name]
+        with self.lock:
+            family['values'][labels] = family['values'].get(labels, 0) + amount
+
+    def set(self, name: str, labels, value: float):
+        """Set a gauge"""
+        with self.lock:
+            self.families[name]['values'][labels] = value
+
+    def observe(self, name: str, labels, value: float):
+        """Add an observation to a histogram"""
+        family = self.families[name]
+        with self.lock:
+            histogram = family['values'].get(labels)
+            if histogram is None:
+                histogram = family['values'][labels] = Histogram(family['buckets'])
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """All metric families in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, family in self.families.items():
+                lines.append(f"# HELP {name} {family['help']}")
+                lines.append(f"# TYPE {name} {family['kind']}")
+                for labels, value in family['values'].items():
+                    label_pairs = list(zip(family['labels'], labels))
+                    if family['kind'] != 'histogram':
+                        lines.append(f"{name}{format_labels(label_pairs)} {value:g}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(value.buckets) + ['+Inf'], value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{format_labels(label_pairs + [('le', format_bound(bound))])} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(label_pairs)} {value.sum:g}")
+                    lines.append(f"{name}_count{format_labels(label_pairs)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+def format_labels(label_pairs) -> str:
+    """Prometheus label set, empty for no labels"""
+    if not label_pairs:
+        return ''
+    escaped = (
+        name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in label_pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+def format_bound(bound) -> str:
+    """Histogram bucket bound as a Prometheus 'le' label value"""
+    return bound if isinstance(bound, str) else str(float(bound))
+
+metrics = MetricsRegistry()
+metrics.declare('http_requests_total', 'counter', 'HTTP requests by route and status.', ('method', 'route', 'status'))
+metrics.declare('http_request_duration_seconds', 'histogram', 'HTTP request latency until the last body byte.', ('method', 'route'), METRICS_LATENCY_BUCKETS)
+metrics.declare('http_response_size_bytes', 'histogram', 'HTTP response body size.', ('method', 'route'), METRICS_SIZE_BUCKETS)
+metrics.declare('http_requests_in_flight', 'gauge', 'HTTP requests being served.', ('method', 'route'))
+metrics.declare('span_duration_seconds', 'histogram', 'Duration of named timing spans in data loading and analytics helpers.', ('span',), METRICS_LATENCY_BUCKETS)
+metrics.declare('data_snapshot_version', 'gauge', 'Version of the dataset being served.', ())
+metrics.declare('response_cache_entries', 'gauge', 'Encoded response bodies in the response cache.', ())
+metrics.declare('compute_tasks_running', 'gauge', 'Compute pool tasks running or queued for a worker thread.', ('endpoint',))
+metrics.declare('compute_rejected_total', 'counter', 'Requests rejected by the compute pool (busy: no slot in time, timeout: work ran too long).', ('endpoint', 'reason'))
+
+# Spans finished during the current request, collected only for slow-request profiles
+request_spans: ContextVar[Optional[list]] = ContextVar('request_spans', default=None)
+span_depth: ContextVar[int] = ContextVar('span_depth', default=0)
+
+@contextmanager
+def span(name: str):
+    """Time a block (or, as a decorator, a function) into span_duration_seconds{span=name}"""
+    depth = span_depth.get()
+    token = span_depth.set(depth + 1)
+    started = perf_counter()
     try:
-        # Load stores data
-        stores_df = pd.read_csv('data/stores.csv')
-        
-        # Clean sales data - remove $ and commas, convert to int
-        stores_df['sales'] = stores_df['sales'].str.replace('$', '').str.replace(',', '').astype(int)
+        yield
+    finally:
+        elapsed = perf_counter() - started
+        span_depth.reset(token)
+        metrics.observe('span_duration_seconds', (name,), elapsed)
+        spans = request_spans.get()
+        if spans is not None:
+            spans.append((started, depth, name, elapsed))
+
+def format_request_spans(spans) -> str:
+    """Indented span tree of one request in start order, durations in ms"""
+    return '\n'.join(
+        f"{'  ' * depth}{name} {elapsed * 1000:.1f} ms"
+        for _, depth, name, elapsed in sorted(spans, key=lambda item: (item[0], item[1]))
+    )
+
+@dataclass(frozen=True)
+class GridIndex:
+    """Uniform latitude/longitude grid index over a set of points.
+
+    Points are sorted by cell (row-major) and cell_offsets[c]:cell_offsets[c + 1]
+    are the points of cell c, so the cells of one grid row within a bounding box
+    form a single contiguous slice. ids are the point row positions in the source
+    frame; points without coordinates are not indexed.
+    """
+    ids: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    cell_offsets: np.ndarray
+    min_lat: float
+    min_lon: float
+    cell_deg: float
+    n_rows: int
+    n_cols: int
+
+@dataclass(frozen=True)
+class DistanceMatrix:
+    """Great-circle distances in km (float32) between all stores and worker homes.
+
+    Point i < n_stores is store code i and point n_stores + w is the home of
+    workers_df row w. Distances from or to points without coordinates are NaN. The
+    matrix is memory-mapped from the cache directory when the cache is enabled.
+    """
+    coordinate_hash: str
+    n_stores: int
+    distances: np.ndarray
+
+@dataclass(frozen=True)
+class ClusterLevel:
+    """Store clusters of one zoom level.
+
+    Clusters are web mercator grid cells holding at least one store, sorted by
+    key = cell_y * width + cell_x, so the cells of one grid row within a viewport
+    are a contiguous key range. The chain mix of cluster c is
+    chain_codes[chain_offsets[c]:chain_offsets[c + 1]] with matching chain_counts.
+    store_codes is the lowest store code of every cluster.
+    """
+    zoom: int
+    width: int
+    keys: np.ndarray
+    counts: np.ndarray
+    sales: np.ndarray
+    latitude_sums: np.ndarray
+    longitude_sums: np.ndarray
+    total_min_weekly_visits: np.ndarray
+    total_max_weekly_visits: np.ndarray
+    store_codes: np.ndarray
+    chain_offsets: np.ndarray
+    chain_codes: np.ndarray
+    chain_counts: np.ndarray
+
+@dataclass(frozen=True)
+class StoreDimension:
+    """Store dimension table built once per dataset.
+
+    Stores are addressed by integer codes equal to their row position in stores_df,
+    chains by integer codes in first-appearance order, and chain_postings lists the
+    store codes of every chain so chain level lookups become joins or bincounts.
+    """
+    store_ids: pd.Index
+    store_rows: np.ndarray
+    chain_codes: np.ndarray
+    chains: np.ndarray
+    chain_postings: Mapping[str, np.ndarray]
+
+    def encode_store_ids(self, store_ids) -> np.ndarray:
+        """Map store ids to store codes, -1 for ids missing from stores.csv"""
+        positions = self.store_ids.get_indexer(store_ids)
+        return np.where(positions >= 0, self.store_rows[positions], -1)
+
+@dataclass(frozen=True)
+class WorkerDimension:
+    """Worker dimension table built once per dataset.
+
+    Agents are addressed by their row in workers_df, n_workers rows in all; a worker
+    id listed on several rows is addressed by its first row, as in a mapping by
+    worker_id.
+    """
+    worker_ids: pd.Index
+    worker_rows: np.ndarray
+    n_workers: int
+
+    def encode_worker_ids(self, worker_ids) -> np.ndarray:
+        """Map worker ids to workers.csv rows, -1 for ids missing from workers.csv"""
+        positions = self.worker_ids.get_indexer(worker_ids)
+        return np.where(positions >= 0, self.worker_rows[positions], -1)
+
+@dataclass(frozen=True)
+class VisitTable:
+    """Visits of one scenario as integer-coded columns, sorted by route.
+
+    Ids and labels are dictionary encoded: agent_codes index agent_ids, day_codes
+    index day_labels and origin/destination_codes index locations (store ids and
+    HOME_<worker_id>), with -1 for missing values. The dictionaries carry what the
+    analytics need per distinct value: the workers.csv row of every agent, the
+    DAYS_ORDER position of every day label and the store code of every location.
+    Clock times are minutes since midnight and durations whole minutes, -1 when
+    missing or outside the int16 range.
+
+    Rows [0, routed) are ordered like the routes of the RouteIndex, keeping file
+    order within a route; the rows after them lack an agent or a day.
+
+    Bytes per visit: agent 4 + day 1 + origin 4 + destination 4 + arrival 2 +
+    departure 2 + service 2 + trip 2 = 21, where the routing file as a DataFrame of
+    strings takes several hundred. Dictionaries grow with distinct values only.
+    """
+    agent_ids: np.ndarray
+    agent_names: np.ndarray
+    agent_rows: np.ndarray
+    day_labels: np.ndarray
+    day_positions: np.ndarray
+    locations: np.ndarray
+    location_names: np.ndarray
+    location_sales: np.ndarray
+    location_store_codes: np.ndarray
+    agent_codes: np.ndarray
+    day_codes: np.ndarray
+    origin_codes: np.ndarray
+    destination_codes: np.ndarray
+    arrival_minutes: np.ndarray
+    departure_minutes: np.ndarray
+    service_min: np.ndarray
+    trip_time: np.ndarray
+    routed: int
+
+    def __len__(self) -> int:
+        return len(self.agent_codes)
+
+    def agents(self, rows=slice(None)) -> np.ndarray:
+        """workers.csv row of the visits' agents, -1 when unknown"""
+        return decode_codes(self.agent_rows, self.agent_codes[rows], -1)
+
+    def days(self, rows=slice(None)) -> np.ndarray:
+        """DAYS_ORDER position of the visits' days, -1 when unknown"""
+        return decode_codes(self.day_positions, self.day_codes[rows], -1)
+
+    def store_codes(self, rows=slice(None)) -> np.ndarray:
+        """Store code of the visited stores, -1 for ids missing from stores.csv"""
+        return decode_codes(self.location_store_codes, self.destination_codes[rows], -1)
+
+    def store_ids(self, rows=slice(None)) -> np.ndarray:
+        """Visited store ids, None when missing"""
+        return decode_codes(self.locations, self.destination_codes[rows], None)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Every dictionary and column as a named array, routed as a 1-element array"""
+        arrays = array_fields(self)
+        arrays['routed'] = np.array([self.routed])
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> 'VisitTable':
+        """Visit table from to_arrays() output, using the arrays without copying"""
+        return cls(**{**arrays, 'routed': int(arrays['routed'][0])})
+
+    def to_frame(self) -> pd.DataFrame:
+        """The visits as a routing file frame with the result.csv columns, in table order"""
+        def minutes(values):
+            return pd.arrays.IntegerArray(values.astype(np.int64), values < 0)
         
-        # Parse location coordinates
-        stores_df[['latitude', 'longitude']] = stores_df['location'].str.split(',', expand=True).astype(float)
+        return pd.DataFrame({
+            'worker_id': decode_codes(self.agent_ids, self.agent_codes, None),
+            'name': decode_codes(self.agent_names, self.agent_codes, None),
+            'day': decode_codes(self.day_labels, self.day_codes, None),
+            'store_id_origin': decode_codes(self.locations, self.origin_codes, None),
+            'store_id_destination': self.store_ids(),
+            'store_destination_name': decode_codes(self.location_names, self.destination_codes, None),
+            'sales': decode_codes(self.location_sales, self.destination_codes, np.nan),
+            'arrival_time': format_clock_column(self.arrival_minutes),
+            'departure_time': format_clock_column(self.departure_minutes),
+            'service_min': minutes(self.service_min),
+            'trip_time': minutes(self.trip_time),
+        })
+
+@dataclass(frozen=True)
+class RouteIndex:
+    """Route boundaries over a scenario's VisitTable.
+
+    Routes are ordered by agent (first appearance) and then by day (first appearance
+    within the agent). Route r covers the visit rows offsets[r]:offsets[r + 1], the
+    routes of agent code a are agent_offsets[a]:agent_offsets[a + 1] and the routes
+    of DAYS_ORDER position d are day_routes[day_offsets[d]:day_offsets[d + 1]], so
+    any page of routes is an O(page) slice. route_day_codes index the day labels of
+    the visit table and route_day_positions are their DAYS_ORDER position, -1 for
+    unknown days. agent_ids and agent_codes are the agent dictionary of the visit
+    table and its reverse.
+    """
+    agent_ids: np.ndarray
+    agent_codes: Mapping[str, int]
+    agent_offsets: np.ndarray
+    route_agents: np.ndarray
+    route_day_codes: np.ndarray
+    route_day_positions: np.ndarray
+    day_offsets: np.ndarray
+    day_routes: np.ndarray
+    offsets: np.ndarray
+    visits: VisitTable
+
+    def route_day(self, route: int):
+        """Day label of a route as written in the routing file"""
+        return self.visits.day_labels[self.route_day_codes[route]]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The route arrays by name, without the visit table and its agent dictionary"""
+        return {name: values for name, values in array_fields(self).items() if name not in ('agent_ids', 'agent_codes', 'visits')}
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray], visits: VisitTable) -> 'RouteIndex':
+        """Route index over visits from to_arrays() output, using the arrays without copying"""
+        return cls(agent_ids=visits.agent_ids, agent_codes=agent_code_lookup(visits.agent_ids), visits=visits, **arrays)
+
+@dataclass(frozen=True)
+class RouteGeometry:
+    """Encoded polylines and leg distances of a scenario's routes, aligned with its RouteIndex.
+
+    Route r is the agent's home followed by its stores in visit order, encoded as
+    polylines[polyline_offsets[r]:polyline_offsets[r + 1]] (Google encoded polyline,
+    ASCII bytes). leg_distances[v] is the great-circle distance in km to visit v from
+    the previous point of its route, NaN when a point has no coordinates.
+    """
+    polylines: np.ndarray
+    polyline_offsets: np.ndarray
+    leg_distances: np.ndarray
+    route_distances: np.ndarray
+
+@dataclass(frozen=True)
+class RouteValidation:
+    """Feasibility checks of a scenario's visits, aligned with its RouteIndex.
+
+    codes[v] holds one bit per VISIT_VIOLATION_CODES entry for visit v; arrival and
+    departure times are integer minutes since midnight (-1 when unparsable).
+    code_counts[r, i] counts the visits of route r violating code i.
+    """
+    codes: np.ndarray
+    arrival_minutes: np.ndarray
+    departure_minutes: np.ndarray
+    violating_visits: np.ndarray
+    code_counts: np.ndarray
+
+class VisitAggregates:
+    """Dense visit counters of one scenario.
+
+    Agents are addressed by their first row in workers.csv, stores by store code,
+    chains by chain code, days by their position in DAYS_ORDER and hours by the hour
+    of arrival. A visit with an unknown agent, store, day or arrival time is left out
+    of the counters keyed by it only. The counters are built in one pass over a
+    scenario's visits when its payloads are built and never changed afterwards, as
+    they may be mapped from the shared data cache: a reloaded or derived scenario gets
+    new counters. Changes to a scenario are counted by a VisitAggregatesDelta.
+    """
+
+    COUNTERS = (
+        'agent_visits', 'agent_day_visits', 'agent_service_min', 'agent_trip_time', 'store_visits',
+        'store_day_visits', 'chain_visits', 'chain_day_visits', 'day_visits', 'hour_visits'
+    )
+
+    def __init__(self, store_dimension: StoreDimension, worker_dimension: WorkerDimension):
+        self.store_dimension = store_dimension
+        self.worker_dimension = worker_dimension
         
-        # Load workers data
-        workers_df = pd.read_csv('data/workers.csv')
+        n_agents, n_stores, n_chains, n_days = worker_dimension.n_workers, len(store_dimension.chain_codes), len(store_dimension.chains), len(DAYS_ORDER)
+        self.visits = 0
+        self.service_min = 0.0
+        self.trip_time = 0.0
+        self.agent_visits = np.zeros(n_agents, dtype=np.int64)
+        self.agent_day_visits = np.zeros((n_agents, n_days), dtype=np.int64)
+        self.agent_service_min = np.zeros(n_agents)
+        self.agent_trip_time = np.zeros(n_agents)
+        self.store_visits = np.zeros(n_stores, dtype=np.int64)
+        self.store_day_visits = np.zeros((n_stores, n_days), dtype=np.int64)
+        self.chain_visits = np.zeros(n_chains, dtype=np.int64)
+        self.chain_day_visits = np.zeros((n_chains, n_days), dtype=np.int64)
+        self.day_visits = np.zeros(n_days, dtype=np.int64)
+        self.hour_visits = np.zeros(24, dtype=np.int64)
+        self.unknown_store_visits = {}
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Every counter as a named array, totals as 0-d arrays"""
+        arrays = {name: getattr(self, name) for name in self.COUNTERS}
+        arrays['totals'] = np.array([self.visits, self.service_min, self.trip_time])
+        arrays['unknown_store_ids'] = np.array(list(self.unknown_store_visits), dtype=str)
+        arrays['unknown_store_counts'] = np.array(list(self.unknown_store_visits.values()), dtype=np.int64)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, store_dimension: StoreDimension, worker_dimension: WorkerDimension, arrays: Mapping[str, np.ndarray]) -> 'VisitAggregates':
+        """Counters from to_arrays() output, using the arrays without copying"""
+        aggregates = cls(store_dimension, worker_dimension)
+        for name in cls.COUNTERS:
+            setattr(aggregates, name, arrays[name])
+        visits, service_min, trip_time = arrays['totals'].tolist()
+        aggregates.visits, aggregates.service_min, aggregates.trip_time = int(visits), service_min, trip_time
+        aggregates.unknown_store_visits = dict(zip(arrays['unknown_store_ids'].tolist(), arrays['unknown_store_counts'].tolist()))
+        return aggregates
+
+    def encode_agent_ids(self, agent_ids) -> np.ndarray:
+        """Map worker ids to agent codes, -1 for ids missing from workers.csv"""
+        return self.worker_dimension.encode_worker_ids(agent_ids)
+
+    def insert(self, visits: 'VisitTable', rows=slice(None)):
+        """Count visit rows in"""
+        self.update(visits, 1, rows)
+
+    def visit_keys(self, visits: 'VisitTable', rows=slice(None)):
+        """Where visit rows are counted.
+
+        Returns the (weights, keys) of every counter, keys being one array per counter
+        dimension with -1 where unknown, the service and trip minutes of the rows and
+        the ids of the visited stores missing from stores.csv.
+        """
+        agents = visits.agents(rows)
+        stores = visits.store_codes(rows)
+        chains = np.where(stores >= 0, self.store_dimension.chain_codes[stores], -1)
+        days = visits.days(rows)
+        arrival = visits.arrival_minutes[rows]
+        hours = np.where(arrival >= 0, arrival // 60, -1).astype(np.int64)
+        hours[hours >= len(self.hour_visits)] = -1
+        service_min = np.maximum(visits.service_min[rows], 0).astype(float)
+        trip_time = np.maximum(visits.trip_time[rows], 0).astype(float)
         
-        # Ensure 'activos' column is loaded as integer
-        if 'activos' in workers_df.columns:
-            workers_df['activos'] = workers_df['activos'].astype(int)
+        counters = {
+            'agent_visits': (1, (agents,)),
+            'agent_day_visits': (1, (agents, days)),
+            'agent_service_min': (service_min, (agents,)),
+            'agent_trip_time': (trip_time, (agents,)),
+            'store_visits': (1, (stores,)),
+            'store_day_visits': (1, (stores, days)),
+            'chain_visits': (1, (chains,)),
+            'chain_day_visits': (1, (chains, days)),
+            'day_visits': (1, (days,)),
+            'hour_visits': (1, (hours,)),
+        }
+        destinations = visits.destination_codes[rows]
+        unknown_store_ids = pd.Series(decode_codes(visits.locations, destinations[stores < 0], np.nan), dtype=object).astype(str)
+        return counters, service_min, trip_time, unknown_store_ids
 
-        # Parse worker location coordinates
-        workers_df[['home_latitude', 'home_longitude']] = workers_df['home_location'].str.split(',', expand=True).astype(float)
+    def update(self, visits: 'VisitTable', sign: int, rows=slice(None)):
+        """Add sign times each of the given visit rows to every counter"""
+        counters, service_min, trip_time, unknown_store_ids = self.visit_keys(visits, rows)
+        self.visits += sign * len(service_min)
+        self.service_min += sign * float(service_min.sum())
+        self.trip_time += sign * float(trip_time.sum())
+        for name, (weights, keys) in counters.items():
+            add_counts(getattr(self, name), sign * weights, *keys)
         
-        # Load routing data
-        manual_df = pd.read_csv('data/manual_optimization.csv')
-        result_df = pd.read_csv('data/result.csv')
+        for store_id, count in unknown_store_ids.value_counts().items():
+            remaining = self.unknown_store_visits.get(store_id, 0) + sign * int(count)
+            if remaining:
+                self.unknown_store_visits[store_id] = remaining
+            else:
+                self.unknown_store_visits.pop(store_id, None)
+
+@dataclass(frozen=True)
+class ScenarioTotals:
+    """Additive totals of one scenario that the dashboard KPIs and comparison metrics derive from"""
+    visits: int
+    service_min: float
+    trip_time: float
+    visited_stores: int
+    visited_sales: int
+
+class VisitAggregatesDelta:
+    """Sparse changes to the VisitAggregates of one scenario.
+
+    insert() and delete() take visit rows like VisitAggregates.insert(), but only
+    the counter cells the rows touch are recorded, keyed by counter name and index
+    tuple, so a change costs time in the changed visits rather than in the size of
+    the counters. The base counters are only read.
+    """
+
+    def __init__(self, base: VisitAggregates):
+        self.base = base
+        self.visits = 0
+        self.service_min = 0.0
+        self.trip_time = 0.0
+        self.cells = {name: {} for name in VisitAggregates.COUNTERS}
+        self.unknown_store_visits = {}
+
+    def insert(self, visits: 'VisitTable', rows=slice(None)):
+        """Count visit rows in"""
+        self.update(visits, 1, rows)
+
+    def delete(self, visits: 'VisitTable', rows=slice(None)):
+        """Count visit rows of the base scenario out"""
+        self.update(visits, -1, rows)
+
+    def update(self, visits: 'VisitTable', sign: int, rows=slice(None)):
+        """Add sign times each of the given visit rows to the cells they touch"""
+        counters, service_min, trip_time, unknown_store_ids = self.base.visit_keys(visits, rows)
+        self.visits += sign * len(service_min)
+        self.service_min += sign * float(service_min.sum())
+        self.trip_time += sign * float(trip_time.sum())
+        for name, (weights, keys) in counters.items():
+            valid = np.logical_and.reduce([key >= 0 for key in keys])
+            weights = np.broadcast_to(weights, valid.shape)[valid].tolist()
+            cells = self.cells[name]
+            for cell, weight in zip(zip(*(key[valid].tolist() for key in keys)), weights):
+                cells[cell] = cells.get(cell, 0) + sign * weight
         
-        logger.info("Data loaded successfully")
+        for store_id in unknown_store_ids.tolist():
+            self.unknown_store_visits[store_id] = self.unknown_store_visits.get(store_id, 0) + sign
+
+    def changes(self, name: str) -> Dict[int, Tuple[int, int]]:
+        """(before, after) counts of the changed cells of a counter with one dimension, by index"""
+        counts = getattr(self.base, name)
+        return {
+            index: (int(counts[index]), int(counts[index] + delta))
+            for (index,), delta in sorted(self.cells[name].items()) if delta
+        }
+
+    def totals(self, stores_df, base_totals: ScenarioTotals) -> ScenarioTotals:
+        """Totals of the base scenario with the changes applied"""
+        visited_stores, visited_sales = base_totals.visited_stores, base_totals.visited_sales
+        sales = stores_df['sales'].to_numpy()
+        for store_code, (before, after) in self.changes('store_visits').items():
+            visited = int(after > 0) - int(before > 0)
+            visited_stores += visited
+            visited_sales += visited * int(sales[store_code])
+        for store_id, delta in self.unknown_store_visits.items():
+            before = self.base.unknown_store_visits.get(store_id, 0)
+            visited_stores += int(before + delta > 0) - int(before > 0)
         
-    except Exception as e:
-        logger.error(f"Error loading data: {e}")
-        raise
+        return ScenarioTotals(
+            visits=base_totals.visits + self.visits,
+            service_min=base_totals.service_min + self.service_min,
+            trip_time=base_totals.trip_time + self.trip_time,
+            visited_stores=visited_stores,
+            visited_sales=visited_sales
+        )
 
-def calculate_visit_efficiency():
-    """Calculate visit efficiency metrics between manual and optimized processes"""
-    manual_visits = len(manual_df)
-    optimized_visits = len(result_df)
-    
-    improvement = ((optimized_visits - manual_visits) / manual_visits) * 100
-    
-    return {
-        'manual_visits': manual_visits,
-        'optimized_visits': optimized_visits,
-        'improvement_percentage': improvement
-    }
+@dataclass(frozen=True)
+class StoreTable:
+    """The /api/all-stores columns of one scenario with presorted row orders.
 
-def analyze_agent_workload():
-    """Analyze agent workload distribution and efficiency"""
-    agent_stats = []
-    
-    # Filter for active agents only
-    active_workers = workers_df[workers_df['activos'] == 1] if 'activos' in workers_df.columns else workers_df
-    
-    for _, worker in active_workers.iterrows():
-        agent_id = worker['worker_id']
-        agent_name = worker['name']
+    columns holds every AllStoreData field as an array over stores.csv rows. orders
+    maps every sort key, and the key prefixed with '-' for descending order, to the
+    rows in that order with ties in stores.csv order, so an unfiltered sorted page is
+    a slice of one order array.
+    """
+    columns: Mapping[str, np.ndarray]
+    orders: Mapping[str, np.ndarray]
+    chain_codes: np.ndarray
+    chain_lookup: Mapping[str, int]
+    sufficient: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.chain_codes)
+
+@dataclass(frozen=True)
+class ScenarioPayloads:
+    """Response payloads derived from a single routing scenario"""
+    agent_coverage: AgentCoverageData
+    store_chain_analysis: StoreChainAnalysis
+    top_stores: TopStoresAnalysis
+    chain_stores: Mapping[str, Dict[str, Any]]
+    agent_stores: Mapping[str, Dict[str, Any]]
+    visit_time_distribution: VisitTimeDistribution
+    agents: AgentsData
+    route_index: RouteIndex
+    route_geometry: RouteGeometry
+    validation: RouteValidation
+    aggregates: VisitAggregates
+    totals: ScenarioTotals
+    visit_store_codes: np.ndarray
+    all_stores: AllStoresData
+    store_table: StoreTable
+    agent_time_distribution: AgentTimeDistribution
+
+@dataclass(frozen=True)
+class ComparisonPayloads:
+    """Response payloads comparing a before and an after routing scenario"""
+    kpis: KPIMetrics
+    efficiency_comparison: EfficiencyComparison
+    comparison_metrics: MetricsComparison
+    agent_performance_comparison: AgentPerformanceComparison
+    store_performance_comparison: StorePerformanceComparison
+    weekly_distribution: WeeklyDistributionData
+
+class ScenarioRegistry:
+    """Routing scenarios of one dataset sharing a single stores/workers dimension.
+
+    Only the visit tables differ between scenarios. Scenario and comparison
+    payloads are built on first use and cached for the lifetime of the snapshot.
+    With a shared directory, the arrays of every scenario (visit table, route
+    index, geometry, validation, store table and visit counters) are published
+    there once and mapped by every worker process, and derived scenarios are
+    written there so that the other worker processes serving the dataset can
+    attach them. The registry holds the
+    directory until it is garbage collected, so no process removes it in use.
+    """
+
+    def __init__(self, stores_df, workers_df, store_dimension, worker_dimension, scenarios: Dict[str, 'VisitTable'],
+                 scenario_hashes: Optional[Dict[str, str]] = None, shared_dir: Optional[str] = None):
+        self.stores_df = stores_df
+        self.workers_df = workers_df
+        self.store_dimension = store_dimension
+        self.worker_dimension = worker_dimension
+        self.scenarios = MappingProxyType(dict(scenarios))
+        self.scenario_hashes = dict(scenario_hashes or {})
+        self.shared_dir = shared_dir
+        users_file = hold_shared_data_dir(shared_dir)
+        if users_file is not None:
+            weakref.finalize(self, users_file.close)
+        self.scenario_cache = {}
+        self.comparison_cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.build_locks = {}
+        self.derived = []
+        self.revision = derived_revision(self.derived)
+
+    def ids(self) -> List[str]:
+        """Scenario ids, built-in scenarios first"""
+        return list(self.scenarios)
+
+    def visits(self, scenario_id: str) -> 'VisitTable':
+        """Visit table of a scenario, KeyError for unknown ids"""
+        return self.scenarios[scenario_id]
+
+    def contains(self, scenario_id: str) -> bool:
+        """Whether the scenario is registered, attaching scenarios derived by other worker processes"""
+        if scenario_id not in self.scenarios:
+            self.attach_published()
+        return scenario_id in self.scenarios
+
+    def add_derived(self, scenario_id: str, source: bytes, publish: bool = True):
+        """Register a scenario derived from the loaded ones, kept until the next reload.
+
+        source is the scenario in the result.csv format. Only the MAX_DERIVED_SCENARIOS
+        most recent derived scenarios are kept; the cached responses of the ones dropped
+        are discarded. Every change updates revision, a digest of the derived scenario
+        ids that is part of the response ETags.
+        """
+        if scenario_id in self.scenarios:
+            return
+        scenario_hash = hashlib.sha256(source).hexdigest()
+        visits = load_visit_table(self.shared_dir, scenario_hash, parse_routes(source), self.store_dimension, self.worker_dimension)
+        if publish:
+            self.publish_derived(scenario_id, source)
         
-        # Get visits for this agent
-        agent_manual_visits = len(manual_df[manual_df['worker_id'] == agent_id])
-        agent_optimized_visits = len(result_df[result_df['worker_id'] == agent_id])
+        with self.lock:
+            if scenario_id in self.scenarios:
+                return
+            scenarios = dict(self.scenarios)
+            scenarios[scenario_id] = visits
+            self.scenario_hashes[scenario_id] = scenario_hash
+            self.derived.append(scenario_id)
+            
+            evicted = []
+            while len(self.derived) > MAX_DERIVED_SCENARIOS:
+                dropped = self.derived.pop(0)
+                evicted.append(dropped)
+                del scenarios[dropped]
+                self.scenario_hashes.pop(dropped, None)
+                self.scenario_cache.pop(dropped, None)
+                for key in [key for key in self.comparison_cache if dropped in key]:
+                    del self.comparison_cache[key]
+            
+            self.scenarios = MappingProxyType(scenarios)
+            self.revision = derived_revision(self.derived)
         
-        # Calculate efficiency gain (positive when Utomata is better)
-        if agent_manual_visits > 0:
-            efficiency_gain = ((agent_optimized_visits - agent_manual_visits) / agent_manual_visits) * 100
-        else:
-            efficiency_gain = 0
+        # Evicted scenarios must answer 404 rather than their cached responses
+        for scenario_id in evicted:
+            response_cache.discard_scenario(scenario_id)
+
+    def publish_derived(self, scenario_id: str, source: bytes):
+        """Write a derived scenario to the shared directory, dropping the oldest ones past the limit"""
+        if self.shared_dir is None:
+            return
+        directory = os.path.join(self.shared_dir, 'derived')
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = os.path.join(directory, f".{scenario_id}.tmp-{os.getpid()}-{threading.get_ident()}")
+            with open(tmp_path, 'wb') as f:
+                f.write(source)
+            os.replace(tmp_path, os.path.join(directory, f"{scenario_id}.csv"))
             
-        agent_stats.append({
-            'agent_id': agent_id,
-            'name': agent_name,
-            'visits_before': agent_manual_visits,
-            'visits_after': agent_optimized_visits,
-            'efficiency_gain': efficiency_gain
-        })
-    
-    return agent_stats
+            for filename in list_published_scenarios(directory)[:-MAX_DERIVED_SCENARIOS]:
+                os.remove(os.path.join(directory, filename))
+        except OSError as e:
+            logger.warning(f"Cannot publish derived scenario {scenario_id}: {e}")
 
-def analyze_store_performance():
-    """Analyze store performance comparison between manual and optimized processes"""
-    # Count visits per store in manual process
-    manual_store_visits = manual_df['store_id_destination'].value_counts().to_dict()
-    
-    # Count visits per store in optimized process
-    optimized_store_visits = result_df['store_id_destination'].value_counts().to_dict()
-    
-    store_stats = []
-    # Iterate through ALL stores in the system, not just those with visits
-    for _, store_row in stores_df.iterrows():
-        store_id = store_row['id']
-        visits_before = manual_store_visits.get(store_id, 0)
-        visits_after = optimized_store_visits.get(store_id, 0)
-        visit_change = visits_after - visits_before
+    def attach_published(self):
+        """Register the derived scenarios other worker processes published for this dataset"""
+        if self.shared_dir is None:
+            return
+        directory = os.path.join(self.shared_dir, 'derived')
+        try:
+            for filename in list_published_scenarios(directory)[-MAX_DERIVED_SCENARIOS:]:
+                scenario_id = filename.removesuffix('.csv')
+                if scenario_id not in self.scenarios:
+                    with open(os.path.join(directory, filename), 'rb') as f:
+                        self.add_derived(scenario_id, f.read(), publish=False)
+        except OSError as e:
+            logger.warning(f"Cannot read derived scenarios: {e}")
+
+    def scenario(self, scenario_id: str) -> ScenarioPayloads:
+        """Payloads of one scenario, built on first use"""
+        return self.get_or_build(
+            self.scenario_cache, scenario_id,
+            lambda: build_scenario_payloads(self, self.visits(scenario_id), self.scenario_hashes.get(scenario_id))
+        )
+
+    def comparison(self, before: str, after: str) -> ComparisonPayloads:
+        """Payloads comparing two scenarios, built on first use from their visit counters"""
+        return self.get_or_build(
+            self.comparison_cache, (before, after),
+            lambda: build_comparison_payloads(self, self.scenario(before).aggregates, self.scenario(after).aggregates)
+        )
+
+    def get_or_build(self, cache, key, build):
+        """Return cache[key], building it once even under concurrent requests"""
+        with self.lock:
+            if key in cache:
+                return cache[key]
+            build_lock = self.build_locks.setdefault((id(cache), key), threading.Lock())
         
-        store_stats.append({
-            'store_id': store_id,
-            'name': store_row['store'],
-            'chain': store_row['store'].split(',')[0] if ',' in store_row['store'] else store_row['store'],
-            'sales': int(store_row['sales']),
-            'visits_before': visits_before,
-            'visits_after': visits_after,
-            'visit_change': visit_change
-        })
+        with build_lock:
+            with self.lock:
+                if key in cache:
+                    return cache[key]
+            value = build()
+            with self.lock:
+                cache[key] = value
+                if cache is self.comparison_cache:
+                    # Bound the number of cached before/after pairs
+                    cache.move_to_end(key)
+                    while len(cache) > SCENARIO_COMPARISON_CACHE_ENTRIES:
+                        cache.popitem(last=False)
+                self.build_locks.pop((id(cache), key), None)
+            return value
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    """Read-only view of one loaded dataset with its response payloads.
+
+    A snapshot is built once by load_data() and never replaced in part, so
+    endpoints only look up values and concurrent requests never share mutable
+    state. Payloads of the built-in scenarios are precomputed; other scenarios
+    and comparisons are built lazily by the scenario registry.
+    """
+    version: int
+    source_hash: str
+    loaded_at: datetime
+    stores_df: pd.DataFrame
+    workers_df: pd.DataFrame
+    store_dimension: StoreDimension
+    worker_dimension: WorkerDimension
+    store_grid: GridIndex
+    agent_grid: GridIndex
+    store_clusters: List[ClusterLevel]
+    distance_matrix: Optional[DistanceMatrix]
+    active_workers_df: pd.DataFrame
+    store_chain_distribution: StoreChainDistribution
+    stores: StoresData
+    scenarios: ScenarioRegistry
+
+# Global data storage - replaced as a whole, never mutated in place
+analytics_snapshot: Optional[AnalyticsSnapshot] = None
+snapshot_version = 0
+
+# Serializes reloads and remembers the file stats of the published snapshot
+reload_lock = threading.Lock()
+data_files_stat = None
+
+def list_data_files(data_dir: str = DATA_DIR) -> Dict[str, str]:
+    """Table key -> file path relative to data_dir for the base files and every scenario file"""
+    data_files = dict(DATA_FILES)
     
-    # Sort by sales descending to show most important stores first
-    store_stats.sort(key=lambda x: x['sales'], reverse=True)
+    scenarios_dir = os.path.join(data_dir, SCENARIOS_SUBDIR)
+    if os.path.isdir(scenarios_dir):
+        for filename in sorted(os.listdir(scenarios_dir)):
+            scenario_id, ext = os.path.splitext(filename)
+            if ext != '.csv':
+                continue
+            if scenario_id in BUILTIN_SCENARIOS:
+                logger.warning(f"Ignoring scenario file {filename}: '{scenario_id}' is a built-in scenario")
+                continue
+            data_files[f"scenario-{scenario_id}"] = os.path.join(SCENARIOS_SUBDIR, filename)
     
-    return store_stats
+    return data_files
 
-def get_daily_visit_comparison():
-    """Get daily visit comparison between manual and optimized processes"""
-    days = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat']
-    day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+def stat_data_files(data_dir: str = DATA_DIR):
+    """Return (key, file, mtime, size) of every data file to detect changes cheaply"""
+    files_stat = []
+    for key, filename in list_data_files(data_dir).items():
+        stat = os.stat(os.path.join(data_dir, filename))
+        files_stat.append((key, filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(files_stat)
+
+def combine_file_hashes(file_hashes: Dict[str, str]) -> str:
+    """Content hash identifying one version of the data files"""
+    digest = hashlib.sha256()
+    for key in sorted(file_hashes):
+        digest.update(key.encode())
+        digest.update(bytes.fromhex(file_hashes[key]))
+    return digest.hexdigest()
+
+def parse_stores(source: bytes) -> pd.DataFrame:
+    """Parse and preprocess stores.csv"""
+    stores_df = pd.read_csv(io.BytesIO(source))
     
-    daily_comparison = []
+    # Clean sales data - remove $ and commas, convert to int
+    stores_df['sales'] = stores_df['sales'].str.replace('$', '').str.replace(',', '').astype(int)
     
-    for day, day_name in zip(days, day_names):
-        manual_count = len(manual_df[manual_df['day'] == day])
-        optimized_count = len(result_df[result_df['day'] == day])
-        
-        daily_comparison.append({
-            'day': day_name,
-            'manual': manual_count,
-            'optimized': optimized_count
-        })
+    # Parse location coordinates
+    stores_df[['latitude', 'longitude']] = stores_df['location'].str.split(',', expand=True).astype(float)
     
-    return daily_comparison
-
-def get_store_chain_distribution():
-    """Get store count and visit distribution by retail chain"""
-    # Extract chain names from store names
-    stores_df['chain'] = stores_df['store'].str.split(',').str[0]
+    # Extract normalized chain names from store names once instead of on every request
+    stores_df['chain'] = stores_df['store'].str.split(',').str[0].str.strip().fillna('Unknown')
     
-    chain_stats = stores_df.groupby('chain').agg({
-        'id': 'count',
-        'sales': 'sum'
-    }).reset_index()
+    return stores_df
+
+def parse_workers(source: bytes) -> pd.DataFrame:
+    """Parse and preprocess workers.csv"""
+    workers_df = pd.read_csv(io.BytesIO(source))
     
-    total_stores = len(stores_df)
+    # Ensure 'activos' column is loaded as integer
+    if 'activos' in workers_df.columns:
+        workers_df['activos'] = workers_df['activos'].astype(int)
+
+    # Parse worker location coordinates
+    workers_df[['home_latitude', 'home_longitude']] = workers_df['home_location'].str.split(',', expand=True).astype(float)
     
-    chains = []
-    for _, row in chain_stats.iterrows():
-        percentage = (row['id'] / total_stores) * 100
-        chains.append({
-            'chain': row['chain'],
-            'count': int(row['id']),
-            'percentage': round(percentage, 1)
-        })
+    return workers_df
+
+def parse_routes(source: bytes) -> pd.DataFrame:
+    """Parse a routing file (manual_optimization.csv or result.csv)"""
+    return pd.read_csv(io.BytesIO(source))
+
+TABLE_PARSERS = {
+    'stores': parse_stores,
+    'workers': parse_workers,
+    'manual': parse_routes,
+    'result': parse_routes
+}
+
+def write_table_cache(df: pd.DataFrame, path: str):
+    """Write a parsed table as one .npy file per column plus a schema.
+
+    Numeric columns are stored as-is so they can be memory-mapped; text columns are
+    dictionary encoded as codes (-1 for missing) in the integer dtype pandas uses for
+    categorical codes, with their values in JSON.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_path)
     
-    return chains
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        filename = f"{i}.npy"
+        if series.dtype.kind in 'biuf':
+            np.save(os.path.join(tmp_path, filename), series.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric', 'dtype': str(series.dtype), 'file': filename})
+        else:
+            codes, values = pd.factorize(series)
+            np.save(os.path.join(tmp_path, filename), pd.Categorical.from_codes(codes, values, validate=False).codes)
+            with open(os.path.join(tmp_path, f"{i}.json"), 'w', encoding='utf-8') as f:
+                json.dump(values.tolist(), f, ensure_ascii=False)
+            columns.append({'name': name, 'kind': 'dictionary', 'dtype': str(series.dtype), 'file': filename})
+    
+    with open(os.path.join(tmp_path, 'schema.json'), 'w', encoding='utf-8') as f:
+        json.dump({'format_version': CACHE_FORMAT_VERSION, 'rows': len(df), 'columns': columns}, f, ensure_ascii=False)
+    
+    # Publish the entry atomically; another instance may have written it already
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
 
-def get_agent_performance_metrics():
-    """Get detailed performance metrics for each field agent"""
-    agent_performance = []
+def read_table_cache(path: str) -> pd.DataFrame:
+    """Read a cached table, memory-mapping its columns.
+
+    Text columns come back as categoricals over the mapped codes, so only their
+    distinct values are held in process.
+    """
+    with open(os.path.join(path, 'schema.json'), encoding='utf-8') as f:
+        schema = json.load(f)
+    
+    data = {}
+    for column in schema['columns']:
+        values = np.load(os.path.join(path, column['file']), mmap_mode='r')
+        if column['kind'] == 'dictionary':
+            with open(os.path.join(path, column['file'].replace('.npy', '.json')), encoding='utf-8') as f:
+                dictionary = pd.Index(json.load(f), dtype=column['dtype'])
+            data[column['name']] = pd.Categorical.from_codes(values, dictionary, validate=False)
+        else:
+            # Plain ndarray view over the mapped file
+            data[column['name']] = np.asarray(values)
+    
+    return pd.DataFrame(data, copy=False)
+
+def table_cache_path(key: str, file_hash: str) -> str:
+    """Cache entry path for one table version"""
+    return os.path.join(DATA_CACHE_DIR, f"{key}-v{CACHE_FORMAT_VERSION}-{file_hash[:24]}")
+
+def read_cache_manifest() -> Dict[str, Any]:
+    """Read the file stat -> content hash manifest of the cache"""
+    if not DATA_CACHE_DIR:
+        return {}
+    try:
+        with open(os.path.join(DATA_CACHE_DIR, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_cache_manifest(manifest: Dict[str, Any]):
+    """Atomically replace the cache manifest"""
+    tmp_path = os.path.join(DATA_CACHE_DIR, f"manifest.json.tmp-{os.getpid()}")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(DATA_CACHE_DIR, 'manifest.json'))
+
+@contextmanager
+def cache_lock(name: str):
+    """Hold an exclusive lock named name on the cache directory.
+
+    The lock is an flock on a file, so it excludes other worker processes as well
+    as other threads; the first holder builds a cache entry and the others find it
+    written once they get the lock.
+    """
+    if not DATA_CACHE_DIR or fcntl is None:
+        yield
+        return
+    
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+        lock_file = open(os.path.join(DATA_CACHE_DIR, f".{name}.lock"), 'a')
+    except OSError as e:
+        logger.warning(f"Cannot lock the cache: {e}")
+        yield
+        return
+    
+    # Closing the file releases the lock
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def shared_data_dir(source_hash: str) -> Optional[str]:
+    """Directory for the data the worker processes serving one dataset version share, None without a cache"""
+    if not DATA_CACHE_DIR:
+        return None
+    return os.path.join(DATA_CACHE_DIR, f"shared-v{CACHE_FORMAT_VERSION}-{source_hash[:24]}")
+
+def hold_shared_data_dir(directory: Optional[str]):
+    """Keep a shared directory from being removed until the returned file is closed.
+
+    The file holds a shared flock on the directory's .users.lock, which
+    remove_unused_shared_data_dirs() cannot get exclusively while any process
+    holds it. None without a cache directory or flock.
+    """
+    if directory is None or fcntl is None:
+        return None
+    
+    # Under the lock so that no process removes the directory in between
+    with cache_lock('shared'):
+        try:
+            os.makedirs(directory, exist_ok=True)
+            users_file = open(os.path.join(directory, '.users.lock'), 'a')
+        except OSError as e:
+            logger.warning(f"Cannot hold shared directory {directory}: {e}")
+            return None
+        fcntl.flock(users_file, fcntl.LOCK_SH)
+    return users_file
+
+def remove_unused_shared_data_dirs(source_hash: str):
+    """Remove the shared directories of other dataset versions that no process holds any more"""
+    current = os.path.basename(shared_data_dir(source_hash))
+    with cache_lock('shared'):
+        for entry in os.listdir(DATA_CACHE_DIR):
+            if not re.fullmatch(r"shared-v\d+-[0-9a-f]+", entry) or entry == current:
+                continue
+            directory = os.path.join(DATA_CACHE_DIR, entry)
+            if fcntl is None:
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            try:
+                with open(os.path.join(directory, '.users.lock'), 'a') as users_file:
+                    fcntl.flock(users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    shutil.rmtree(directory, ignore_errors=True)
+            except OSError:
+                # Still mapped by a snapshot of this or another worker process
+                continue
+
+def load_shared_arrays(directory: Optional[str], name: str, build) -> Dict[str, np.ndarray]:
+    """Named arrays built once for all worker processes serving a dataset.
+
+    The first process needing them runs build() and writes one .npy file per array
+    under the cache lock; every process then memory-maps the files copy-on-write,
+    so their pages are shared until a process writes to them. Object arrays, the
+    dictionaries of coded columns, are written as JSON lists and read into every
+    process; they hold distinct values only. Without a shared directory the
+    arrays are built in process.
+    """
+    if directory is None:
+        return build()
+    
+    path = os.path.join(directory, name)
+    with cache_lock('shared'):
+        if not os.path.isdir(path):
+            arrays = build()
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            try:
+                os.makedirs(tmp_path)
+                for array_name, values in arrays.items():
+                    if values.dtype == object:
+                        with open(os.path.join(tmp_path, f"{array_name}.json"), 'w', encoding='utf-8') as f:
+                            json.dump(values.tolist(), f, ensure_ascii=False)
+                    else:
+                        np.save(os.path.join(tmp_path, f"{array_name}.npy"), values)
+                os.rename(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Cannot write shared arrays {name}: {e}")
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return arrays
+    
+    try:
+        arrays = {}
+        for filename in os.listdir(path):
+            if filename.endswith('.npy'):
+                arrays[filename.removesuffix('.npy')] = np.asarray(np.load(os.path.join(path, filename), mmap_mode='c'))
+            elif filename.endswith('.json'):
+                with open(os.path.join(path, filename), encoding='utf-8') as f:
+                    arrays[filename.removesuffix('.json')] = np.array(json.load(f), dtype=object)
+        return arrays
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable shared arrays {path}: {e}")
+        return build()
+
+def list_published_scenarios(directory: str) -> List[str]:
+    """Derived scenario files of a shared directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    filenames = [filename for filename in os.listdir(directory) if filename.endswith('.csv') and not filename.startswith('.')]
+    return sorted(filenames, key=lambda filename: os.stat(os.path.join(directory, filename)).st_mtime_ns)
+
+def derived_revision(derived: List[str]) -> str:
+    """Digest of a set of derived scenario ids, equal in every worker process holding the same set"""
+    return hashlib.sha256('\n'.join(sorted(derived)).encode()).hexdigest()[:16]
+
+@span('hash_data_files')
+def hash_data_files(files_stat, manifest: Dict[str, Any], data_dir: str = DATA_DIR):
+    """Content hash of every data file.
+
+    Files whose mtime and size match the manifest reuse the recorded hash without
+    being read. Returns the hashes and the raw bytes of the files that were read.
+    """
+    file_hashes = {}
+    sources = {}
+    for key, filename, mtime_ns, size in files_stat:
+        path = os.path.abspath(os.path.join(data_dir, filename))
+        entry = manifest.get(path)
+        if entry and entry['mtime_ns'] == mtime_ns and entry['size'] == size:
+            file_hashes[key] = entry['sha256']
+            continue
+        
+        with open(path, 'rb') as f:
+            sources[key] = f.read()
+        file_hashes[key] = hashlib.sha256(sources[key]).hexdigest()
+    
+    return file_hashes, sources
+
+@span('load_table')
+def load_table(key: str, filename: str, file_hash: str, source: Optional[bytes], data_dir: str = DATA_DIR):
+    """Load one parsed table, from the columnar cache when possible.
+
+    Returns the table and the content hash of the bytes it was built from.
+    """
+    if DATA_CACHE_DIR:
+        path = table_cache_path(key, file_hash)
+        if os.path.isdir(path):
+            try:
+                return read_table_cache(path), file_hash
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+    
+    if source is None:
+        with open(os.path.join(data_dir, filename), 'rb') as f:
+            source = f.read()
+        file_hash = hashlib.sha256(source).hexdigest()
+    
+    # Scenario files are routing files
+    df = TABLE_PARSERS.get(key, parse_routes)(source)
+    
+    if DATA_CACHE_DIR:
+        try:
+            os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+            write_table_cache(df, table_cache_path(key, file_hash))
+            
+            # Drop entries of older versions of this table
+            current = os.path.basename(table_cache_path(key, file_hash))
+            entry_pattern = re.compile(rf"{re.escape(key)}-v\d+-[0-9a-f]+")
+            for entry in os.listdir(DATA_CACHE_DIR):
+                if entry_pattern.fullmatch(entry) and entry != current:
+                    shutil.rmtree(os.path.join(DATA_CACHE_DIR, entry), ignore_errors=True)
+            
+            # Map the entry like the other worker processes instead of keeping the parsed frame
+            return read_table_cache(table_cache_path(key, file_hash)), file_hash
+        except OSError as e:
+            logger.warning(f"Cannot write cache for {filename}: {e}")
+    
+    return df, file_hash
+
+def compute_distance_matrix(latitudes, longitudes, out: np.ndarray):
+    """Fill out with the pairwise distances of the points, a block of rows at a time"""
+    chunk_rows = max(1, DISTANCE_MATRIX_CHUNK_CELLS // max(len(latitudes), 1))
+    for start in range(0, len(latitudes), chunk_rows):
+        end = min(start + chunk_rows, len(latitudes))
+        out[start:end] = haversine_km(
+            latitudes[start:end, None], longitudes[start:end, None], latitudes[None, :], longitudes[None, :]
+        )
+
+@span('build_distance_matrix')
+def build_distance_matrix(stores_df, workers_df) -> Optional[DistanceMatrix]:
+    """Distance matrix over store and worker home coordinates, cached by coordinate hash"""
+    latitudes = np.r_[stores_df['latitude'].to_numpy(dtype=float), workers_df['home_latitude'].to_numpy(dtype=float)]
+    longitudes = np.r_[stores_df['longitude'].to_numpy(dtype=float), workers_df['home_longitude'].to_numpy(dtype=float)]
+    n_points = len(latitudes)
+    
+    if n_points > DISTANCE_MATRIX_MAX_POINTS:
+        logger.warning(f"Skipping the distance matrix: {n_points} points exceed DISTANCE_MATRIX_MAX_POINTS")
+        return None
+    
+    coordinate_hash = hashlib.sha256(np.c_[latitudes, longitudes].tobytes()).hexdigest()
+    path = os.path.join(DATA_CACHE_DIR, f"distances-v{CACHE_FORMAT_VERSION}-{coordinate_hash[:24]}.npy") if DATA_CACHE_DIR else None
     
-    # Filter for active agents only
-    active_workers = workers_df[workers_df['activos'] == 1] if 'activos' in workers_df.columns else workers_df
+    if path and n_points:
+        # Another worker process may be writing the matrix; wait for it instead of recomputing
+        with cache_lock('distances'):
+            if os.path.isfile(path):
+                try:
+                    return DistanceMatrix(coordinate_hash, len(stores_df), np.load(path, mmap_mode='r'))
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return write_distance_matrix(path, coordinate_hash, len(stores_df), latitudes, longitudes)
     
-    for _, worker in active_workers.iterrows():
-        agent_id = worker['worker_id']
-        agent_name = worker['name']
+    distances = np.empty((n_points, n_points), dtype=np.float32)
+    compute_distance_matrix(latitudes, longitudes, distances)
+    return DistanceMatrix(coordinate_hash, len(stores_df), distances)
+
+def write_distance_matrix(path: str, coordinate_hash: str, n_stores: int, latitudes, longitudes) -> DistanceMatrix:
+    """Compute the distance matrix into the cache file at path and map it, in memory if it cannot be written"""
+    n_points = len(latitudes)
+    try:
+        os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(n_points, n_points))
+        compute_distance_matrix(latitudes, longitudes, out)
+        out.flush()
+        del out
+        os.replace(tmp_path, path)
         
-        # Get visits for this agent
-        agent_visits = result_df[result_df['worker_id'] == agent_id]
-        weekly_visits = len(agent_visits)
+        # Drop matrices of older coordinates
+        for entry in os.listdir(DATA_CACHE_DIR):
+            if re.fullmatch(r"distances-v\d+-[0-9a-f]+\.npy", entry) and entry != os.path.basename(path):
+                os.remove(os.path.join(DATA_CACHE_DIR, entry))
         
-        if weekly_visits > 0:
-            # Calculate time percentages (simplified calculation)
-            total_service_time = agent_visits['service_min'].sum()
-            total_travel_time = agent_visits['trip_time'].sum()
-            total_time = total_service_time + total_travel_time
+        return DistanceMatrix(coordinate_hash, n_stores, np.load(path, mmap_mode='r'))
+    except OSError as e:
+        logger.warning(f"Cannot write the distance matrix cache: {e}")
+    
+    distances = np.empty((n_points, n_points), dtype=np.float32)
+    compute_distance_matrix(latitudes, longitudes, distances)
+    return DistanceMatrix(coordinate_hash, n_stores, distances)
+
+@span('load_data')
+def load_data(force: bool = True) -> bool:
+    """Load all CSV data files and publish a new analytics snapshot.
+
+    The new snapshot is built completely before it replaces the current one in a
+    single assignment, so requests already holding the old snapshot finish against
+    it. Returns False when force is off and the file contents have not changed.
+    """
+    global analytics_snapshot, snapshot_version, data_files_stat
+    
+    with reload_lock:
+        try:
+            files_stat = stat_data_files()
+            manifest = read_cache_manifest()
+            file_hashes, sources = hash_data_files(files_stat, manifest)
             
-            if total_time > 0:
-                store_time_pct = (total_service_time / total_time) * 100
-                travel_time_pct = (total_travel_time / total_time) * 100
-                admin_time_pct = 100 - store_time_pct - travel_time_pct
-            else:
-                store_time_pct = travel_time_pct = admin_time_pct = 0
-        else:
-            store_time_pct = travel_time_pct = admin_time_pct = 0
-        
-        # Determine efficiency rating
-        if weekly_visits >= 15:
-            efficiency_rating = "Excellent"
-        elif weekly_visits >= 12:
-            efficiency_rating = "Good"
-        elif weekly_visits >= 8:
-            efficiency_rating = "Average"
-        else:
-            efficiency_rating = "Below Average"
+            if not force and analytics_snapshot is not None and analytics_snapshot.source_hash == combine_file_hashes(file_hashes):
+                # Only the file timestamps changed
+                data_files_stat = files_stat
+                return False
+            
+            # One worker process parses changed files into the cache, the others map it
+            with cache_lock('tables'):
+                tables = {}
+                for key, filename, _, _ in files_stat:
+                    tables[key], file_hashes[key] = load_table(key, filename, file_hashes[key], sources.get(key))
+                source_hash = combine_file_hashes(file_hashes)
+                
+                if DATA_CACHE_DIR:
+                    # Remember the hashes so unchanged files are not read on the next load
+                    for key, filename, mtime_ns, size in files_stat:
+                        path = os.path.abspath(os.path.join(DATA_DIR, filename))
+                        manifest[path] = {'mtime_ns': mtime_ns, 'size': size, 'sha256': file_hashes[key]}
+                    try:
+                        write_cache_manifest(manifest)
+                    except OSError as e:
+                        logger.warning(f"Cannot write cache manifest: {e}")
+            
+            scenarios = {scenario_id: tables[key] for scenario_id, key in BUILTIN_SCENARIOS.items()}
+            scenario_hashes = {scenario_id: file_hashes[key] for scenario_id, key in BUILTIN_SCENARIOS.items()}
+            for key, filename, _, _ in files_stat:
+                if key.startswith('scenario-'):
+                    scenarios[key.removeprefix('scenario-')] = tables[key]
+                    scenario_hashes[key.removeprefix('scenario-')] = file_hashes[key]
+            
+            snapshot = build_snapshot(
+                tables['stores'], tables['workers'], scenarios,
+                version=snapshot_version + 1,
+                source_hash=source_hash,
+                scenario_hashes=scenario_hashes
+            )
+            
+            # Publish the fully built snapshot in a single assignment
+            snapshot_version = snapshot.version
+            analytics_snapshot = snapshot
+            data_files_stat = files_stat
+            
+            # Older dataset versions are removed once no worker process holds a snapshot of them
+            if DATA_CACHE_DIR:
+                remove_unused_shared_data_dirs(source_hash)
+            
+            logger.info(f"Data loaded successfully (snapshot version {snapshot.version}, {source_hash[:12]})")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error loading data: {e}")
+            raise
+
+async def watch_data_files():
+    """Poll the data files and reload them in the background when they change"""
+    pending_stat = None
+    
+    while True:
+        await asyncio.sleep(DATA_RELOAD_INTERVAL)
         
-        agent_performance.append({
-            'agent_id': agent_id,
-            'name': agent_name,
-            'weekly_visits': weekly_visits,
-            'store_time_percentage': round(store_time_pct, 1),
-            'travel_time_percentage': round(travel_time_pct, 1),
-            'admin_time_percentage': round(admin_time_pct, 1),
-            'efficiency_rating': efficiency_rating
+        try:
+            files_stat = stat_data_files()
+        except OSError as e:
+            logger.warning(f"Cannot stat data files: {e}")
+            continue
+        
+        if files_stat == data_files_stat:
+            pending_stat = None
+            continue
+        
+        # Wait one more interval so a set of files being copied can settle
+        if files_stat != pending_stat:
+            pending_stat = files_stat
+            continue
+        
+        try:
+            # Parse off the event loop; the current snapshot keeps serving meanwhile
+            await asyncio.to_thread(load_data, False)
+        except Exception:
+            # Keep serving the previous snapshot, retry on the next change
+            pass
+        pending_stat = None
+
+def get_snapshot() -> AnalyticsSnapshot:
+    """Return the current analytics snapshot or fail if data is not loaded"""
+    snapshot = analytics_snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    return snapshot
+
+def get_active_workers(workers_df):
+    """Filter for active agents only"""
+    return workers_df[workers_df['activos'] == 1] if 'activos' in workers_df.columns else workers_df
+
+@span('build_store_dimension')
+def build_store_dimension(stores_df) -> StoreDimension:
+    """Build the store dimension table with store codes, chain codes and chain postings"""
+    store_ids = stores_df['id']
+    
+    # The first row wins for duplicated store ids, as in a filtered lookup
+    first_rows = np.flatnonzero(~store_ids.duplicated().to_numpy())
+    
+    chain_codes, chains = pd.factorize(stores_df['chain'])
+    chain_codes = chain_codes.astype(np.int32)
+    
+    # Postings: store codes of every chain, in stores.csv order
+    order = np.argsort(chain_codes, kind='stable')
+    boundaries = np.cumsum(np.bincount(chain_codes, minlength=len(chains)))[:-1]
+    postings = np.split(order, boundaries)
+    
+    return StoreDimension(
+        store_ids=pd.Index(store_ids.to_numpy()[first_rows]),
+        store_rows=first_rows,
+        chain_codes=chain_codes,
+        chains=np.asarray(chains, dtype=object),
+        chain_postings=MappingProxyType(dict(zip(chains, postings)))
+    )
+
+def build_worker_dimension(workers_df) -> WorkerDimension:
+    """Build the worker dimension table with the first row of every worker id"""
+    worker_ids = workers_df['worker_id']
+    first_rows = np.flatnonzero(~worker_ids.duplicated().to_numpy())
+    return WorkerDimension(
+        worker_ids=pd.Index(worker_ids.to_numpy()[first_rows]),
+        worker_rows=first_rows,
+        n_workers=len(workers_df)
+    )
+
+def encode_days(days) -> np.ndarray:
+    """Map day labels to their position in DAYS_ORDER, -1 for unknown days"""
+    day_names = days.astype(str).str.lower().map(DAY_NAME_MAPPING)
+    return pd.Categorical(day_names, categories=DAYS_ORDER).codes.astype(np.int64)
+
+def parse_day_filter(day: Optional[str]) -> Optional[int]:
+    """DAYS_ORDER position of a day filter in any spelling DAY_NAME_MAPPING knows, 400 for unknown days"""
+    if day is None:
+        return None
+    position = int(encode_days(pd.Series([day], dtype=object))[0])
+    if position < 0:
+        raise HTTPException(status_code=400, detail=f"Unknown day '{day}'")
+    return position
+
+def add_counts(counts: np.ndarray, values, *keys):
+    """counts[keys] += values for the rows whose keys are all valid (>= 0)"""
+    valid = np.logical_and.reduce([key >= 0 for key in keys])
+    values = np.broadcast_to(values, valid.shape)[valid]
+    np.add.at(counts, tuple(key[valid] for key in keys), values)
+
+def array_fields(value) -> Dict[str, Any]:
+    """The fields of a dataclass instance by name, without copying them"""
+    return {field.name: getattr(value, field.name) for field in fields(value)}
+
+def agent_code_lookup(agent_ids: np.ndarray) -> Mapping[Any, int]:
+    """Agent code of every agent id of a visit table"""
+    return MappingProxyType({agent_id: code for code, agent_id in enumerate(agent_ids.tolist())})
+
+def decode_codes(values: np.ndarray, codes: np.ndarray, missing) -> np.ndarray:
+    """values[codes] with missing where a code is -1"""
+    if len(values) == 0:
+        return np.full(len(codes), missing, dtype=object if missing is None else None)
+    decoded = values[np.maximum(codes, 0)]
+    if missing is None:
+        decoded = decoded.astype(object)
+    decoded[codes < 0] = missing
+    return decoded
+
+def smallest_code_dtype(n_values: int):
+    """Narrowest signed integer dtype holding codes 0..n_values - 1 and -1"""
+    return np.int8 if n_values <= np.iinfo(np.int8).max else np.int16 if n_values <= np.iinfo(np.int16).max else np.int32
+
+def encode_minutes(values) -> np.ndarray:
+    """Whole minutes as int16, -1 when missing, negative or beyond the int16 range"""
+    values = np.round(np.asarray(values, dtype=float))
+    valid = np.isfinite(values) & (values >= 0) & (values <= np.iinfo(np.int16).max)
+    return np.where(valid, values, -1).astype(np.int16)
+
+def format_clock_column(minutes: np.ndarray) -> np.ndarray:
+    """'HH:MM' clock times of minutes since midnight, None for -1"""
+    codes, uniques = pd.factorize(minutes)
+    labels = np.array([format_clock_minutes(value) if value >= 0 else None for value in uniques.tolist()], dtype=object)
+    return decode_codes(labels, codes, None)
+
+@span('build_visit_table')
+def build_visit_table(df, store_dimension: StoreDimension, worker_dimension: WorkerDimension) -> VisitTable:
+    """Encode a routing file frame as a VisitTable sorted by route"""
+    def column(name):
+        return df[name] if name in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    
+    agent_codes, agent_ids = pd.factorize(column('worker_id'))
+    day_codes, day_labels = pd.factorize(column('day'))
+    n_visits = len(df)
+    location_codes, locations = pd.factorize(np.r_[column('store_id_origin').to_numpy(dtype=object), column('store_id_destination').to_numpy(dtype=object)])
+    origin_codes, destination_codes = location_codes[:n_visits], location_codes[n_visits:]
+    
+    # Routes in order of their agent's first appearance, then of their own first appearance
+    rows = np.flatnonzero((agent_codes >= 0) & (day_codes >= 0))
+    _, route_codes = np.unique(agent_codes[rows].astype(np.int64) * max(len(day_labels), 1) + day_codes[rows], return_inverse=True)
+    first_rows = np.full(route_codes.max() + 1 if len(rows) else 0, n_visits)
+    np.minimum.at(first_rows, route_codes, rows)
+    route_codes = np.argsort(np.argsort(first_rows, kind='stable'), kind='stable')[route_codes]
+    order = np.r_[rows[np.lexsort((rows, route_codes, agent_codes[rows]))], np.flatnonzero((agent_codes < 0) | (day_codes < 0))]
+    
+    # Descriptive columns are kept once per agent and location, from their first row
+    names = column('name').to_numpy(dtype=object)
+    agent_first_rows = np.full(len(agent_ids), n_visits)
+    np.minimum.at(agent_first_rows, agent_codes[agent_codes >= 0], np.flatnonzero(agent_codes >= 0))
+    known_destinations = destination_codes >= 0
+    location_first_rows = np.full(len(locations), -1)
+    location_first_rows[destination_codes[known_destinations][::-1]] = np.flatnonzero(known_destinations)[::-1]
+    has_destination_row = location_first_rows >= 0
+    location_names = np.full(len(locations), None, dtype=object)
+    location_names[has_destination_row] = column('store_destination_name').to_numpy(dtype=object)[location_first_rows[has_destination_row]]
+    location_sales = np.full(len(locations), np.nan)
+    location_sales[has_destination_row] = pd.to_numeric(column('sales'), errors='coerce').to_numpy(dtype=float)[location_first_rows[has_destination_row]]
+    
+    return VisitTable(
+        agent_ids=np.asarray(agent_ids, dtype=object),
+        agent_names=names[agent_first_rows] if len(agent_ids) else np.array([], dtype=object),
+        agent_rows=worker_dimension.encode_worker_ids(agent_ids),
+        day_labels=np.asarray(day_labels, dtype=object),
+        day_positions=encode_days(pd.Series(day_labels, dtype=object)),
+        locations=np.asarray(locations, dtype=object),
+        location_names=location_names,
+        location_sales=location_sales,
+        location_store_codes=store_dimension.encode_store_ids(locations),
+        agent_codes=agent_codes[order].astype(np.int32),
+        day_codes=day_codes[order].astype(smallest_code_dtype(len(day_labels))),
+        origin_codes=origin_codes[order].astype(np.int32),
+        destination_codes=destination_codes[order].astype(np.int32),
+        arrival_minutes=encode_minutes(parse_clock_minutes(column('arrival_time'))[order]),
+        departure_minutes=encode_minutes(parse_clock_minutes(column('departure_time'))[order]),
+        service_min=encode_minutes(pd.to_numeric(column('service_min'), errors='coerce').to_numpy(dtype=float)[order]),
+        trip_time=encode_minutes(pd.to_numeric(column('trip_time'), errors='coerce').to_numpy(dtype=float)[order]),
+        routed=len(rows)
+    )
+
+@span('build_visit_aggregates')
+def build_visit_aggregates(store_dimension: StoreDimension, worker_dimension: WorkerDimension, visits: VisitTable) -> VisitAggregates:
+    """Build the visit counters of a scenario"""
+    aggregates = VisitAggregates(store_dimension, worker_dimension)
+    aggregates.insert(visits)
+    return aggregates
+
+def load_scenario_arrays(shared_dir: Optional[str], kind: str, scenario_hash: Optional[str], build) -> Dict[str, np.ndarray]:
+    """Named arrays of one scenario, built once for all worker processes when they share a directory"""
+    if scenario_hash is None:
+        return build()
+    return load_shared_arrays(shared_dir, f"{kind}-{scenario_hash[:24]}", build)
+
+def load_visit_table(shared_dir: Optional[str], scenario_hash: Optional[str], routes_df, store_dimension: StoreDimension,
+                     worker_dimension: WorkerDimension) -> VisitTable:
+    """Visit table of a scenario, encoded once for all worker processes when they share a directory"""
+    arrays = load_scenario_arrays(
+        shared_dir, 'visits', scenario_hash, lambda: build_visit_table(routes_df, store_dimension, worker_dimension).to_arrays()
+    )
+    return VisitTable.from_arrays(arrays)
+
+def load_visit_aggregates(registry, visits: VisitTable, scenario_hash: Optional[str]) -> VisitAggregates:
+    """Visit counters of a scenario, built once for all worker processes when they share a directory"""
+    store_dimension, worker_dimension = registry.store_dimension, registry.worker_dimension
+    if registry.shared_dir is None or scenario_hash is None:
+        return build_visit_aggregates(store_dimension, worker_dimension, visits)
+    
+    arrays = load_scenario_arrays(
+        registry.shared_dir, 'aggregates', scenario_hash,
+        lambda: build_visit_aggregates(store_dimension, worker_dimension, visits).to_arrays()
+    )
+    return VisitAggregates.from_arrays(store_dimension, worker_dimension, arrays)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km, vectorized over numpy arrays"""
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def build_grid_index(latitudes, longitudes, points_per_cell: int = GRID_POINTS_PER_CELL) -> GridIndex:
+    """Build a grid index sized for about points_per_cell points per cell"""
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    ids = np.flatnonzero(np.isfinite(latitudes) & np.isfinite(longitudes))
+    lat, lon = latitudes[ids], longitudes[ids]
+    
+    if len(ids) == 0:
+        return GridIndex(ids, lat, lon, np.zeros(2, dtype=int), 0.0, 0.0, 1.0, 1, 1)
+    
+    min_lat, min_lon = lat.min(), lon.min()
+    extent_lat = max(lat.max() - min_lat, 1e-6)
+    extent_lon = max(lon.max() - min_lon, 1e-6)
+    target_cells = max(1, len(ids) // points_per_cell)
+    
+    # Square cells; never more cells along one side than target cells
+    cell_deg = max(np.sqrt(extent_lat * extent_lon / target_cells), max(extent_lat, extent_lon) / target_cells)
+    n_rows = int(extent_lat // cell_deg) + 1
+    n_cols = int(extent_lon // cell_deg) + 1
+    
+    cells = ((lat - min_lat) // cell_deg).astype(np.int64) * n_cols + ((lon - min_lon) // cell_deg).astype(np.int64)
+    order = np.argsort(cells, kind='stable')
+    
+    return GridIndex(
+        ids=ids[order],
+        latitudes=lat[order],
+        longitudes=lon[order],
+        cell_offsets=np.searchsorted(cells[order], np.arange(n_rows * n_cols + 1)),
+        min_lat=float(min_lat),
+        min_lon=float(min_lon),
+        cell_deg=float(cell_deg),
+        n_rows=n_rows,
+        n_cols=n_cols
+    )
+
+def grid_bbox(grid: GridIndex, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+    """Positions (into the grid's sorted arrays) of the points inside a bounding box"""
+    if len(grid.ids) == 0 or min_lat > max_lat or min_lon > max_lon:
+        return np.array([], dtype=int)
+    
+    def cell_range(low, high, origin, n):
+        first = int(np.clip((low - origin) // grid.cell_deg, 0, n - 1))
+        last = int(np.clip((high - origin) // grid.cell_deg, 0, n - 1))
+        return first, last
+    
+    first_row, last_row = cell_range(min_lat, max_lat, grid.min_lat, grid.n_rows)
+    first_col, last_col = cell_range(min_lon, max_lon, grid.min_lon, grid.n_cols)
+    
+    # One contiguous slice of points per grid row
+    candidates = np.concatenate([
+        np.arange(grid.cell_offsets[row * grid.n_cols + first_col], grid.cell_offsets[row * grid.n_cols + last_col + 1])
+        for row in range(first_row, last_row + 1)
+    ])
+    
+    lat, lon = grid.latitudes[candidates], grid.longitudes[candidates]
+    inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+    return candidates[inside]
+
+def grid_radius(grid: GridIndex, lat: float, lon: float, radius_km: float):
+    """Positions and distances of the points within radius_km, nearest first"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(np.cos(np.radians(lat)), 1e-6))
+    candidates = grid_bbox(grid, lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+    
+    distances = haversine_km(lat, lon, grid.latitudes[candidates], grid.longitudes[candidates])
+    within = distances <= radius_km
+    candidates, distances = candidates[within], distances[within]
+    
+    order = np.argsort(distances, kind='stable')
+    return candidates[order], distances[order]
+
+def grid_nearest(grid: GridIndex, lat: float, lon: float, k: int):
+    """Positions and distances of the k nearest points, nearest first"""
+    # Grow the search radius until it holds k points or spans the whole globe
+    radius_km = grid.cell_deg * KM_PER_DEGREE
+    while True:
+        positions, distances = grid_radius(grid, lat, lon, radius_km)
+        if len(positions) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+            return positions[:k], distances[:k]
+        radius_km *= 2
+
+def mercator_xy(latitudes, longitudes):
+    """Web mercator coordinates of lat/lon points, both in [0, 1)"""
+    latitudes = np.radians(np.clip(latitudes, -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+    x = (np.asarray(longitudes, dtype=float) + 180) / 360
+    y = (1 - np.log(np.tan(latitudes) + 1 / np.cos(latitudes)) / np.pi) / 2
+    return np.clip(x, 0, np.nextafter(1, 0)), np.clip(y, 0, np.nextafter(1, 0))
+
+def cluster_level_width(zoom: int) -> int:
+    """Cells per axis of the cluster grid at a zoom level"""
+    return (256 << zoom) // CLUSTER_CELL_PX
+
+def roll_up_cluster_level(zoom: int, parent_keys, level_values: Dict[str, np.ndarray], chains):
+    """Group cluster (or store) values by parent cell key into a ClusterLevel"""
+    keys, inverse = np.unique(parent_keys, return_inverse=True)
+    n_clusters = len(keys)
+    
+    def total(values):
+        return np.bincount(inverse, weights=values, minlength=n_clusters)
+    
+    store_codes = np.full(n_clusters, np.iinfo(np.int64).max)
+    np.minimum.at(store_codes, inverse, level_values['store_codes'])
+    
+    # Chain mix: sum (cluster, chain) counts over the parent clusters
+    chain_owner, chain_codes, chain_counts = chains
+    n_chains = int(chain_codes.max()) + 1 if len(chain_codes) else 1
+    chain_keys, chain_inverse = np.unique(inverse[chain_owner] * n_chains + chain_codes, return_inverse=True)
+    
+    return ClusterLevel(
+        zoom=zoom,
+        width=cluster_level_width(zoom),
+        keys=keys,
+        counts=total(level_values['counts']).astype(np.int64),
+        sales=total(level_values['sales']).astype(np.int64),
+        latitude_sums=total(level_values['latitude_sums']),
+        longitude_sums=total(level_values['longitude_sums']),
+        total_min_weekly_visits=total(level_values['total_min_weekly_visits']).astype(np.int64),
+        total_max_weekly_visits=total(level_values['total_max_weekly_visits']).astype(np.int64),
+        store_codes=store_codes,
+        chain_offsets=np.searchsorted(chain_keys // n_chains, np.arange(n_clusters + 1)),
+        chain_codes=chain_keys % n_chains,
+        chain_counts=np.bincount(chain_inverse, weights=chain_counts).astype(np.int64)
+    )
+
+@span('build_store_cluster_levels')
+def build_store_cluster_levels(stores_df, store_dimension) -> List[ClusterLevel]:
+    """Cluster stores for every zoom level, rolling each level up from the next finer one"""
+    latitudes = stores_df['latitude'].to_numpy(dtype=float)
+    longitudes = stores_df['longitude'].to_numpy(dtype=float)
+    store_codes = np.flatnonzero(np.isfinite(latitudes) & np.isfinite(longitudes))
+    
+    x, y = mercator_xy(latitudes[store_codes], longitudes[store_codes])
+    width = cluster_level_width(MAX_CLUSTER_ZOOM)
+    cell_x = (x * width).astype(np.int64)
+    cell_y = (y * width).astype(np.int64)
+    
+    # Finest level: one entry per store
+    level_values = {
+        'counts': np.ones(len(store_codes)),
+        'sales': np.nan_to_num(pd.to_numeric(stores_df['sales'], errors='coerce').to_numpy(dtype=float)[store_codes]),
+        'latitude_sums': latitudes[store_codes],
+        'longitude_sums': longitudes[store_codes],
+        'total_min_weekly_visits': stores_df['min_weekly_visits'].to_numpy(dtype=float)[store_codes],
+        'total_max_weekly_visits': stores_df['max_weekly_visits'].to_numpy(dtype=float)[store_codes],
+        'store_codes': store_codes
+    }
+    chains = (np.arange(len(store_codes)), store_dimension.chain_codes[store_codes].astype(np.int64), np.ones(len(store_codes)))
+    
+    levels = []
+    for zoom in range(MAX_CLUSTER_ZOOM, -1, -1):
+        shift = MAX_CLUSTER_ZOOM - zoom
+        parent_keys = (cell_y >> shift) * cluster_level_width(zoom) + (cell_x >> shift)
+        level = roll_up_cluster_level(zoom, parent_keys, level_values, chains)
+        levels.append(level)
+        
+        # The next coarser level rolls up this level's clusters
+        cell_y, cell_x = np.divmod(level.keys, level.width)
+        cell_y, cell_x = cell_y << shift, cell_x << shift
+        level_values = {name: getattr(level, name) for name in level_values}
+        chains = (
+            np.repeat(np.arange(len(level.keys)), np.diff(level.chain_offsets)),
+            level.chain_codes,
+            level.chain_counts
+        )
+    
+    return levels[::-1]
+
+def select_clusters(level: ClusterLevel, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+    """Cluster positions whose cell intersects a bounding box"""
+    if min_lat > max_lat or min_lon > max_lon or len(level.keys) == 0:
+        return np.array([], dtype=int)
+    
+    (x0, x1), (y1, y0) = mercator_xy(np.array([max_lat, min_lat]), np.array([min_lon, max_lon]))
+    x0, x1, y0, y1 = (int(v * level.width) for v in (x0, x1, y1, y0))
+    
+    if y1 - y0 + 1 > len(level.keys):
+        # Tall viewport over few clusters: a scan is cheaper than a range per row
+        cell_y, cell_x = np.divmod(level.keys, level.width)
+        return np.flatnonzero((cell_y >= y0) & (cell_y <= y1) & (cell_x >= x0) & (cell_x <= x1))
+    
+    row_keys = np.arange(y0, y1 + 1) * level.width
+    starts = np.searchsorted(level.keys, row_keys + x0)
+    ends = np.searchsorted(level.keys, row_keys + x1 + 1)
+    return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+def get_store_clusters_data(snapshot, level: ClusterLevel, positions) -> List[Dict[str, Any]]:
+    """Cluster payloads with centroid, totals and chain mix (largest chain first)"""
+    chains = snapshot.store_dimension.chains
+    store_ids = snapshot.stores_df['id'].to_numpy()
+    clusters = []
+    
+    for c in positions:
+        chain_slice = slice(level.chain_offsets[c], level.chain_offsets[c + 1])
+        chain_order = np.argsort(-level.chain_counts[chain_slice], kind='stable')
+        count = int(level.counts[c])
+        
+        clusters.append({
+            'latitude': level.latitude_sums[c] / count,
+            'longitude': level.longitude_sums[c] / count,
+            'count': count,
+            'sales': int(level.sales[c]),
+            'total_min_weekly_visits': int(level.total_min_weekly_visits[c]),
+            'total_max_weekly_visits': int(level.total_max_weekly_visits[c]),
+            'chains': [
+                {'chain': chains[code], 'count': int(chain_count)}
+                for code, chain_count in zip(level.chain_codes[chain_slice][chain_order], level.chain_counts[chain_slice][chain_order])
+            ],
+            'store_id': store_ids[level.store_codes[c]] if count == 1 else None
         })
     
-    return agent_performance
+    return clusters
 
-def get_store_chain_analysis():
-    """Get coverage analysis by retail chain"""
-    # Extract chain names
-    stores_df['chain'] = stores_df['store'].str.split(',').str[0]
+@span('compute_agent_aggregates')
+def compute_agent_aggregates(workers_df, before: Optional[VisitAggregates], after: VisitAggregates):
+    """Gather visits, service and travel time of all active agents from the visit counters.
+
+    before is the "before" scenario and may be None when only one scenario is analyzed.
+    """
+    active_workers = get_active_workers(workers_df)
+    agent_codes = after.encode_agent_ids(active_workers['worker_id'])
+    
+    def per_agent(counts):
+        return np.where(agent_codes >= 0, counts[agent_codes], 0)
+    
+    agents = pd.DataFrame({
+        'agent_id': active_workers['worker_id'].to_numpy(),
+        'name': active_workers['name'].to_numpy()
+    })
+    agents['visits_before'] = per_agent(before.agent_visits) if before is not None else 0
+    agents['visits_after'] = per_agent(after.agent_visits)
+    agents['service_min'] = per_agent(after.agent_service_min)
+    agents['trip_time'] = per_agent(after.agent_trip_time)
+    
+    # Calculate efficiency gain (positive when Utomata is better)
+    visits_before = agents['visits_before'].to_numpy()
+    visits_after = agents['visits_after'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        agents['efficiency_gain'] = np.where(
+            visits_before > 0, (visits_after - visits_before) / visits_before * 100, 0.0
+        )
+    
+    # Calculate time percentages (simplified calculation)
+    service_time = agents['service_min'].to_numpy(dtype=float)
+    travel_time = agents['trip_time'].to_numpy(dtype=float)
+    total_time = service_time + travel_time
+    has_time = (visits_after > 0) & (total_time > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        store_time_pct = np.where(has_time, service_time / total_time * 100, 0.0)
+        travel_time_pct = np.where(has_time, travel_time / total_time * 100, 0.0)
+    agents['store_time_percentage'] = store_time_pct
+    agents['travel_time_percentage'] = travel_time_pct
+    agents['admin_time_percentage'] = np.where(has_time, 100 - store_time_pct - travel_time_pct, 0.0)
+    
+    # Determine efficiency rating
+    agents['efficiency_rating'] = np.select(
+        [visits_after >= 15, visits_after >= 12, visits_after >= 8],
+        ["Excellent", "Good", "Average"],
+        default="Below Average"
+    )
+    
+    return agents
+
+def analyze_agent_workload(agent_aggregates):
+    """Analyze agent workload distribution and efficiency"""
+    return [
+        {
+            'agent_id': agent.agent_id,
+            'name': agent.name,
+            'visits_before': int(agent.visits_before),
+            'visits_after': int(agent.visits_after),
+            'efficiency_gain': float(agent.efficiency_gain)
+        }
+        for agent in agent_aggregates.itertuples(index=False)
+    ]
+
+@span('analyze_store_performance')
+def analyze_store_performance(stores_df, before: VisitAggregates, after: VisitAggregates):
+    """Analyze store performance comparison between manual and optimized processes"""
+    # Duplicated store ids share the visits of their first row
+    store_codes = before.store_dimension.encode_store_ids(stores_df['id'])
+    
+    store_stats = []
+    # Iterate through ALL stores in the system, not just those with visits
+    for store_id, name, chain, sales, visits_before, visits_after in zip(
+        stores_df['id'], stores_df['store'], stores_df['chain'], stores_df['sales'],
+        before.store_visits[store_codes].tolist(), after.store_visits[store_codes].tolist()
+    ):
+        store_stats.append({
+            'store_id': store_id,
+            'name': name,
+            'chain': chain,
+            'sales': int(sales),
+            'visits_before': visits_before,
+            'visits_after': visits_after,
+            'visit_change': visits_after - visits_before
+        })
+    
+    # Sort by sales descending to show most important stores first
+    store_stats.sort(key=lambda x: x['sales'], reverse=True)
+    
+    return store_stats
+
+def get_daily_visit_comparison(before: VisitAggregates, after: VisitAggregates):
+    """Get daily visit comparison between manual and optimized processes, Monday to Saturday"""
+    return [
+        {
+            'day': day_name,
+            'manual': int(before.day_visits[day]),
+            'optimized': int(after.day_visits[day])
+        }
+        for day, day_name in enumerate(DAYS_ORDER[:-1])
+    ]
+
+def get_store_chain_distribution(store_dimension):
+    """Get store count and visit distribution by retail chain"""
+    chain_store_counts = np.bincount(store_dimension.chain_codes, minlength=len(store_dimension.chains))
+    total_stores = len(store_dimension.chain_codes)
+    
+    chains = []
+    # Chains sorted by name, as a group-by on the chain column would return them
+    for chain_code in np.argsort(store_dimension.chains, kind='stable'):
+        percentage = (chain_store_counts[chain_code] / total_stores) * 100
+        chains.append({
+            'chain': store_dimension.chains[chain_code],
+            'count': int(chain_store_counts[chain_code]),
+            'percentage': round(percentage, 1)
+        })
     
-    # Count visits per chain
-    chain_visits = {}
-    for _, visit in result_df.iterrows():
-        store_id = visit['store_id_destination']
-        if store_id in stores_df['id'].values:
-            chain = stores_df[stores_df['id'] == store_id]['chain'].iloc[0]
-            chain_visits[chain] = chain_visits.get(chain, 0) + 1
+    return chains
+
+def get_agent_performance_metrics(agent_aggregates):
+    """Get detailed performance metrics for each field agent"""
+    return [
+        {
+            'agent_id': agent.agent_id,
+            'name': agent.name,
+            'weekly_visits': int(agent.visits_after),
+            'store_time_percentage': round(float(agent.store_time_percentage), 1),
+            'travel_time_percentage': round(float(agent.travel_time_percentage), 1),
+            'admin_time_percentage': round(float(agent.admin_time_percentage), 1),
+            'efficiency_rating': agent.efficiency_rating
+        }
+        for agent in agent_aggregates.itertuples(index=False)
+    ]
+
+def get_store_chain_analysis(store_dimension, aggregates: VisitAggregates):
+    """Get coverage analysis by retail chain"""
+    chain_store_counts = np.bincount(store_dimension.chain_codes, minlength=len(store_dimension.chains))
     
     chains = []
-    for chain in stores_df['chain'].unique():
-        store_count = len(stores_df[stores_df['chain'] == chain])
-        weekly_visits = chain_visits.get(chain, 0)
+    for chain_code, chain in enumerate(store_dimension.chains):
+        store_count = int(chain_store_counts[chain_code])
+        weekly_visits = int(aggregates.chain_visits[chain_code])
         coverage_ratio = weekly_visits / store_count if store_count > 0 else 0
         
         chains.append({
@@ -436,19 +2392,16 @@ def get_store_chain_analysis():
     
     return chains
 
-def get_top_stores_by_volume():
+def get_top_stores_by_volume(stores_df, aggregates: VisitAggregates):
     """Get top 10 stores by sales volume with visit information"""
-    # Count visits per store
-    store_visits = result_df['store_id_destination'].value_counts().to_dict()
-    
     # Get top 10 stores by sales
     top_stores = stores_df.nlargest(10, 'sales')
+    store_visits = aggregates.store_visits[aggregates.store_dimension.encode_store_ids(top_stores['id'])]
     
     # Build analysis
     top_stores_analysis = []
-    for _, store in top_stores.iterrows():
+    for (_, store), weekly_visits in zip(top_stores.iterrows(), store_visits.tolist()):
         store_id = store['id']
-        weekly_visits = store_visits.get(store_id, 0)
         
         # Calculate coverage status
         min_visits = store['min_weekly_visits']
@@ -462,33 +2415,148 @@ def get_top_stores_by_volume():
             'min_weekly_visits': int(min_visits),
             'max_weekly_visits': int(store['max_weekly_visits']),
             'coverage_status': coverage_status,
-            'chain': store['store'].split(',')[0] if ',' in store['store'] else store['store']
+            'chain': store['chain']
         })
     
     return top_stores_analysis
 
-def get_visit_time_distribution():
-    """Get hourly distribution of store visits"""
-    hourly_counts = {}
-    
-    for _, visit in result_df.iterrows():
-        arrival_time = visit['arrival_time']
-        hour = arrival_time.split(':')[0] + ':00'
-        hourly_counts[hour] = hourly_counts.get(hour, 0) + 1
+def build_store_details(stores_df, store_codes, store_day_visits):
+    """Build store detail rows with daily visit schedule, sorted by sales descending"""
+    def values(name):
+        return stores_df[name].to_numpy()[store_codes]
     
-    # Sort by hour
-    sorted_hours = sorted(hourly_counts.keys())
+    store_ids, names, sales = values('id'), values('store'), values('sales')
+    min_weekly_visits, max_weekly_visits = values('min_weekly_visits'), values('max_weekly_visits')
+    latitudes, longitudes = values('latitude'), values('longitude')
+    weekly_visits = store_day_visits.sum(axis=1)
     
-    hourly_distribution = []
-    for hour in sorted_hours:
-        hourly_distribution.append({
-            'hour': hour,
-            'visit_count': hourly_counts[hour]
+    stores_detail = []
+    # Sort by sales descending
+    for i in np.argsort(-sales, kind='stable'):
+        stores_detail.append({
+            'store_id': store_ids[i],
+            'name': names[i],
+            'sales': int(sales[i]),
+            'weekly_visits': int(weekly_visits[i]),
+            'min_weekly_visits': int(min_weekly_visits[i]),
+            'max_weekly_visits': int(max_weekly_visits[i]),
+            'coverage_status': 'Óptima' if weekly_visits[i] >= min_weekly_visits[i] else 'Insuficiente',
+            'daily_visits': dict(zip(DAYS_ORDER, store_day_visits[i].tolist())),
+            'latitude': float(latitudes[i]),
+            'longitude': float(longitudes[i])
         })
     
-    return hourly_distribution
+    return stores_detail
+
+@span('get_chain_stores_data')
+def get_chain_stores_data(stores_df, store_dimension, aggregates: VisitAggregates):
+    """Get detailed store information for every chain with daily visit schedule"""
+    chain_stores = {}
+    for chain_name, store_codes in store_dimension.chain_postings.items():
+        stores_detail = build_store_details(stores_df, store_codes, aggregates.store_day_visits[store_codes])
+        chain_stores[chain_name] = {
+            'chain': chain_name,
+            'total_stores': len(stores_detail),
+            'stores': stores_detail
+        }
+    
+    return chain_stores
+
+@span('get_agent_stores_data')
+def get_agent_stores_data(stores_df, store_dimension, workers_df, visits: VisitTable):
+    """Get detailed store information for every agent with daily visit schedule"""
+    agent_stores = {}
+    agent_codes = {agent_id: code for code, agent_id in enumerate(visits.agent_ids.tolist())}
+    
+    # Visits per (agent, store) pair, pairs sorted by agent code and then stores.csv order
+    n_stores, n_days = len(store_dimension.chain_codes), len(DAYS_ORDER)
+    store_codes, days = visits.store_codes(), visits.days()
+    known = (visits.agent_codes >= 0) & (store_codes >= 0)
+    pairs, pair_codes = np.unique(visits.agent_codes[known].astype(np.int64) * n_stores + store_codes[known], return_inverse=True)
+    dated = days[known] >= 0
+    pair_day_visits = np.bincount(
+        pair_codes[dated] * n_days + days[known][dated], minlength=len(pairs) * n_days
+    ).reshape(len(pairs), n_days)
+    pair_offsets = np.searchsorted(pairs // max(n_stores, 1), np.arange(len(visits.agent_ids) + 1))
+    
+    # The first worker with a given name wins, as in a name lookup
+    for agent_name, worker_id in zip(workers_df['name'], workers_df['worker_id']):
+        if agent_name in agent_stores or worker_id not in agent_codes:
+            continue
+        
+        start, end = pair_offsets[agent_codes[worker_id]], pair_offsets[agent_codes[worker_id] + 1]
+        stores_detail = build_store_details(stores_df, pairs[start:end] % n_stores, pair_day_visits[start:end])
+        agent_stores[agent_name] = {
+            'agent': agent_name,
+            'total_stores': len(stores_detail),
+            'stores': stores_detail
+        }
+    
+    return agent_stores
+
+def get_visit_time_distribution(aggregates: VisitAggregates):
+    """Get hourly distribution of store visits by arrival hour"""
+    return [
+        {'hour': f"{hour:02d}:00", 'visit_count': int(visit_count)}
+        for hour, visit_count in enumerate(aggregates.hour_visits) if visit_count > 0
+    ]
+
+def select_visit_rows(route_index: RouteIndex, agent_id: Optional[str] = None, day: Optional[int] = None) -> np.ndarray:
+    """Visit table rows matching the optional agent and day (DAYS_ORDER position) filters, in table order"""
+    visits = route_index.visits
+    if agent_id is None and day is None:
+        return np.arange(len(visits))
+    
+    routes = select_routes(route_index, agent_id, day)
+    starts, sizes = route_index.offsets[routes], np.diff(route_index.offsets)[routes]
+    rows = np.arange(sizes.sum()) + np.repeat(starts - np.cumsum(sizes) + sizes, sizes)
+    
+    # Visits of the agent without a day belong to no route
+    if day is None and agent_id in route_index.agent_codes:
+        unrouted = np.flatnonzero(visits.agent_codes[visits.routed:] == route_index.agent_codes[agent_id]) + visits.routed
+        rows = np.r_[rows, unrouted]
+    return rows
+
+@span('get_visit_time_histogram')
+def get_visit_time_histogram(route_index: RouteIndex, store_dimension: StoreDimension, bin_minutes: int,
+                             agent_id: Optional[str] = None, chain: Optional[str] = None, day: Optional[int] = None):
+    """Visit arrivals and agents on site per time-of-day bin, summed over the selected days.
+
+    Occupancy is counted per minute from a difference array of arrivals (+1) and
+    departures (-1), then averaged and maximized over each bin. Visits without a
+    valid arrival or departure time within the day are left out.
+    """
+    visits = route_index.visits
+    rows = select_visit_rows(route_index, agent_id, day)
+    if chain is not None:
+        chain_code = np.flatnonzero(store_dimension.chains == chain)
+        store_codes = visits.store_codes(rows)
+        known = store_codes >= 0
+        in_chain = np.zeros(len(rows), dtype=bool)
+        in_chain[known] = np.isin(store_dimension.chain_codes[store_codes[known]], chain_code)
+        rows = rows[in_chain]
+    
+    arrival = visits.arrival_minutes[rows].astype(np.int64)
+    departure = visits.departure_minutes[rows].astype(np.int64)
+    started = (arrival >= 0) & (arrival < MINUTES_PER_DAY)
+    n_bins = MINUTES_PER_DAY // bin_minutes
+    arrivals = np.bincount(arrival[started] // bin_minutes, minlength=n_bins)
+    
+    on_site = started & (departure > arrival)
+    changes = np.bincount(arrival[on_site], minlength=MINUTES_PER_DAY + 1)
+    changes -= np.bincount(np.minimum(departure[on_site], MINUTES_PER_DAY), minlength=MINUTES_PER_DAY + 1)
+    occupancy = np.cumsum(changes)[:MINUTES_PER_DAY].reshape(n_bins, bin_minutes)
+    
+    return {
+        'bin_minutes': bin_minutes,
+        'visits': int(arrivals.sum()),
+        'bins': [
+            {'start': format_clock_minutes(i * bin_minutes), 'visits': count, 'average_on_site': round(average, 2), 'peak_on_site': peak}
+            for i, (count, average, peak) in enumerate(zip(arrivals.tolist(), occupancy.mean(axis=1).tolist(), occupancy.max(axis=1).tolist()))
+        ]
+    }
 
-def get_stores_data():
+def get_stores_data(stores_df):
     """Get all store locations with metadata"""
     stores = []
     
@@ -499,24 +2567,23 @@ def get_stores_data():
             'sales': store['sales'],
             'latitude': store['latitude'],
             'longitude': store['longitude'],
-            'chain': store['store'].split(',')[0],
+            'chain': store['chain'],
             'min_weekly_visits': store['min_weekly_visits'],
             'max_weekly_visits': store['max_weekly_visits']
         })
     
     return stores
 
-def get_agents_data():
+def get_agents_data(workers_df, agent_aggregates):
     """Get all field agent locations and assignments"""
     agents = []
     
-    # Filter for active agents only
-    active_workers = workers_df[workers_df['activos'] == 1] if 'activos' in workers_df.columns else workers_df
+    # Visits per active agent, in the same order as the active workers
+    visit_counts = agent_aggregates['visits_after'].to_numpy()
     
-    for _, worker in active_workers.iterrows():
+    for (_, worker), visit_count in zip(get_active_workers(workers_df).iterrows(), visit_counts):
         # Get assigned routes (simplified - just count visits)
-        agent_visits = result_df[result_df['worker_id'] == worker['worker_id']]
-        assigned_routes = [f"route_{i+1}" for i in range(len(agent_visits))]
+        assigned_routes = [f"route_{i+1}" for i in range(visit_count)]
         
         agents.append({
             'agent_id': worker['worker_id'],
@@ -528,59 +2595,671 @@ def get_agents_data():
     
     return agents
 
-def get_routes_data(process_type: str):
-    """Get route data for visualization (manual or optimized)"""
-    if process_type == "manual":
-        df = manual_df
-    elif process_type == "optimized":
-        df = result_df
-    else:
-        raise ValueError("process_type must be 'manual' or 'optimized'")
+@span('build_route_index')
+def build_route_index(visits: VisitTable) -> RouteIndex:
+    """Index the route boundaries of a scenario's visit table"""
+    agent_ids = visits.agent_ids
+    agent_codes, day_codes = visits.agent_codes[:visits.routed], visits.day_codes[:visits.routed]
     
-    routes = []
+    # Visits without agent or day are past the routed rows and belong to no route
+    changes = (agent_codes[1:] != agent_codes[:-1]) | (day_codes[1:] != day_codes[:-1])
+    starts = np.flatnonzero(np.r_[True, changes]) if visits.routed else np.array([], dtype=int)
+    route_agents = agent_codes[starts].astype(np.int64)
+    route_day_codes = day_codes[starts]
+    route_day_positions = visits.day_positions[route_day_codes]
     
-    for agent_id in df['worker_id'].unique():
-        agent_routes = df[df['worker_id'] == agent_id]
-        
-        for day in agent_routes['day'].unique():
-            day_routes = agent_routes[agent_routes['day'] == day]
-            
-            visits = []
-            for _, visit in day_routes.iterrows():
-                visits.append({
-                    'store_id': visit['store_id_destination'],
-                    'arrival_time': visit['arrival_time'],
-                    'departure_time': visit['departure_time'],
-                    'service_duration': visit['service_min'],
-                    'travel_time': visit['trip_time']
-                })
-            
-            routes.append({
-                'agent_id': agent_id,
-                'day': day,
-                'visits': visits
-            })
+    # Routes of every day in route order; unknown days sort last, past the day offsets
+    day_keys = np.where(route_day_positions >= 0, route_day_positions, len(DAYS_ORDER))
+    day_routes = np.argsort(day_keys, kind='stable')
     
-    return routes
+    return RouteIndex(
+        agent_ids=agent_ids,
+        agent_codes=agent_code_lookup(agent_ids),
+        agent_offsets=np.searchsorted(route_agents, np.arange(len(agent_ids) + 1)),
+        route_agents=route_agents,
+        route_day_codes=route_day_codes,
+        route_day_positions=route_day_positions,
+        day_offsets=np.searchsorted(day_keys[day_routes], np.arange(len(DAYS_ORDER) + 1)),
+        day_routes=day_routes,
+        offsets=np.r_[starts, visits.routed],
+        visits=visits
+    )
 
-def get_agent_time_distribution_data():
-    """Calculate agent time distribution based on real data from active agents only"""
-    if result_df is None or workers_df is None:
-        return []
+def get_route_data(route_index: RouteIndex, route: int):
+    """Get one route (agent, day and its visits) from the route index"""
+    start, end = route_index.offsets[route], route_index.offsets[route + 1]
+    table, rows = route_index.visits, slice(start, end)
+    visits = [
+        {
+            'store_id': store_id,
+            'arrival_time': arrival_time,
+            'departure_time': departure_time,
+            'service_duration': service_duration,
+            'travel_time': travel_time
+        }
+        for store_id, arrival_time, departure_time, service_duration, travel_time in zip(
+            table.store_ids(rows).tolist(),
+            format_clock_column(table.arrival_minutes[rows]).tolist(),
+            format_clock_column(table.departure_minutes[rows]).tolist(),
+            decode_minutes(table.service_min[rows]),
+            decode_minutes(table.trip_time[rows])
+        )
+    ]
+    
+    return {
+        'agent_id': route_index.agent_ids[route_index.route_agents[route]],
+        'day': route_index.route_day(route),
+        'visits': visits
+    }
+
+@span('get_routes_data')
+def get_routes_data(route_index: RouteIndex):
+    """Get route data for visualization from a scenario's route index"""
+    return [get_route_data(route_index, route) for route in range(len(route_index.route_agents))]
+
+def select_routes(route_index: RouteIndex, agent_id: Optional[str] = None, day: Optional[int] = None) -> np.ndarray:
+    """Route numbers matching the optional agent and day (DAYS_ORDER position) filters, in route order"""
+    if agent_id is not None:
+        agent_code = route_index.agent_codes.get(agent_id)
+        if agent_code is None:
+            return np.array([], dtype=int)
+        routes = np.arange(route_index.agent_offsets[agent_code], route_index.agent_offsets[agent_code + 1])
+        if day is not None:
+            routes = routes[route_index.route_day_positions[routes] == day]
+        return routes
+    
+    if day is not None:
+        return route_index.day_routes[route_index.day_offsets[day]:route_index.day_offsets[day + 1]]
+    
+    return np.arange(len(route_index.route_agents))
+
+def encode_polyline_chunks(values) -> np.ndarray:
+    """Encoded polyline characters of signed integer values, and the characters per value"""
+    values = np.where(values < 0, ~(values << 1), values << 1)
+    
+    # 5 bit chunks, least significant first, all but the last flagged with 0x20
+    n_chunks = 1 + sum((values >> (5 * i)) > 0 for i in range(1, 7))
+    value_positions = np.repeat(np.arange(len(values)), n_chunks)
+    chunk_positions = np.arange(len(value_positions)) - np.repeat(np.cumsum(n_chunks) - n_chunks, n_chunks)
+    chunks = (values[value_positions] >> (5 * chunk_positions)) & 0x1f
+    chunks |= np.where(chunk_positions < n_chunks[value_positions] - 1, 0x20, 0)
+    return (chunks + 63).astype(np.uint8), n_chunks
+
+@span('build_route_geometry')
+def build_route_geometry(stores_df, workers_df, worker_dimension: WorkerDimension, route_index: RouteIndex) -> RouteGeometry:
+    """Encode every route of a scenario as a polyline from the agent's home through its stores"""
+    n_routes = len(route_index.route_agents)
+    n_visits = route_index.visits.routed
+    visit_routes = np.repeat(np.arange(n_routes), np.diff(route_index.offsets))
+    
+    # Points: every route's home followed by its visits
+    home_points = route_index.offsets[:-1] + np.arange(n_routes)
+    visit_points = np.arange(n_visits) + visit_routes + 1
+    point_routes = np.empty(n_routes + n_visits, dtype=np.int64)
+    point_routes[home_points] = np.arange(n_routes)
+    point_routes[visit_points] = visit_routes
+    latitudes = np.full(len(point_routes), np.nan)
+    longitudes = np.full(len(point_routes), np.nan)
+    
+    worker_rows = worker_dimension.encode_worker_ids(route_index.agent_ids[route_index.route_agents])
+    has_home = worker_rows >= 0
+    latitudes[home_points[has_home]] = workers_df['home_latitude'].to_numpy(dtype=float)[worker_rows[has_home]]
+    longitudes[home_points[has_home]] = workers_df['home_longitude'].to_numpy(dtype=float)[worker_rows[has_home]]
+    
+    store_codes = route_index.visits.store_codes(slice(0, n_visits))
+    known = store_codes >= 0
+    latitudes[visit_points[known]] = stores_df['latitude'].to_numpy(dtype=float)[store_codes[known]]
+    longitudes[visit_points[known]] = stores_df['longitude'].to_numpy(dtype=float)[store_codes[known]]
+    
+    # Points without coordinates are left out of the path and the legs around them
+    points = np.flatnonzero(np.isfinite(latitudes) & np.isfinite(longitudes))
+    starts_route = np.ones(len(points), dtype=bool)
+    starts_route[1:] = point_routes[points[1:]] != point_routes[points[:-1]]
+    
+    legs = haversine_km(latitudes[points[:-1]], longitudes[points[:-1]], latitudes[points[1:]], longitudes[points[1:]])
+    point_distances = np.full(len(point_routes), np.nan)
+    point_distances[points[1:][~starts_route[1:]]] = legs[~starts_route[1:]]
+    
+    # Polylines: E5 coordinates as deltas from the previous point of the route
+    e5 = np.floor(np.c_[latitudes[points], longitudes[points]] * 1e5 + 0.5).astype(np.int64)
+    deltas = e5.copy()
+    deltas[1:][~starts_route[1:]] -= e5[:-1][~starts_route[1:]]
+    polylines, n_chunks = encode_polyline_chunks(deltas.ravel())
+    route_bytes = np.bincount(point_routes[points], weights=n_chunks.reshape(-1, 2).sum(axis=1), minlength=n_routes)
+    
+    return RouteGeometry(
+        polylines=polylines,
+        polyline_offsets=np.r_[0, np.cumsum(route_bytes)].astype(np.int64),
+        leg_distances=point_distances[visit_points],
+        route_distances=np.bincount(point_routes, weights=np.nan_to_num(point_distances), minlength=n_routes)
+    )
+
+def get_route_path_data(route_index: RouteIndex, route_geometry: RouteGeometry, route: int):
+    """Get one route's encoded path and leg distances"""
+    start, end = route_index.offsets[route], route_index.offsets[route + 1]
+    legs = [
+        {'store_id': store_id, 'distance_km': None if np.isnan(distance) else round(distance, 3)}
+        for store_id, distance in zip(route_index.visits.store_ids(slice(start, end)).tolist(), route_geometry.leg_distances[start:end].tolist())
+    ]
+    
+    return {
+        'agent_id': route_index.agent_ids[route_index.route_agents[route]],
+        'day': route_index.route_day(route),
+        'encoded_path': route_geometry.polylines[route_geometry.polyline_offsets[route]:route_geometry.polyline_offsets[route + 1]].tobytes().decode('ascii'),
+        'distance_km': round(float(route_geometry.route_distances[route]), 3),
+        'legs': legs
+    }
+
+def parse_clock_minutes(values) -> np.ndarray:
+    """Minutes since midnight of 'H:MM' or 'H:MM:SS' clock times, NaN when missing or malformed"""
+    # A day has few distinct clock times; parse each once
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    parts = pd.Series(uniques, dtype=object).astype(str).str.extract(r'^\s*(\d{1,2}):(\d{2})')
+    minutes = (pd.to_numeric(parts[0], errors='coerce') * 60 + pd.to_numeric(parts[1], errors='coerce')).to_numpy(dtype=float)
+    return np.append(minutes, np.nan)[codes]
+
+def format_clock_minutes(minutes: float) -> str:
+    """'HH:MM' clock time of minutes since midnight"""
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def decode_minutes(minutes: np.ndarray) -> list:
+    """Minutes as a list of ints, None for -1"""
+    return [value if value >= 0 else None for value in minutes.tolist()]
+
+def minutes_or_nan(minutes: np.ndarray) -> np.ndarray:
+    """Minutes as floats, NaN for -1"""
+    return np.where(minutes >= 0, minutes, np.nan)
+
+def day_minutes_table(df, columns_by_day, default: float) -> np.ndarray:
+    """(rows x 7) minutes of per-day clock columns such as mon_open, missing values as default"""
+    table = np.full((len(df), len(DAYS_ORDER)), default)
+    for day, column in enumerate(columns_by_day):
+        if column in df.columns:
+            table[:, day] = np.nan_to_num(parse_clock_minutes(df[column]), nan=default)
+    return table
+
+class RouteImprover:
+    """Local search over the routes of one scenario with 2-opt, or-opt and relocate moves.
+
+    A route leaves the agent's home at the start of the agent's shift. A visit starts
+    once the agent has arrived and the store is open, keeps its duration (clamped to
+    the store's min/max_visit_duration) and should end before the store closes; the
+    last visit should end before the shift ends. Every late minute costs
+    ROUTE_LATE_MINUTE_PENALTY travel minutes, so no move trades feasibility for travel.
+    Legs seen in the scenario keep their observed trip time; other legs use a linear
+    minutes-per-km model fitted to the observed legs.
+    """
+
+    def __init__(self, snapshot: AnalyticsSnapshot, routes_df: pd.DataFrame, exclude_agents=(), exclude_stores=()):
+        self.snapshot = snapshot
+        self.routes_df = routes_df
+        stores_df, workers_df = snapshot.stores_df, snapshot.workers_df
+        self.n_stores = len(stores_df)
+        day_prefixes = [day[:3].lower() for day in DAYS_ORDER]
+        
+        self.store_open = day_minutes_table(stores_df, [f"{p}_open" for p in day_prefixes], 0)
+        self.store_close = day_minutes_table(stores_df, [f"{p}_close" for p in day_prefixes], 24 * 60)
+        self.shift_start = day_minutes_table(workers_df, [f"{p}_shift_start" for p in day_prefixes], 0)
+        self.shift_end = day_minutes_table(workers_df, [f"{p}_shift_end" for p in day_prefixes], 24 * 60)
+        self.min_duration = stores_df['min_visit_duration'].to_numpy(dtype=float) if 'min_visit_duration' in stores_df.columns else np.zeros(self.n_stores)
+        self.max_duration = stores_df['max_visit_duration'].to_numpy(dtype=float) if 'max_visit_duration' in stores_df.columns else np.full(self.n_stores, np.inf)
+        
+        # Distance matrix points: store codes, then n_stores + workers_df row for homes
+        self.latitudes = np.r_[stores_df['latitude'].to_numpy(dtype=float), workers_df['home_latitude'].to_numpy(dtype=float)]
+        self.longitudes = np.r_[stores_df['longitude'].to_numpy(dtype=float), workers_df['home_longitude'].to_numpy(dtype=float)]
+        worker_dimension = snapshot.worker_dimension
+        self.worker_rows = dict(zip(worker_dimension.worker_ids.tolist(), worker_dimension.worker_rows.tolist()))
+        self.excluded_agents = set(exclude_agents)
+        self.excluded_stores = set(exclude_stores)
+        active = set(get_active_workers(workers_df)['worker_id'])
+        self.receiving_agents = active - self.excluded_agents
+        
+        # Visits: store code and duration, grouped into routes in file order
+        store_codes = snapshot.store_dimension.encode_store_ids(routes_df['store_id_destination'])
+        days = encode_days(routes_df['day'])
+        self.scenario_durations = routes_df['service_min'].to_numpy(dtype=float)
+        durations = self.scenario_durations.copy()
+        known = store_codes >= 0
+        durations[known] = np.clip(durations[known], self.min_duration[store_codes[known]], self.max_duration[store_codes[known]])
+        self.visit_stores = store_codes
+        self.visit_durations = durations
+        
+        self.day_labels = {}
+        self.routes = {}
+        self.route_rows = {}
+        self.original = {}
+        self.unassigned = []
+        orphans = []
+        for row, (agent_id, day_label, day, store_code) in enumerate(zip(
+            routes_df['worker_id'].to_numpy(), routes_df['day'].to_numpy(), days, store_codes
+        )):
+            if day < 0 or agent_id not in self.worker_rows:
+                continue
+            self.day_labels.setdefault(day, day_label)
+            key = (agent_id, day)
+            self.routes.setdefault(key, [])
+            self.route_rows.setdefault(key, []).append(row)
+            
+            if store_code < 0:
+                continue
+            self.original.setdefault(key, []).append(row)
+            if routes_df['store_id_destination'].iat[row] in self.excluded_stores:
+                self.unassigned.append((agent_id, day, row, 'store_excluded'))
+            elif agent_id in self.excluded_agents:
+                orphans.append((agent_id, day, row))
+            else:
+                self.routes[key].append(row)
+        
+        self.travel_cache = {}
+        self.fit_travel_model()
+        self.costs = {key: self.route_cost(key, visits) for key, visits in self.routes.items()}
+        self.moves = {'two_opt': 0, 'or_opt': 0, 'relocate': 0, 'insert': 0}
+        self.orphans = orphans
+
+    def point_of(self, location_id) -> int:
+        """Distance matrix point of a store id or HOME_<worker_id>, -1 if unknown"""
+        location_id = str(location_id)
+        if location_id.startswith('HOME_'):
+            row = self.worker_rows.get(location_id.removeprefix('HOME_'))
+            return -1 if row is None else self.n_stores + row
+        return int(self.snapshot.store_dimension.encode_store_ids([location_id])[0])
+
+    def distance(self, origin: int, destination: int) -> float:
+        """Great-circle km between two points, 0 without coordinates"""
+        matrix = self.snapshot.distance_matrix
+        if matrix is not None:
+            distance = float(matrix.distances[origin, destination])
+        else:
+            distance = float(haversine_km(self.latitudes[origin], self.longitudes[origin], self.latitudes[destination], self.longitudes[destination]))
+        return 0.0 if np.isnan(distance) else distance
+
+    def fit_travel_model(self):
+        """Observed trip times per leg and a least squares minutes = a + b * km model"""
+        legs = {}
+        for origin, destination, trip_time in zip(
+            self.routes_df['store_id_origin'].to_numpy(), self.routes_df['store_id_destination'].to_numpy(), self.routes_df['trip_time'].to_numpy()
+        ):
+            origin, destination = self.point_of(origin), self.point_of(destination)
+            if origin >= 0 and destination >= 0 and not pd.isna(trip_time):
+                legs.setdefault((origin, destination), []).append(float(trip_time))
+        
+        self.travel_cache = {leg: float(np.median(times)) for leg, times in legs.items()}
+        self.minutes_fixed, self.minutes_per_km = 0.0, 2.0
+        if len(legs) >= 2:
+            km = np.array([self.distance(*leg) for leg in legs])
+            minutes = np.array(list(self.travel_cache.values()))
+            if np.ptp(km) > 0:
+                fixed, per_km = np.linalg.lstsq(np.c_[np.ones(len(km)), km], minutes, rcond=None)[0]
+                if per_km > 0:
+                    self.minutes_fixed, self.minutes_per_km = max(float(fixed), 0.0), float(per_km)
+
+    def travel(self, origin: int, destination: int) -> float:
+        """Travel minutes between two points"""
+        minutes = self.travel_cache.get((origin, destination))
+        if minutes is None:
+            minutes = 0.0 if origin == destination else round(self.minutes_fixed + self.minutes_per_km * self.distance(origin, destination))
+            self.travel_cache[(origin, destination)] = minutes
+        return minutes
+
+    def schedule(self, key, visits):
+        """Visit start times, travel minutes and late minutes of a route"""
+        agent_id, day = key
+        worker_row = self.worker_rows[agent_id]
+        clock = self.shift_start[worker_row, day]
+        point = self.n_stores + worker_row
+        travel, late, starts, trips = 0.0, 0.0, [], []
+        
+        for visit in visits:
+            store = self.visit_stores[visit]
+            trip = self.travel(point, store)
+            start = max(clock + trip, self.store_open[store, day])
+            clock = start + self.visit_durations[visit]
+            late += max(0.0, clock - self.store_close[store, day])
+            travel += trip
+            starts.append(start)
+            trips.append(trip)
+            point = store
+        
+        late += max(0.0, clock - self.shift_end[worker_row, day])
+        return starts, trips, travel, late
+
+    def route_cost(self, key, visits):
+        """(cost, travel minutes, late minutes) of a route"""
+        _, _, travel, late = self.schedule(key, visits)
+        return travel + ROUTE_LATE_MINUTE_PENALTY * late, travel, late
+
+    def totals(self, routes):
+        """Total travel and late minutes of a set of routes"""
+        costs = [self.route_cost(key, visits) for key, visits in routes.items()]
+        return sum(cost[1] for cost in costs), sum(cost[2] for cost in costs)
+
+    def improve_route(self, key, deadline: float) -> bool:
+        """Apply the first improving 2-opt or or-opt move of a route"""
+        visits, best = self.routes[key], self.costs[key][0]
+        
+        candidates = []
+        for i in range(len(visits) - 1):
+            for j in range(i + 1, len(visits)):
+                candidates.append(('two_opt', visits[:i] + visits[i:j + 1][::-1] + visits[j + 1:]))
+        for length in range(1, 4):
+            for i in range(len(visits) - length + 1):
+                segment, rest = visits[i:i + length], visits[:i] + visits[i + length:]
+                for k in range(len(rest) + 1):
+                    if k != i:
+                        candidates.append(('or_opt', rest[:k] + segment + rest[k:]))
+        
+        for move, candidate in candidates:
+            if monotonic() > deadline:
+                return False
+            cost = self.route_cost(key, candidate)
+            if cost[0] < best - 1e-9:
+                self.routes[key], self.costs[key] = candidate, cost
+                self.moves[move] += 1
+                return True
+        return False
+
+    def candidate_routes(self, key, visit):
+        """Routes of the nearest receiving agents on the visit's day, other than key"""
+        _, day = key
+        store = self.visit_stores[visit]
+        if not (np.isfinite(self.latitudes[store]) and np.isfinite(self.longitudes[store])):
+            return []
+        positions, _ = grid_nearest(self.snapshot.agent_grid, self.latitudes[store], self.longitudes[store], ROUTE_RELOCATE_CANDIDATE_AGENTS)
+        agent_ids = self.snapshot.active_workers_df['worker_id'].to_numpy()[self.snapshot.agent_grid.ids[positions]]
+        return [(agent_id, day) for agent_id in agent_ids if agent_id in self.receiving_agents and (agent_id, day) != key]
+
+    def best_insertion(self, key, visit):
+        """Cheapest (delta cost, target route, visits, cost) insertion of a visit into another route"""
+        best = None
+        for target in self.candidate_routes(key, visit):
+            visits = self.routes.get(target, [])
+            current = self.costs.get(target) or self.route_cost(target, visits)
+            for k in range(len(visits) + 1):
+                candidate = visits[:k] + [visit] + visits[k:]
+                cost = self.route_cost(target, candidate)
+                delta = cost[0] - current[0]
+                if best is None or delta < best[0]:
+                    best = (delta, target, candidate, cost)
+        return best
+
+    def relocate(self, deadline: float) -> bool:
+        """Apply the first improving move of a visit to another agent's route on the same day"""
+        for key in list(self.routes):
+            visits = self.routes[key]
+            for i, visit in enumerate(visits):
+                if monotonic() > deadline:
+                    return False
+                remaining = visits[:i] + visits[i + 1:]
+                removed = self.route_cost(key, remaining)
+                insertion = self.best_insertion(key, visit)
+                if insertion is not None and removed[0] + insertion[0] < self.costs[key][0] - 1e-9:
+                    _, target, candidate, cost = insertion
+                    self.routes[key], self.costs[key] = remaining, removed
+                    self.routes[target], self.costs[target] = candidate, cost
+                    self.moves['relocate'] += 1
+                    return True
+        return False
+
+    def insert_orphans(self):
+        """Insert visits of excluded agents where they add no late minutes, cheapest first"""
+        for agent_id, day, row in self.orphans:
+            key = (agent_id, day)
+            insertion = self.best_insertion(key, row)
+            if insertion is None:
+                self.unassigned.append((*key, row, 'no_receiving_agent'))
+                continue
+            
+            _, target, candidate, cost = insertion
+            current_late = self.costs[target][2] if target in self.costs else self.route_cost(target, self.routes.get(target, []))[2]
+            if cost[2] > current_late:
+                self.unassigned.append((*key, row, 'no_feasible_route'))
+                continue
+            self.routes[target], self.costs[target] = candidate, cost
+            self.moves['insert'] += 1
+
+    def run(self, time_budget: float):
+        """Improve the routes until no move helps or the budget runs out"""
+        deadline = monotonic() + time_budget
+        self.insert_orphans()
+        
+        improved = True
+        while improved and monotonic() < deadline:
+            improved = False
+            for key in list(self.routes):
+                while self.improve_route(key, deadline):
+                    improved = True
+            while self.relocate(deadline):
+                improved = True
+
+    def changed_routes(self) -> List[Any]:
+        """Routes whose visits, order or durations differ from the scenario"""
+        changed = []
+        for key, visits in self.routes.items():
+            original = self.original.get(key, [])
+            same_durations = all(
+                self.visit_durations[row] == self.scenario_durations[row] for row in visits
+            )
+            if visits != original or not same_durations:
+                changed.append(key)
+        return changed
+
+    def to_csv(self) -> bytes:
+        """The improved routes in the result.csv format; unchanged routes keep their rows"""
+        stores_df, workers_df = self.snapshot.stores_df, self.snapshot.workers_df
+        changed = set(self.changed_routes())
+        columns = list(self.routes_df.columns)
+        rows = []
+        
+        for key, visits in self.routes.items():
+            if key not in changed:
+                rows.extend(self.routes_df.iloc[self.route_rows.get(key, visits)][columns].to_dict('records'))
+                continue
+            
+            agent_id, day = key
+            worker_row = self.worker_rows[agent_id]
+            starts, trips, _, _ = self.schedule(key, visits)
+            origin = f"HOME_{agent_id}"
+            for visit, start, trip in zip(visits, starts, trips):
+                store = stores_df.iloc[self.visit_stores[visit]]
+                duration = self.visit_durations[visit]
+                rows.append({
+                    'worker_id': agent_id,
+                    'name': workers_df['name'].iat[worker_row],
+                    'day': self.day_labels.get(day, DAYS_ORDER[day][:3].lower()),
+                    'store_id_origin': origin,
+                    'store_id_destination': store['id'],
+                    'store_destination_name': store['store'],
+                    'sales': float(store['sales']),
+                    'arrival_time': format_clock_minutes(start),
+                    'departure_time': format_clock_minutes(start + duration),
+                    'service_min': int(duration),
+                    'trip_time': int(trip)
+                })
+                origin = store['id']
+        
+        return pd.DataFrame(rows, columns=columns).to_csv(index=False).encode()
+
+@span('improve_scenario_routes')
+def improve_scenario_routes(snapshot: AnalyticsSnapshot, scenario_id: str, request: RouteImprovementRequest) -> RouteImprovementResult:
+    """Improve a scenario's routes by local search and register the result as a new scenario"""
+    started = monotonic()
+    improver = RouteImprover(snapshot, snapshot.scenarios.visits(scenario_id).to_frame(), request.exclude_agents, request.exclude_stores)
+    travel_before, late_before = improver.totals(improver.original)
+    
+    improver.run(min(request.time_budget_seconds, ROUTE_IMPROVEMENT_MAX_SECONDS))
+    travel_after, late_after = improver.totals(improver.routes)
+    
+    source = improver.to_csv()
+    improved_id = f"{scenario_id}-improved-{hashlib.sha256(source).hexdigest()[:8]}"
+    snapshot.scenarios.add_derived(improved_id, source)
+    
+    return RouteImprovementResult(
+        scenario_id=improved_id,
+        base_scenario=scenario_id,
+        travel_minutes_before=int(travel_before),
+        travel_minutes_after=int(travel_after),
+        late_minutes_before=int(late_before),
+        late_minutes_after=int(late_after),
+        changed_routes=len(improver.changed_routes()),
+        moves=improver.moves,
+        unassigned_visits=[
+            UnassignedVisit(
+                agent_id=agent_id,
+                day=improver.day_labels.get(day, DAYS_ORDER[day][:3].lower()),
+                store_id=improver.routes_df['store_id_destination'].iat[row],
+                reason=reason
+            )
+            for agent_id, day, row, reason in improver.unassigned
+        ],
+        elapsed_seconds=round(monotonic() - started, 3)
+    )
+
+@span('build_route_validation')
+def build_route_validation(stores_df, workers_df, store_dimension, worker_dimension: WorkerDimension, route_index: RouteIndex) -> RouteValidation:
+    """Check every visit of a scenario against store hours, shifts, durations and route chaining"""
+    n_routes = len(route_index.route_agents)
+    visit_routes = np.repeat(np.arange(n_routes), np.diff(route_index.offsets))
+    day_prefixes = [day[:3].lower() for day in DAYS_ORDER]
+    flags = {code: 1 << i for i, code in enumerate(VISIT_VIOLATION_CODES)}
+    codes = np.zeros(len(visit_routes), dtype=np.uint16)
+    
+    def flag(code, mask):
+        codes[mask] |= flags[code]
+    
+    # Time fields as float minutes, NaN when missing
+    visits, rows = route_index.visits, slice(0, len(visit_routes))
+    arrival = minutes_or_nan(visits.arrival_minutes[rows])
+    departure = minutes_or_nan(visits.departure_minutes[rows])
+    service = minutes_or_nan(visits.service_min[rows])
+    trip = minutes_or_nan(visits.trip_time[rows])
+    valid_time = ~(np.isnan(arrival) | np.isnan(departure) | np.isnan(service) | np.isnan(trip))
+    flag('invalid_time', ~valid_time)
+    
+    # Store and shift windows of every visit's day; unknown days are unconstrained
+    store_codes = visits.store_codes(rows)
+    known_store = store_codes >= 0
+    flag('unknown_store', ~known_store)
+    
+    worker_rows = worker_dimension.encode_worker_ids(route_index.agent_ids)[route_index.route_agents][visit_routes]
+    known_agent = worker_rows >= 0
+    flag('unknown_agent', ~known_agent)
+    
+    days = route_index.route_day_positions[visit_routes]
+    known_day = days >= 0
+    
+    def window(df, rows, known, column_suffix, default):
+        table = day_minutes_table(df, [f"{p}_{column_suffix}" for p in day_prefixes], default)
+        values = np.full(len(rows), float(default))
+        inside = known & known_day
+        values[inside] = table[rows[inside], days[inside]]
+        return values
+    
+    def bounds(column, default):
+        values = np.full(len(store_codes), float(default))
+        if column in stores_df.columns:
+            values[known_store] = pd.to_numeric(stores_df[column], errors='coerce').to_numpy(dtype=float)[store_codes[known_store]]
+        return np.nan_to_num(values, nan=default)
+    
+    with np.errstate(invalid='ignore'):
+        flag('before_store_open', valid_time & (arrival < window(stores_df, store_codes, known_store, 'open', 0)))
+        flag('after_store_close', valid_time & (departure > window(stores_df, store_codes, known_store, 'close', 24 * 60)))
+        
+        shift_start = window(workers_df, worker_rows, known_agent, 'shift_start', 0)
+        flag('before_shift_start', valid_time & (arrival - trip < shift_start))
+        flag('after_shift_end', valid_time & (departure > window(workers_df, worker_rows, known_agent, 'shift_end', 24 * 60)))
+        
+        # Service duration bounds are weekly totals per store
+        counted = known_store & ~np.isnan(service)
+        weekly_service = np.bincount(store_codes[counted], weights=service[counted], minlength=len(stores_df))
+        store_service = np.where(known_store, weekly_service[np.maximum(store_codes, 0)], np.nan)
+        flag('service_duration', known_store & (
+            (store_service < bounds('min_service_duration', 0)) | (store_service > bounds('max_service_duration', np.inf))
+        ))
+        duration = departure - arrival
+        flag('visit_duration', valid_time & ((duration < bounds('min_visit_duration', 0)) | (duration > bounds('max_visit_duration', np.inf))))
+        flag('duration_mismatch', valid_time & (duration != service))
+        
+        # Chaining: the first visit of a route follows the shift start, the others the previous departure
+        previous = np.r_[np.nan, departure[:-1]]
+        first = np.zeros(len(codes), dtype=bool)
+        first[route_index.offsets[:-1][np.diff(route_index.offsets) > 0]] = True
+        previous[first] = shift_start[first]
+        previous_valid = np.r_[True, valid_time[:-1]] | first
+        flag('chain', valid_time & previous_valid & (arrival < previous + trip))
+    
+    # Count codes per route over the violating visits only
+    violating = np.flatnonzero(codes)
+    code_counts = np.zeros((n_routes, len(VISIT_VIOLATION_CODES)), dtype=np.int64)
+    for i in range(len(VISIT_VIOLATION_CODES)):
+        code_counts[:, i] = np.bincount(visit_routes[violating], weights=(codes[violating] >> i) & 1, minlength=n_routes)
+    
+    return RouteValidation(
+        codes=codes,
+        arrival_minutes=np.nan_to_num(arrival, nan=-1).astype(np.int32),
+        departure_minutes=np.nan_to_num(departure, nan=-1).astype(np.int32),
+        violating_visits=np.bincount(visit_routes[violating], minlength=n_routes).astype(np.int64),
+        code_counts=code_counts
+    )
+
+def violation_names(code_counts) -> Dict[str, int]:
+    """Non-zero violation counts by code name"""
+    return {name: int(count) for name, count in zip(VISIT_VIOLATION_CODES, code_counts) if count}
+
+def get_validation_summary(scenario_id: str, route_index: RouteIndex, validation: RouteValidation):
+    """Violation totals of a scenario and of each of its routes"""
+    return {
+        'scenario': scenario_id,
+        'visits': len(validation.codes),
+        'violating_visits': int(validation.violating_visits.sum()),
+        'violations': violation_names(validation.code_counts.sum(axis=0)),
+        'routes': [
+            {
+                'agent_id': route_index.agent_ids[route_index.route_agents[route]],
+                'day': route_index.route_day(route),
+                'visits': int(route_index.offsets[route + 1] - route_index.offsets[route]),
+                'violating_visits': int(validation.violating_visits[route]),
+                'violations': violation_names(validation.code_counts[route])
+            }
+            for route in range(len(route_index.route_agents))
+        ]
+    }
+
+def get_visit_violations(route_index: RouteIndex, validation: RouteValidation, routes, code: Optional[str] = None):
+    """Violating visits of the given routes, optionally only those with one violation code"""
+    mask = 1 << VISIT_VIOLATION_CODES.index(code) if code else (1 << len(VISIT_VIOLATION_CODES)) - 1
+    visits = []
+    
+    for route in routes:
+        start, end = route_index.offsets[route], route_index.offsets[route + 1]
+        for visit in np.flatnonzero(validation.codes[start:end] & mask) + start:
+            visits.append({
+                'agent_id': route_index.agent_ids[route_index.route_agents[route]],
+                'day': route_index.route_day(route),
+                'store_id': route_index.visits.store_ids(slice(visit, visit + 1))[0],
+                'arrival_time': str(format_clock_column(route_index.visits.arrival_minutes[visit:visit + 1])[0]),
+                'departure_time': str(format_clock_column(route_index.visits.departure_minutes[visit:visit + 1])[0]),
+                'violations': [name for i, name in enumerate(VISIT_VIOLATION_CODES) if validation.codes[visit] >> i & 1]
+            })
+    
+    return visits
+
+@span('get_agent_time_distribution_data')
+def get_agent_time_distribution_data(workers_df, aggregates: VisitAggregates):
+    """Calculate agent time distribution based on real data from active agents only"""
+    if aggregates is None or workers_df is None:
+        return []
     
     try:
         # Filter for active agents only
-        active_agents = workers_df[workers_df['activos'] == 1] if 'activos' in workers_df.columns else workers_df
+        active_agents = get_active_workers(workers_df)
         active_agent_ids = active_agents['worker_id'].tolist() if 'worker_id' in active_agents.columns else []
         
-        # Filter result_df to only include data from active agents
-        active_results = result_df.copy()
-        if 'worker_id' in result_df.columns and active_agent_ids:
-            active_results = result_df[result_df['worker_id'].isin(active_agent_ids)]
-        elif 'agent_id' in result_df.columns and active_agent_ids:
-            active_results = result_df[result_df['agent_id'].isin(active_agent_ids)]
+        # Sum the per-agent counters of the active agents
+        active_rows = np.unique(aggregates.encode_agent_ids(active_agent_ids))
+        active_visits = int(aggregates.agent_visits[active_rows].sum())
         
-        if active_results.empty:
+        if active_visits == 0:
             logger.warning("No data found for active agents")
             # Return fallback values
             return [
@@ -589,19 +3268,12 @@ def get_agent_time_distribution_data():
                 {"name": "Administrativo", "value": 4.0, "color": "#A855F7"}
             ]
         
-        # Calculate average service time per visit from the results (active agents only)
-        if 'service_duration' in active_results.columns:
-            # Use actual service duration from data
-            avg_service_time = active_results['service_duration'].mean()
-        else:
-            # Fallback to a reasonable estimate based on visit count
+        # Average service and travel time per visit (active agents only)
+        avg_service_time = float(aggregates.agent_service_min[active_rows].sum()) / active_visits
+        avg_travel_time = float(aggregates.agent_trip_time[active_rows].sum()) / active_visits
+        if avg_service_time + avg_travel_time == 0:
+            # No durations in the routing file, fall back to reasonable estimates
             avg_service_time = 67  # minutes per visit
-        
-        # Calculate average travel time per visit (active agents only)
-        if 'travel_time' in active_results.columns:
-            avg_travel_time = active_results['travel_time'].mean()
-        else:
-            # Estimate based on optimized routes
             avg_travel_time = 8  # minutes per visit (optimized)
         
         # Calculate total time per visit
@@ -656,240 +3328,158 @@ def get_agent_time_distribution_data():
             {"name": "Administrativo", "value": 4.0, "color": "#A855F7"}
         ]
 
-def get_all_stores_data():
-    """Get comprehensive data for all stores including weekly schedule"""
-    if stores_df is None or result_df is None:
-        return []
+def sort_orders(values: np.ndarray):
+    """Ascending and descending row orders of values, ties in row order and missing values last"""
+    ranks, uniques = pd.factorize(values, sort=True)
+    ranks = np.where(ranks >= 0, ranks, len(uniques))
+    rows = np.arange(len(values))
+    descending_ranks = np.where(ranks < len(uniques), -ranks, 1)
+    return np.lexsort((rows, ranks)).astype(np.int32), np.lexsort((rows, descending_ranks)).astype(np.int32)
+
+@span('build_store_table_arrays')
+def build_store_table_arrays(stores_df, aggregates: VisitAggregates) -> Dict[str, np.ndarray]:
+    """The numeric columns, sort orders (named order:<key>) and coverage flags of a scenario's store table"""
+    # Duplicated store ids share the visits of their first row
+    store_codes = aggregates.store_dimension.encode_store_ids(stores_df['id'])
+    weekly_visits = aggregates.store_visits[store_codes]
+    daily_visits = aggregates.store_day_visits[store_codes]
     
-    # Get visit counts by store and day from optimized results
-    store_visits = result_df.groupby(['store_id_destination', 'day']).size().reset_index(name='visits')
-    store_visits_pivot = store_visits.pivot(index='store_id_destination', columns='day', values='visits').fillna(0)
-    
-    # Ensure all days are present
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    for day in days:
-        if day not in store_visits_pivot.columns:
-            store_visits_pivot[day] = 0
-    
-    # Calculate weekly totals
-    store_weekly_visits = store_visits_pivot.sum(axis=1).reset_index()
-    store_weekly_visits.columns = ['store_id', 'weekly_visits']
-    
-    # Merge with store data
-    all_stores = stores_df.merge(store_weekly_visits, left_on='id', right_on='store_id', how='left')
-    all_stores['weekly_visits'] = all_stores['weekly_visits'].fillna(0).astype(int)
-    
-    # Merge with daily visit data
-    all_stores = all_stores.merge(store_visits_pivot, left_on='id', right_index=True, how='left')
-    for day in days:
-        if day in all_stores.columns:
-            all_stores[day] = all_stores[day].fillna(0).astype(int)
-        else:
-            all_stores[day] = 0
-    
-    # Extract chain from store name
-    def extract_chain(store_name):
-        if pd.isna(store_name):
-            return "Unknown"
-        # Extract the part before the first comma
-        chain = store_name.split(',')[0].strip()
-        return chain
-    
-    # Prepare the response data
-    stores_data = []
-    for _, row in all_stores.iterrows():
-        # Clean sales value (remove $ and commas)
-        sales_str = str(row['sales']).replace('$', '').replace(',', '')
-        try:
-            sales_value = int(float(sales_str))
-        except (ValueError, TypeError):
-            sales_value = 0
-            
-        stores_data.append({
-            "store_id": row['id'],
-            "name": row['store'],
-            "chain": extract_chain(row['store']),
-            "sales": sales_value,
-            "weekly_visits": int(row['weekly_visits']),
-            "monday_visits": int(row.get('Monday', 0)),
-            "tuesday_visits": int(row.get('Tuesday', 0)),
-            "wednesday_visits": int(row.get('Wednesday', 0)),
-            "thursday_visits": int(row.get('Thursday', 0)),
-            "friday_visits": int(row.get('Friday', 0)),
-            "saturday_visits": int(row.get('Saturday', 0)),
-            "sunday_visits": int(row.get('Sunday', 0))
-        })
+    # Clean sales values (remove $ and commas)
+    sales = pd.to_numeric(stores_df['sales'].astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
+    sales = np.trunc(np.nan_to_num(sales.to_numpy(dtype=float), nan=0.0)).astype(np.int64)
     
-    return stores_data
+    arrays = {
+        'sales': sales,
+        'weekly_visits': weekly_visits,
+        **{f"{day.lower()}_visits": daily_visits[:, i] for i, day in enumerate(DAYS_ORDER)}
+    }
+    sort_values = {'name': stores_df['store'].to_numpy(dtype=object), **arrays}
+    for key in STORE_SORT_KEYS:
+        arrays[f"order:{key}"], arrays[f"order:-{key}"] = sort_orders(sort_values[key])
+    
+    min_weekly_visits = pd.to_numeric(stores_df['min_weekly_visits'], errors='coerce').to_numpy(dtype=float)
+    arrays['sufficient'] = weekly_visits >= min_weekly_visits
+    return arrays
 
-# Load data on startup
-@app.on_event("startup")
-async def startup_event():
-    """Load data on application startup"""
-    load_data()
+def build_store_table(stores_df, store_dimension: StoreDimension, arrays: Mapping[str, np.ndarray]) -> StoreTable:
+    """Store table of a scenario from the stores.csv text columns and build_store_table_arrays() output"""
+    columns = {
+        'store_id': stores_df['id'].to_numpy(dtype=object),
+        'name': stores_df['store'].to_numpy(dtype=object),
+        'chain': stores_df['chain'].to_numpy(dtype=object),
+        **{name: values for name, values in arrays.items() if not name.startswith('order:') and name != 'sufficient'}
+    }
+    return StoreTable(
+        columns=MappingProxyType(columns),
+        orders=MappingProxyType({name.removeprefix('order:'): values for name, values in arrays.items() if name.startswith('order:')}),
+        chain_codes=store_dimension.chain_codes,
+        chain_lookup=MappingProxyType({chain: code for code, chain in enumerate(store_dimension.chains.tolist())}),
+        sufficient=arrays['sufficient']
+    )
 
-@app.get("/api/dashboard/kpis", response_model=KPIMetrics)
-async def get_dashboard_kpis():
-    """
-    Provides key performance indicators for the dashboard.
-    """
-    if stores_df is None or workers_df is None or manual_df is None or result_df is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+def select_store_rows(table: StoreTable, chain: Optional[str] = None, coverage: Optional[str] = None,
+                      sort: Optional[str] = None, offset: int = 0, limit: Optional[int] = None):
+    """Rows of one page of the store table and the number of stores matching the filters.
 
-    total_stores = len(stores_df)
+    Without filters the page is a slice of the sort order; filters take one
+    vectorized pass over it.
+    """
+    rows = table.orders[sort] if sort else np.arange(len(table), dtype=np.int32)
+    mask = None
+    if chain is not None:
+        mask = table.chain_codes == table.chain_lookup.get(chain, -1)
+    if coverage is not None:
+        visited = table.columns['weekly_visits'] > 0
+        covered = {
+            'visited': visited, 'unvisited': ~visited, 'sufficient': table.sufficient, 'insufficient': ~table.sufficient
+        }[coverage]
+        mask = covered if mask is None else mask & covered
+    if mask is not None:
+        rows = rows[mask[rows]]
     
-    # Filter for active agents
-    active_agents = len(workers_df[workers_df['activos'] == 1]) if 'activos' in workers_df.columns else len(workers_df)
+    end = len(rows) if limit is None else offset + limit
+    return rows[offset:end], len(rows)
+
+def get_store_table_rows(table: StoreTable, rows: np.ndarray, fields: List[str]):
+    """Store table rows as dicts holding the given fields"""
+    columns = [table.columns[field][rows].tolist() for field in fields]
+    return [dict(zip(fields, values)) for values in zip(*columns)]
+
+@span('get_all_stores_data')
+def get_all_stores_data(table: StoreTable):
+    """Get comprehensive data for all stores including weekly schedule"""
+    if table is None:
+        return []
+    return get_store_table_rows(table, np.arange(len(table)), STORE_TABLE_FIELDS)
+
+def compute_scenario_totals(stores_df, aggregates: VisitAggregates) -> ScenarioTotals:
+    """Sum the visits, service and travel time and the store coverage of a scenario"""
+    visited = aggregates.store_visits > 0
     
-    manual_visits = len(manual_df)
-    optimized_visits = len(result_df)
+    return ScenarioTotals(
+        visits=aggregates.visits,
+        service_min=aggregates.service_min,
+        trip_time=aggregates.trip_time,
+        visited_stores=int(visited.sum()) + len(aggregates.unknown_store_visits),
+        visited_sales=int(stores_df['sales'].to_numpy()[visited].sum())
+    )
+
+def agent_utilization(totals: ScenarioTotals, active_agents: int) -> float:
+    """Service plus travel time as a share of the agents' effective weekly time, capped at 100%"""
+    if totals.visits == 0 or active_agents == 0:
+        return 0
     
-    # Calculate average service time from optimized results
-    if not result_df.empty and 'service_min' in result_df.columns:
-        avg_service_time = result_df['service_min'].mean()
-    else:
-        avg_service_time = 0.0
+    # Effective working hours per day considering store-agent hour overlap:
+    # Mon-Fri: 8:00-18:00 = 10 hours, but subtract 1 hour for breaks/admin = 9 hours
+    # Saturday: 8:00-13:00 = 5 hours, but subtract 0.5 hour for breaks/admin = 4.5 hours
+    total_effective_time = active_agents * EFFECTIVE_MINUTES_PER_AGENT_PER_WEEK
     
-    # Calculate sales coverage for optimized process (stores actually visited)
-    if not result_df.empty and 'store_id_destination' in result_df.columns:
-        visited_stores = result_df['store_id_destination'].unique()
-        visited_stores_count = len(visited_stores)
-        visited_stores_sales = stores_df[stores_df['id'].isin(visited_stores)]['sales'].sum()
-    else:
-        visited_stores_count = 0
-        visited_stores_sales = 0
-    
-    # Calculate utilization rate based on actual time usage vs available working time
-    # This considers real service times, travel times, store hours, and agent schedules
-    if not result_df.empty and active_agents > 0:
-        # Calculate total actual time used per agent (service + travel time)
-        result_df_copy = result_df.copy()
-        result_df_copy['total_time_per_visit'] = result_df_copy['service_min'] + result_df_copy['trip_time']
-        
-        # Group by agent and calculate total time used per week
-        agent_time_usage = result_df_copy.groupby('worker_id')['total_time_per_visit'].sum()
-        
-        # Calculate effective working time per agent per week
-        # Based on actual data: agents work 8:00-18:00 (Mon-Fri) and 8:00-13:00 (Sat)
-        # But effective time is constrained by:
-        # 1. Store opening hours (earliest: 6:00, latest close: 23:00)
-        # 2. Agent working hours (8:00-18:00 Mon-Fri, 8:00-13:00 Sat)
-        # 3. Realistic work capacity (breaks, administrative time, etc.)
-        
-        # Effective working hours per day considering store-agent hour overlap:
-        # Mon-Fri: 8:00-18:00 = 10 hours, but subtract 1 hour for breaks/admin = 9 hours
-        # Saturday: 8:00-13:00 = 5 hours, but subtract 0.5 hour for breaks/admin = 4.5 hours
-        effective_minutes_per_agent_per_week = (5 * 9 * 60) + (1 * 4.5 * 60)  # 2970 minutes
-        
-        # Calculate utilization rate
-        # Utilization = (total productive time used / total effective available time) * 100
-        total_time_used = agent_time_usage.sum() if len(agent_time_usage) > 0 else 0
-        total_effective_time = active_agents * effective_minutes_per_agent_per_week
-        
-        utilization_rate = (total_time_used / total_effective_time * 100) if total_effective_time > 0 else 0
-        
-        # Cap at 100% to avoid over-utilization display issues
-        utilization_rate = min(utilization_rate, 100.0)
-    else:
-        utilization_rate = 0
+    # Cap at 100% to avoid over-utilization display issues
+    return min((totals.service_min + totals.trip_time) / total_effective_time * 100, 100.0)
+
+def compute_dashboard_kpis(before: ScenarioTotals, after: ScenarioTotals, active_agents: int) -> KPIMetrics:
+    """Compute key performance indicators for the dashboard"""
+    avg_service_time = after.service_min / after.visits if after.visits else 0.0
     
     return KPIMetrics(
-        total_stores=visited_stores_count,
-        visited_stores=visited_stores_count,
+        total_stores=after.visited_stores,
+        visited_stores=after.visited_stores,
         active_agents=active_agents,
-        weekly_visits_manual=manual_visits,
-        weekly_visits_optimized=optimized_visits,
+        weekly_visits_manual=before.visits,
+        weekly_visits_optimized=after.visits,
         avg_service_time=round(avg_service_time, 2),
-        total_sales_coverage=int(visited_stores_sales),
-        utilization_rate=round(utilization_rate, 1)
+        total_sales_coverage=int(after.visited_sales),
+        utilization_rate=round(agent_utilization(after, active_agents), 1)
     )
 
-@app.get("/api/dashboard/efficiency-comparison", response_model=EfficiencyComparison)
-async def get_efficiency_comparison():
-    """Get daily visit comparison between manual and optimized processes"""
-    daily_comparison = get_daily_visit_comparison()
-    return EfficiencyComparison(daily_comparison=daily_comparison)
-
-@app.get("/api/dashboard/store-chain-distribution", response_model=StoreChainDistribution)
-async def get_store_chain_distribution_endpoint():
-    """Get store count and visit distribution by retail chain"""
-    chains = get_store_chain_distribution()
-    return StoreChainDistribution(chains=chains)
-
-# Before/After Comparison APIs
-@app.get("/api/comparison/metrics", response_model=MetricsComparison)
-async def get_comparison_metrics():
-    """Get core comparison metrics between manual and optimized processes"""
-    efficiency = calculate_visit_efficiency()
-    
-    # Calculate sales coverage for manual process
-    if not manual_df.empty and 'store_id_destination' in manual_df.columns:
-        manual_visited_stores = manual_df['store_id_destination'].unique()
-        manual_sales_coverage = stores_df[stores_df['id'].isin(manual_visited_stores)]['sales'].sum()
-    else:
-        manual_sales_coverage = 0
+def compute_comparison_metrics(before: ScenarioTotals, after: ScenarioTotals, active_agents: int, total_stores: int) -> MetricsComparison:
+    """Compute core comparison metrics between manual and optimized processes"""
+    visits_improvement = ((after.visits - before.visits) / before.visits) * 100 if before.visits > 0 else 0
     
-    # Calculate sales coverage for optimized process
-    if not result_df.empty and 'store_id_destination' in result_df.columns:
-        optimized_visited_stores = result_df['store_id_destination'].unique()
-        optimized_sales_coverage = stores_df[stores_df['id'].isin(optimized_visited_stores)]['sales'].sum()
-    else:
-        optimized_sales_coverage = 0
-    
-    # Calculate utilization rates for both processes
-    # Get active agents count
-    active_agents = len(workers_df[workers_df['activos'] == 1]) if 'activos' in workers_df.columns else len(workers_df)
-    effective_minutes_per_agent_per_week = (5 * 9 * 60) + (1 * 4.5 * 60)  # 2970 minutes
-    
-    # Manual utilization
-    if not manual_df.empty and active_agents > 0:
-        manual_df_copy = manual_df.copy()
-        manual_df_copy['total_time_per_visit'] = manual_df_copy['service_min'] + manual_df_copy['trip_time']
-        manual_total_time = manual_df_copy['total_time_per_visit'].sum()
-        manual_total_effective_time = active_agents * effective_minutes_per_agent_per_week
-        manual_utilization = min((manual_total_time / manual_total_effective_time * 100), 100.0) if manual_total_effective_time > 0 else 0
-    else:
-        manual_utilization = 0
-    
-    # Optimized utilization (reuse calculation from dashboard)
-    if not result_df.empty and active_agents > 0:
-        result_df_copy = result_df.copy()
-        result_df_copy['total_time_per_visit'] = result_df_copy['service_min'] + result_df_copy['trip_time']
-        optimized_total_time = result_df_copy['total_time_per_visit'].sum()
-        optimized_total_effective_time = active_agents * effective_minutes_per_agent_per_week
-        optimized_utilization = min((optimized_total_time / optimized_total_effective_time * 100), 100.0) if optimized_total_effective_time > 0 else 0
-    else:
-        optimized_utilization = 0
+    manual_utilization = agent_utilization(before, active_agents)
+    optimized_utilization = agent_utilization(after, active_agents)
     
-    # Calculate store utilization for both processes
     # Store utilization = stores visited / total stores available
-    total_stores = len(stores_df)
-    
-    # Manual store utilization
-    manual_stores_visited = len(manual_visited_stores) if not manual_df.empty else 0
-    manual_store_utilization = (manual_stores_visited / total_stores * 100) if total_stores > 0 else 0
-    
-    # Optimized store utilization  
-    optimized_stores_visited = len(optimized_visited_stores) if not result_df.empty else 0
-    optimized_store_utilization = (optimized_stores_visited / total_stores * 100) if total_stores > 0 else 0
+    manual_store_utilization = (before.visited_stores / total_stores * 100) if total_stores > 0 else 0
+    optimized_store_utilization = (after.visited_stores / total_stores * 100) if total_stores > 0 else 0
     
     # Calculate improvement percentages
-    sales_improvement = ((optimized_sales_coverage - manual_sales_coverage) / manual_sales_coverage * 100) if manual_sales_coverage > 0 else 0
+    sales_improvement = ((after.visited_sales - before.visited_sales) / before.visited_sales * 100) if before.visited_sales > 0 else 0
     utilization_improvement = ((optimized_utilization - manual_utilization) / manual_utilization * 100) if manual_utilization > 0 else 0
     store_utilization_improvement = ((optimized_store_utilization - manual_store_utilization) / manual_store_utilization * 100) if manual_store_utilization > 0 else 0
     
     metrics = [
         ComparisonMetric(
             metric="Total Weekly Visits",
-            before=efficiency['manual_visits'],
-            after=efficiency['optimized_visits'],
+            before=before.visits,
+            after=after.visits,
             unit="visits",
-            improvement_percentage=round(efficiency['improvement_percentage'], 1)
+            improvement_percentage=round(visits_improvement, 1)
         ),
         ComparisonMetric(
             metric="Sales Coverage",
-            before=int(manual_sales_coverage / 1000000),  # Convert to millions
-            after=int(optimized_sales_coverage / 1000000),  # Convert to millions
+            before=int(before.visited_sales / 1000000),  # Convert to millions
+            after=int(after.visited_sales / 1000000),  # Convert to millions
             unit="M MXN",
             improvement_percentage=round(sales_improvement, 1)
         ),
@@ -902,8 +3492,8 @@ async def get_comparison_metrics():
         ),
         ComparisonMetric(
             metric="Store Utilization",
-            before=manual_stores_visited,
-            after=optimized_stores_visited,
+            before=before.visited_stores,
+            after=after.visited_stores,
             unit="tiendas",
             improvement_percentage=round(store_utilization_improvement, 1)
         )
@@ -911,47 +3501,301 @@ async def get_comparison_metrics():
     
     return MetricsComparison(metrics=metrics)
 
-@app.get("/api/comparison/agent-performance", response_model=AgentPerformanceComparison)
-async def get_agent_performance_comparison():
-    """Get agent-level comparison of visit counts and efficiency"""
-    agent_stats = analyze_agent_workload()
-    
-    agents = []
-    for stat in agent_stats:
-        agents.append(AgentPerformance(
-            agent_id=stat['agent_id'],
-            name=stat['name'],
-            visits_before=stat['visits_before'],
-            visits_after=stat['visits_after'],
-            efficiency_gain=round(stat['efficiency_gain'], 1)
-        ))
-    
-    return AgentPerformanceComparison(agents=agents)
+def median_minutes(minutes: np.ndarray) -> float:
+    """Median of the known minutes, 0 when there are none"""
+    known = minutes[minutes >= 0]
+    return float(np.median(known)) if len(known) else 0.0
 
-@app.get("/api/comparison/store-performance", response_model=StorePerformanceComparison)
-async def get_store_performance_comparison():
-    """Get store-level comparison of visit counts and coverage"""
-    store_stats = analyze_store_performance()
-    
-    stores = []
-    for stat in store_stats:
-        stores.append(StorePerformance(
-            store_id=stat['store_id'],
-            name=stat['name'],
-            chain=stat['chain'],
-            sales=stat['sales'],
-            visits_before=stat['visits_before'],
-            visits_after=stat['visits_after'],
-            visit_change=stat['visit_change']
-        ))
-    
-    return StorePerformanceComparison(stores=stores)
+class WhatIfSimulation:
+    """Edits applied to an overlay of one scenario, counted as a delta of the scenario's VisitAggregates.
 
-@app.get("/api/comparison/weekly-distribution", response_model=WeeklyDistributionData)
-async def get_weekly_distribution():
-    """Get visit distribution across days of the week"""
-    daily_comparison = get_daily_visit_comparison()
+    Visits are addressed by their position in the scenario's RouteIndex; visits added by
+    an edit get positions past the end. Only touched visits are stored in the overlay.
+    The result deletes the replaced visit rows and inserts the overlay's visits into a
+    VisitAggregatesDelta, so a simulation costs time in the touched visits, not in the
+    scenario or counter sizes. Reassigned visits go to the active agent living nearest
+    to the store and keep their arrival, service and trip times.
+    """
+
+    def __init__(self, snapshot: AnalyticsSnapshot, payloads: ScenarioPayloads):
+        self.snapshot = snapshot
+        self.index = payloads.route_index
+        self.store_codes = payloads.visit_store_codes
+        self.base = payloads.aggregates
+        self.base_totals = payloads.totals
+        stores_df = snapshot.stores_df
+        
+        route_sizes = np.diff(self.index.offsets)
+        self.n_visits = self.index.visits.routed
+        self.visit_routes = np.repeat(np.arange(len(route_sizes)), route_sizes)
+        
+        self.store_ids = stores_df['id'].to_numpy()
+        self.store_latitudes = stores_df['latitude'].to_numpy(dtype=float)
+        self.store_longitudes = stores_df['longitude'].to_numpy(dtype=float)
+        worker_dimension = snapshot.worker_dimension
+        self.worker_rows = dict(zip(worker_dimension.worker_ids.tolist(), worker_dimension.worker_rows.tolist()))
+        self.active_ids = set(snapshot.active_workers_df['worker_id'])
+        self.active_agents = len(snapshot.active_workers_df)
+        
+        self.overrides = {}
+        self.added = 0
+        self.deactivated = set()
+        self.store_limits = {}
+        self.unassigned = 0
+
+    def visit(self, position: int):
+        """Current (agent_id, day code, store code, store id, arrival, service_min, trip_time) of a visit, None once removed.
+
+        Times are in minutes, -1 when unknown.
+        """
+        if position in self.overrides:
+            return self.overrides[position]
+        route = self.visit_routes[position]
+        visits = self.index.visits
+        return (
+            self.index.agent_ids[self.index.route_agents[route]],
+            int(self.index.route_day_positions[route]),
+            int(self.store_codes[position]),
+            visits.store_ids(slice(position, position + 1))[0],
+            int(visits.arrival_minutes[position]),
+            int(visits.service_min[position]),
+            int(visits.trip_time[position])
+        )
+
+    def set_visit(self, position: int, visit):
+        """Replace a visit in the overlay, None removes it"""
+        self.overrides[position] = visit
+
+    def current_visits(self, base_positions, match):
+        """Positions of the current visits among base_positions and the overlay accepted by match"""
+        positions = set(int(position) for position in base_positions) | set(self.overrides)
+        return [position for position in sorted(positions) if (visit := self.visit(position)) is not None and match(visit)]
+
+    def agent_visits(self, agent_id: str):
+        """Positions of the current visits of an agent"""
+        base_positions = range(0)
+        code = self.index.agent_codes.get(agent_id)
+        if code is not None:
+            routes = self.index.agent_offsets[code], self.index.agent_offsets[code + 1]
+            base_positions = range(self.index.offsets[routes[0]], self.index.offsets[routes[1]])
+        return self.current_visits(base_positions, lambda visit: visit[0] == agent_id)
+
+    def store_visits(self, store_code: int):
+        """Positions of the current visits to a store"""
+        return self.current_visits(np.flatnonzero(self.store_codes == store_code), lambda visit: visit[2] == store_code)
+
+    def nearest_agent(self, latitude: float, longitude: float) -> Optional[str]:
+        """Active, not deactivated agent living nearest to a point, None if there is none"""
+        grid = self.snapshot.agent_grid
+        if not (np.isfinite(latitude) and np.isfinite(longitude)) or len(grid.ids) == 0:
+            return None
+        
+        active_ids = self.snapshot.active_workers_df['worker_id'].to_numpy()
+        k = ROUTE_RELOCATE_CANDIDATE_AGENTS
+        while True:
+            positions, _ = grid_nearest(grid, latitude, longitude, k)
+            for agent_id in active_ids[grid.ids[positions]]:
+                if agent_id not in self.deactivated:
+                    return agent_id
+            if k >= len(grid.ids):
+                return None
+            k *= 2
+
+    def visit_location(self, visit):
+        """Coordinates of a visit's store, the current agent's home for unknown stores"""
+        if visit[2] >= 0:
+            return self.store_latitudes[visit[2]], self.store_longitudes[visit[2]]
+        worker = self.snapshot.workers_df.iloc[self.worker_rows[visit[0]]] if visit[0] in self.worker_rows else None
+        return (worker['home_latitude'], worker['home_longitude']) if worker is not None else (np.nan, np.nan)
+
+    def check_agent(self, agent_id: Optional[str]) -> str:
+        """Reject missing and unknown agent ids"""
+        if agent_id is None:
+            raise HTTPException(status_code=400, detail="Edit requires an agent id")
+        if agent_id not in self.worker_rows:
+            raise HTTPException(status_code=404, detail=f"Unknown agent '{agent_id}'")
+        return agent_id
+
+    def check_store(self, store_id: Optional[str]) -> int:
+        """Store code of a store id, rejecting missing and unknown ids"""
+        if store_id is None:
+            raise HTTPException(status_code=400, detail="Edit requires a store id")
+        store_code = self.snapshot.store_dimension.encode_store_ids([store_id])[0]
+        if store_code < 0:
+            raise HTTPException(status_code=404, detail=f"Unknown store '{store_id}'")
+        return int(store_code)
+
+    def apply(self, edit: WhatIfEdit):
+        """Apply one edit to the overlay"""
+        if edit.type == 'deactivate_agent':
+            self.deactivate_agent(self.check_agent(edit.agent_id), edit.reassign)
+        elif edit.type == 'reassign_visits':
+            self.reassign_visits(self.check_agent(edit.from_agent), self.check_agent(edit.to_agent), edit.day, edit.store_id)
+        elif edit.type == 'set_store_visits':
+            self.set_store_visits(self.check_store(edit.store_id), edit.min_weekly_visits, edit.max_weekly_visits)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown edit type '{edit.type}'")
+
+    def deactivate_agent(self, agent_id: str, reassign: bool):
+        """Deactivate an agent and move its visits to the nearest agents, or drop them"""
+        if agent_id in self.deactivated:
+            return
+        self.deactivated.add(agent_id)
+        if agent_id in self.active_ids:
+            self.active_agents -= 1
+        
+        for position in self.agent_visits(agent_id):
+            visit = self.visit(position)
+            agent = self.nearest_agent(*self.visit_location(visit)) if reassign else None
+            if agent is None:
+                if reassign:
+                    self.unassigned += 1
+                self.set_visit(position, None)
+            else:
+                self.set_visit(position, (agent,) + visit[1:])
+
+    def reassign_visits(self, from_agent: str, to_agent: str, day: Optional[str], store_id: Optional[str]):
+        """Move the visits of one agent, optionally only of one day and store, to another agent"""
+        if to_agent in self.deactivated:
+            raise HTTPException(status_code=400, detail=f"Agent '{to_agent}' is deactivated")
+        day_code = parse_day_filter(day)
+        store_code = self.check_store(store_id) if store_id is not None else None
+        
+        for position in self.agent_visits(from_agent):
+            visit = self.visit(position)
+            if (day_code is None or visit[1] == day_code) and (store_code is None or visit[2] == store_code):
+                self.set_visit(position, (to_agent,) + visit[1:])
+
+    def set_store_visits(self, store_code: int, min_weekly_visits: Optional[int], max_weekly_visits: Optional[int]):
+        """Change a store's weekly visit bounds, dropping the latest excess visits or adding missing ones"""
+        current_min, current_max = self.store_limits.get(store_code) or self.base_store_limits(store_code)
+        min_visits = current_min if min_weekly_visits is None else min_weekly_visits
+        max_visits = current_max if max_weekly_visits is None else max_weekly_visits
+        if min_visits < 0 or min_visits > max_visits:
+            raise HTTPException(status_code=400, detail="min_weekly_visits must be between 0 and max_weekly_visits")
+        self.store_limits[store_code] = (min_visits, max_visits)
+        
+        positions = self.store_visits(store_code)
+        if len(positions) > max_visits:
+            latest_first = sorted(positions, key=lambda position: (self.visit(position)[1], position), reverse=True)
+            for position in latest_first[:len(positions) - max_visits]:
+                self.set_visit(position, None)
+            return
+        
+        # Missing visits go to free working days (Monday to Saturday) of the nearest agent
+        visited_days = {self.visit(position)[1] for position in positions}
+        free_days = [day for day in range(len(DAYS_ORDER) - 1) if day not in visited_days]
+        agent = self.nearest_agent(self.store_latitudes[store_code], self.store_longitudes[store_code])
+        for _ in range(min_visits - len(positions)):
+            if agent is None or not free_days:
+                self.unassigned += 1
+                continue
+            self.set_visit(self.n_visits + self.added, (
+                agent, free_days.pop(0), store_code, self.store_ids[store_code],
+                -1, self.new_visit_service_min(store_code), self.new_visit_trip_time()
+            ))
+            self.added += 1
+
+    def base_store_limits(self, store_code: int):
+        """Weekly visit bounds of a store in stores.csv"""
+        store = self.snapshot.stores_df.iloc[store_code]
+        return int(store.get('min_weekly_visits', 0)), int(store.get('max_weekly_visits', len(DAYS_ORDER)))
+
+    def new_visit_service_min(self, store_code: int) -> float:
+        """Service time of an added visit: the store's minimum visit duration, else the median service time"""
+        if 'min_visit_duration' in self.snapshot.stores_df.columns:
+            duration = float(self.snapshot.stores_df['min_visit_duration'].iloc[store_code])
+            if np.isfinite(duration):
+                return duration
+        return median_minutes(self.index.visits.service_min[:self.n_visits])
+
+    def new_visit_trip_time(self) -> float:
+        """Trip time of an added visit: the scenario's median trip time"""
+        return median_minutes(self.index.visits.trip_time[:self.n_visits])
+
+    def overlay_visits(self) -> VisitTable:
+        """The current visits of the overlay as a visit table"""
+        visits = [visit for visit in self.overrides.values() if visit is not None]
+        agent_ids, days, _, store_ids, arrival, service_min, trip_time = zip(*visits) if visits else ((),) * 7
+        routes_df = pd.DataFrame({
+            'worker_id': pd.Series(agent_ids, dtype=object),
+            'day': pd.Series([DAYS_ORDER[day] if day >= 0 else None for day in days], dtype=object),
+            'store_id_destination': pd.Series(store_ids, dtype=object),
+            'arrival_time': format_clock_column(np.array(arrival, dtype=np.int64)),
+            'service_min': pd.Series(service_min, dtype=float),
+            'trip_time': pd.Series(trip_time, dtype=float),
+        })
+        return build_visit_table(routes_df, self.snapshot.store_dimension, self.snapshot.worker_dimension)
+
+    def delta(self) -> VisitAggregatesDelta:
+        """Changes of the scenario's visit counters under the overlay"""
+        delta = VisitAggregatesDelta(self.base)
+        replaced = np.array(sorted(position for position in self.overrides if position < self.n_visits), dtype=np.int64)
+        delta.delete(self.index.visits, replaced)
+        delta.insert(self.overlay_visits())
+        return delta
+
+    def agent_changes(self, delta: VisitAggregatesDelta) -> List[WhatIfAgentChange]:
+        """Agents whose visits or status changed"""
+        worker_ids = self.snapshot.workers_df['worker_id']
+        visit_changes = {worker_ids.iat[row]: counts for row, counts in delta.changes('agent_visits').items()}
+        changes = []
+        for agent_id in sorted(set(visit_changes) | self.deactivated, key=str):
+            visits_before, visits_after = visit_changes.get(agent_id) or (int(self.base.agent_visits[self.worker_rows[agent_id]]),) * 2
+            changes.append(WhatIfAgentChange(
+                agent_id=str(agent_id),
+                active=agent_id in self.active_ids and agent_id not in self.deactivated,
+                visits_before=visits_before,
+                visits_after=visits_after
+            ))
+        return changes
+
+    def store_changes(self, delta: VisitAggregatesDelta) -> List[WhatIfStoreChange]:
+        """Stores whose visits or weekly visit bounds changed"""
+        visit_changes = delta.changes('store_visits')
+        changes = []
+        for store_code in sorted(set(visit_changes) | set(self.store_limits)):
+            min_visits, max_visits = self.store_limits.get(store_code) or self.base_store_limits(store_code)
+            visits_before, visits_after = visit_changes.get(store_code) or (int(self.base.store_visits[store_code]),) * 2
+            changes.append(WhatIfStoreChange(
+                store_id=str(self.store_ids[store_code]),
+                min_weekly_visits=min_visits,
+                max_weekly_visits=max_visits,
+                visits_before=visits_before,
+                visits_after=visits_after
+            ))
+        return changes
+
+    def day_changes(self, delta: VisitAggregatesDelta) -> List[WhatIfDayChange]:
+        """Days whose visit count changed, in week order"""
+        return [
+            WhatIfDayChange(day=DAYS_ORDER[day], visits_before=visits_before, visits_after=visits_after)
+            for day, (visits_before, visits_after) in delta.changes('day_visits').items()
+        ]
+
+@span('simulate_what_if')
+def simulate_what_if(snapshot: AnalyticsSnapshot, before: str, after: str, request: WhatIfRequest) -> WhatIfResult:
+    """Apply what-if edits to the after scenario and recompute the dashboard KPIs and comparison metrics"""
+    started = monotonic()
+    before_totals = get_scenario_payloads(snapshot, before).totals
+    simulation = WhatIfSimulation(snapshot, get_scenario_payloads(snapshot, after))
+    for edit in request.edits:
+        simulation.apply(edit)
     
+    delta = simulation.delta()
+    after_totals = delta.totals(snapshot.stores_df, simulation.base_totals)
+    return WhatIfResult(
+        kpis=compute_dashboard_kpis(before_totals, after_totals, simulation.active_agents),
+        metrics=compute_comparison_metrics(before_totals, after_totals, simulation.active_agents, len(snapshot.stores_df)).metrics,
+        agents=simulation.agent_changes(delta),
+        stores=simulation.store_changes(delta),
+        days=simulation.day_changes(delta),
+        unassigned_visits=simulation.unassigned,
+        elapsed_ms=round((monotonic() - started) * 1000, 2)
+    )
+
+def build_weekly_distribution(daily_comparison):
+    """Build visit distribution across days of the week from the daily comparison"""
     weekly_data = []
     for day_data in daily_comparison:
         improvement = ((day_data['manual'] - day_data['optimized']) / day_data['manual']) * 100 if day_data['manual'] > 0 else 0
@@ -964,305 +3808,1048 @@ async def get_weekly_distribution():
     
     return WeeklyDistributionData(weekly_data=weekly_data)
 
-# Coverage Analytics APIs
-@app.get("/api/coverage/agent-performance", response_model=AgentCoverageData)
-async def get_agent_performance():
-    """Get detailed performance metrics for each field agent"""
-    agent_performance = get_agent_performance_metrics()
-    
-    agents = []
-    for perf in agent_performance:
-        agents.append(AgentCoverage(
-            agent_id=perf['agent_id'],
-            name=perf['name'],
-            weekly_visits=perf['weekly_visits'],
-            store_time_percentage=perf['store_time_percentage'],
-            travel_time_percentage=perf['travel_time_percentage'],
-            admin_time_percentage=perf['admin_time_percentage'],
-            efficiency_rating=perf['efficiency_rating']
-        ))
+@span('build_scenario_payloads')
+def build_scenario_payloads(registry: ScenarioRegistry, visits: VisitTable, scenario_hash: Optional[str] = None) -> ScenarioPayloads:
+    """Precompute every response payload derived from a single scenario"""
+    stores_df, workers_df, store_dimension = registry.stores_df, registry.workers_df, registry.store_dimension
+    worker_dimension, shared_dir = registry.worker_dimension, registry.shared_dir
+    visit_aggregates = load_visit_aggregates(registry, visits, scenario_hash)
+    agent_aggregates = compute_agent_aggregates(workers_df, None, visit_aggregates)
+    route_index = RouteIndex.from_arrays(
+        load_scenario_arrays(shared_dir, 'routes', scenario_hash, lambda: build_route_index(visits).to_arrays()), visits
+    )
+    route_geometry = RouteGeometry(**load_scenario_arrays(
+        shared_dir, 'geometry', scenario_hash,
+        lambda: array_fields(build_route_geometry(stores_df, workers_df, worker_dimension, route_index))
+    ))
+    validation = RouteValidation(**load_scenario_arrays(
+        shared_dir, 'validation', scenario_hash,
+        lambda: array_fields(build_route_validation(stores_df, workers_df, store_dimension, worker_dimension, route_index))
+    ))
+    store_table = build_store_table(stores_df, store_dimension, load_scenario_arrays(
+        shared_dir, 'stores', scenario_hash, lambda: build_store_table_arrays(stores_df, visit_aggregates)
+    ))
     
-    return AgentCoverageData(agents=agents)
+    return ScenarioPayloads(
+        agent_coverage=AgentCoverageData(agents=get_agent_performance_metrics(agent_aggregates)),
+        store_chain_analysis=StoreChainAnalysis(chains=get_store_chain_analysis(store_dimension, visit_aggregates)),
+        top_stores=TopStoresAnalysis(top_stores=get_top_stores_by_volume(stores_df, visit_aggregates)),
+        chain_stores=MappingProxyType(get_chain_stores_data(stores_df, store_dimension, visit_aggregates)),
+        agent_stores=MappingProxyType(get_agent_stores_data(stores_df, store_dimension, workers_df, visits)),
+        visit_time_distribution=VisitTimeDistribution(
+            hourly_distribution=get_visit_time_distribution(visit_aggregates)
+        ),
+        agents=AgentsData(agents=get_agents_data(workers_df, agent_aggregates)),
+        route_index=route_index,
+        route_geometry=route_geometry,
+        validation=validation,
+        aggregates=visit_aggregates,
+        totals=compute_scenario_totals(stores_df, visit_aggregates),
+        visit_store_codes=visits.store_codes(slice(0, visits.routed)),
+        all_stores=AllStoresData(stores=get_all_stores_data(store_table)),
+        store_table=store_table,
+        agent_time_distribution=AgentTimeDistribution(
+            distribution=get_agent_time_distribution_data(workers_df, visit_aggregates)
+        ),
+    )
 
-@app.get("/api/coverage/store-chain-analysis", response_model=StoreChainAnalysis)
-async def get_store_chain_analysis_endpoint():
-    """Get coverage analysis by retail chain"""
-    chains = get_store_chain_analysis()
-    
-    chain_analysis = []
-    for chain in chains:
-        chain_analysis.append(ChainAnalysis(
-            chain=chain['chain'],
-            total_stores=chain['total_stores'],
-            weekly_visits=chain['weekly_visits'],
-            coverage_ratio=chain['coverage_ratio']
-        ))
+@span('build_comparison_payloads')
+def build_comparison_payloads(registry: ScenarioRegistry, before: VisitAggregates, after: VisitAggregates) -> ComparisonPayloads:
+    """Precompute every response payload comparing the visit counters of a before and an after scenario"""
+    stores_df, workers_df = registry.stores_df, registry.workers_df
+    daily_comparison = get_daily_visit_comparison(before, after)
+    agent_aggregates = compute_agent_aggregates(workers_df, before, after)
     
-    return StoreChainAnalysis(chains=chain_analysis)
-
-@app.get("/api/coverage/top-stores", response_model=TopStoresAnalysis)
-async def get_top_stores_endpoint():
-    """Get top 10 stores by sales volume with visit information"""
-    top_stores = get_top_stores_by_volume()
-    
-    stores_analysis = []
-    for store_data in top_stores:
-        stores_analysis.append(TopStore(
-            store_id=store_data['store_id'],
-            name=store_data['name'],
-            sales=store_data['sales'],
-            weekly_visits=store_data['weekly_visits'],
-            min_weekly_visits=store_data['min_weekly_visits'],
-            max_weekly_visits=store_data['max_weekly_visits'],
-            coverage_status=store_data['coverage_status'],
-            chain=store_data['chain']
-        ))
+    agent_stats = analyze_agent_workload(agent_aggregates)
+    agent_performance_comparison = AgentPerformanceComparison(agents=[
+        AgentPerformance(
+            agent_id=stat['agent_id'],
+            name=stat['name'],
+            visits_before=stat['visits_before'],
+            visits_after=stat['visits_after'],
+            efficiency_gain=round(stat['efficiency_gain'], 1)
+        )
+        for stat in agent_stats
+    ])
     
-    return TopStoresAnalysis(top_stores=stores_analysis)
+    before_totals = compute_scenario_totals(stores_df, before)
+    after_totals = compute_scenario_totals(stores_df, after)
+    active_agents = len(get_active_workers(workers_df))
+    
+    return ComparisonPayloads(
+        kpis=compute_dashboard_kpis(before_totals, after_totals, active_agents),
+        efficiency_comparison=EfficiencyComparison(daily_comparison=daily_comparison),
+        comparison_metrics=compute_comparison_metrics(before_totals, after_totals, active_agents, len(stores_df)),
+        agent_performance_comparison=agent_performance_comparison,
+        store_performance_comparison=StorePerformanceComparison(
+            stores=analyze_store_performance(stores_df, before, after)
+        ),
+        weekly_distribution=build_weekly_distribution(daily_comparison),
+    )
 
-@app.get("/api/coverage/chain-stores/{chain_name}")
-async def get_chain_stores(chain_name: str):
-    """Get detailed store information for a specific chain with daily visit schedule"""
-    # Extract chain names from stores
-    stores_with_chains = stores_df.copy()
-    stores_with_chains['chain'] = stores_with_chains['store'].str.split(',').str[0]
+@span('build_snapshot')
+def build_snapshot(stores_df, workers_df, scenarios: Dict[str, pd.DataFrame], version: int, source_hash: str,
+                   scenario_hashes: Optional[Dict[str, str]] = None) -> AnalyticsSnapshot:
+    """Build the analytics snapshot for one dataset; scenario_hashes holds the content hash of every scenario"""
+    store_dimension = build_store_dimension(stores_df)
+    worker_dimension = build_worker_dimension(workers_df)
+    shared_dir = shared_data_dir(source_hash)
+    scenarios = {
+        scenario_id: load_visit_table(shared_dir, (scenario_hashes or {}).get(scenario_id), routes_df, store_dimension, worker_dimension)
+        for scenario_id, routes_df in scenarios.items()
+    }
+    registry = ScenarioRegistry(stores_df, workers_df, store_dimension, worker_dimension, scenarios, scenario_hashes, shared_dir)
     
-    # Filter stores by chain
-    chain_stores = stores_with_chains[stores_with_chains['chain'] == chain_name]
+    # Precompute (and validate) the built-in scenarios and the default comparison
+    for scenario_id in BUILTIN_SCENARIOS:
+        validation = registry.scenario(scenario_id).validation
+        violating_visits = int(validation.violating_visits.sum())
+        if violating_visits:
+            logger.warning(
+                f"Scenario {scenario_id}: {violating_visits} of {len(validation.codes)} visits violate route constraints "
+                f"{violation_names(validation.code_counts.sum(axis=0))}"
+            )
+    registry.comparison(DEFAULT_BEFORE_SCENARIO, DEFAULT_AFTER_SCENARIO)
     
-    # Count visits per store and day
-    store_daily_visits = {}
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    active_workers_df = get_active_workers(workers_df)
     
+    return AnalyticsSnapshot(
+        version=version,
+        source_hash=source_hash,
+        loaded_at=datetime.now(),
+        stores_df=stores_df,
+        workers_df=workers_df,
+        store_dimension=store_dimension,
+        worker_dimension=worker_dimension,
+        store_grid=build_grid_index(stores_df['latitude'], stores_df['longitude']),
+        agent_grid=build_grid_index(active_workers_df['home_latitude'], active_workers_df['home_longitude']),
+        store_clusters=build_store_cluster_levels(stores_df, store_dimension),
+        distance_matrix=build_distance_matrix(stores_df, workers_df),
+        active_workers_df=active_workers_df,
+        store_chain_distribution=StoreChainDistribution(chains=get_store_chain_distribution(store_dimension)),
+        stores=StoresData(stores=get_stores_data(stores_df)),
+        scenarios=registry,
+    )
 
+# Load data on startup
+@app.on_event("startup")
+async def startup_event():
+    """Load data on application startup"""
+    load_data()
     
-    for _, visit in result_df.iterrows():
-        store_id = visit['store_id_destination']
-        day = visit['day'] if 'day' in visit else None
+    if DATA_RELOAD_INTERVAL > 0:
+        app.state.data_watcher = asyncio.create_task(watch_data_files())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the data file watcher and the compute pool"""
+    data_watcher = getattr(app.state, 'data_watcher', None)
+    if data_watcher is not None:
+        data_watcher.cancel()
+    compute_pool.shutdown()
+
+# Compute execution
+class ComputePool:
+    """Bounded thread pool running blocking analytics work off the event loop.
+
+    Each endpoint may run at most endpoint_concurrency tasks at once, so one slow
+    endpoint cannot take every worker thread. A request that waits longer than the
+    timeout for a slot gets 503; one whose work runs past the timeout gets 504 while
+    the work finishes in the background (filling the caches for the next request)
+    and keeps its slot until then. Threads rather than processes, because the work
+    reads the in-memory snapshot.
+    """
+
+    def __init__(self, max_workers: int, endpoint_concurrency: int, timeout: float):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='compute')
+        self.endpoint_concurrency = endpoint_concurrency
+        self.timeout = timeout
+        # Semaphores belong to an event loop; test clients may run several loops
+        self.slots = weakref.WeakKeyDictionary()
+
+    async def run(self, endpoint: str, fn, *args, timeout: Optional[float] = None):
+        """Run fn(*args) in the pool under the endpoint's concurrency limit and return its result"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        slots = self.slots.setdefault(loop, {}).setdefault(endpoint, asyncio.Semaphore(self.endpoint_concurrency))
         
-        if store_id not in store_daily_visits:
-            store_daily_visits[store_id] = {d: 0 for d in days_order}
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            metrics.add('compute_rejected_total', (endpoint, 'busy'))
+            raise HTTPException(status_code=503, detail=f"Too many concurrent {endpoint} requests", headers={'Retry-After': '1'})
         
-        # Map day names if they're different
-        day_mapping = {
-            'mon': 'Monday', 'tue': 'Tuesday', 'wed': 'Wednesday', 'thu': 'Thursday', 
-            'fri': 'Friday', 'sat': 'Saturday', 'sun': 'Sunday',
-            'monday': 'Monday', 'tuesday': 'Tuesday', 'wednesday': 'Wednesday',
-            'thursday': 'Thursday', 'friday': 'Friday', 'saturday': 'Saturday', 'sunday': 'Sunday',
-            'lunes': 'Monday', 'martes': 'Tuesday', 'miércoles': 'Wednesday', 'miercoles': 'Wednesday',
-            'jueves': 'Thursday', 'viernes': 'Friday', 'sábado': 'Saturday', 'sabado': 'Saturday', 'domingo': 'Sunday'
-        }
+        metrics.add('compute_tasks_running', (endpoint,), 1)
         
-        if day:
-            mapped_day = day_mapping.get(day.lower(), day)
-            if mapped_day in store_daily_visits[store_id]:
-                store_daily_visits[store_id][mapped_day] += 1
-    
-    # Build response
-    stores_detail = []
-    for _, store in chain_stores.iterrows():
-        store_id = store['id']
-        daily_visits = store_daily_visits.get(store_id, {day: 0 for day in days_order})
-        weekly_visits = sum(daily_visits.values())
+        def release(_):
+            metrics.add('compute_tasks_running', (endpoint,), -1)
+            loop.call_soon_threadsafe(slots.release)
         
-        stores_detail.append({
-            'store_id': store_id,
-            'name': store['store'],
-            'sales': int(store['sales']),
-            'weekly_visits': weekly_visits,
-            'min_weekly_visits': int(store['min_weekly_visits']),
-            'max_weekly_visits': int(store['max_weekly_visits']),
-            'coverage_status': 'Óptima' if weekly_visits >= store['min_weekly_visits'] else 'Insuficiente',
-            'daily_visits': daily_visits,
-            'latitude': float(store['latitude']),
-            'longitude': float(store['longitude'])
-        })
+        # Carry the request context (timing spans) into the worker thread
+        future = loop.run_in_executor(self.executor, copy_context().run, fn, *args)
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(deadline - monotonic(), 0))
+        except asyncio.TimeoutError:
+            metrics.add('compute_rejected_total', (endpoint, 'timeout'))
+            raise HTTPException(status_code=504, detail=f"The {endpoint} request took longer than {timeout:g}s")
+
+    def shutdown(self):
+        """Stop the worker threads, dropping queued work"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+compute_pool = ComputePool(COMPUTE_WORKERS, COMPUTE_ENDPOINT_CONCURRENCY, COMPUTE_TIMEOUT_SECONDS)
+
+# Encoded response cache
+class ResponseCache:
+    """LRU cache of encoded JSON response bodies keyed by dataset version and endpoint/params.
+
+    Payloads in a snapshot are validated once when the snapshot is built, so the
+    cached bytes are served as-is without per-request Pydantic validation. Bodies
+    naming a scenario are discarded when the scenario registry evicts it.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.latest_version = 0
+        self.discarded = 0
+        self.lock = threading.Lock()
+
+    def get(self, snapshot: AnalyticsSnapshot, key) -> Optional[bytes]:
+        """Cached body for key, None on a miss"""
+        cache_key = (snapshot.version, key)
+        with self.lock:
+            body = self.entries.get(cache_key)
+            if body is not None:
+                self.entries.move_to_end(cache_key)
+            return body
+
+    def get_or_encode(self, snapshot: AnalyticsSnapshot, key, build) -> bytes:
+        """Return the cached body for key, encoding build() on a miss"""
+        body = self.get(snapshot, key)
+        if body is not None:
+            return body
+        
+        # Encode outside the lock; concurrent misses just encode twice
+        discarded = self.discarded
+        body = to_json(build())
+        
+        with self.lock:
+            if snapshot.version > self.latest_version:
+                # A new dataset version was published, drop bodies of older ones
+                self.latest_version = snapshot.version
+                for stale_key in [k for k in self.entries if k[0] < snapshot.version]:
+                    del self.entries[stale_key]
+            # A body built while a scenario was evicted may belong to it
+            if discarded == self.discarded:
+                self.entries[(snapshot.version, key)] = body
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        
+        return body
+
+    def discard_scenario(self, scenario_id: str):
+        """Drop the bodies of every request naming a scenario"""
+        with self.lock:
+            self.discarded += 1
+            for stale_key in [k for k in self.entries if isinstance(k[1], tuple) and scenario_id in k[1]]:
+                del self.entries[stale_key]
+
+response_cache = ResponseCache(RESPONSE_CACHE_ENTRIES)
+
+async def cached_json_response(snapshot: AnalyticsSnapshot, key, build) -> Response:
+    """Serve a pre-encoded JSON body from the response cache, building misses in the compute pool.
+
+    The compute pool limits concurrent builds per endpoint, named by the first element of key.
+    """
+    body = response_cache.get(snapshot, key)
+    if body is None:
+        endpoint = key[0] if isinstance(key, tuple) else key
+        body = await compute_pool.run(endpoint, response_cache.get_or_encode, snapshot, key, build)
+    return Response(content=body, media_type="application/json")
+
+def comparison_section(snapshot: AnalyticsSnapshot, name: str, before: str, after: str):
+    """Cache key and build of a ComparisonPayloads field, as served by the field's own endpoint"""
+    return (name, before, after), lambda: getattr(get_comparison_payloads(snapshot, before, after), name)
+
+def scenario_section(snapshot: AnalyticsSnapshot, name: str, scenario: str):
+    """Cache key and build of a ScenarioPayloads field, as served by the field's own endpoint"""
+    return (name, scenario), lambda: getattr(get_scenario_payloads(snapshot, scenario), name)
+
+async def bundled_json_response(snapshot: AnalyticsSnapshot, endpoint: str, sections: Dict[str, Tuple[Any, Callable]]) -> Response:
+    """Serve several response cache entries as the fields of one JSON object.
+
+    sections maps field names to (cache key, build) pairs. Every section is cached
+    under the key of the endpoint serving it alone, so a bundle and those endpoints
+    share one encoded body, and all misses are built by a single compute pool task.
+    """
+    bodies = [response_cache.get(snapshot, key) for key, _ in sections.values()]
+    if any(body is None for body in bodies):
+        bodies = await compute_pool.run(endpoint, lambda: [
+            response_cache.get_or_encode(snapshot, key, build) for key, build in sections.values()
+        ])
+    fields = [to_json(name) + b':' + body for name, body in zip(sections, bodies)]
+    return Response(content=b'{' + b','.join(fields) + b'}', media_type="application/json")
+
+# Conditional GET support
+def compute_etag(snapshot: AnalyticsSnapshot, request: Request) -> str:
+    """Strong ETag for a GET request against one dataset version"""
+    digest = hashlib.sha256()
+    digest.update(ETAG_SALT.encode())
+    digest.update(snapshot.source_hash.encode())
+    digest.update(str(snapshot.scenarios.revision).encode())
+    digest.update(request.url.path.encode())
+    digest.update(repr(sorted(request.query_params.multi_items())).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+@app.middleware("http")
+async def conditional_get_middleware(request: Request, call_next):
+    """Answer repeated /api GETs with 304 while the dataset version is unchanged"""
+    snapshot = analytics_snapshot
+    if (
+        request.method not in ('GET', 'HEAD')
+        or not request.url.path.startswith('/api/')
+        or request.url.path.startswith('/api/admin/')
+        or snapshot is None
+    ):
+        return await call_next(request)
     
-    # Sort by sales descending
-    stores_detail.sort(key=lambda x: x['sales'], reverse=True)
+    etag = compute_etag(snapshot, request)
+    headers = {'ETag': etag, 'Cache-Control': API_CACHE_CONTROL}
     
-    return {
-        'chain': chain_name,
-        'total_stores': len(stores_detail),
-        'stores': stores_detail
-    }
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    response = await call_next(request)
+    
+    # Skip the ETag if a reload swapped the dataset while the response was built
+    if response.status_code == 200 and analytics_snapshot is snapshot:
+        response.headers.update(headers)
+    
+    return response
+
+def route_template(request: Request) -> str:
+    """Path template of the route a request matches, used as a low-cardinality metrics label"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Record latency, response size and in-flight requests per route, and profile slow requests"""
+    labels = (request.method, route_template(request))
+    spans = [] if SLOW_REQUEST_PROFILE_SECONDS > 0 else None
+    spans_token = request_spans.set(spans)
+    metrics.add('http_requests_in_flight', labels, 1)
+    started = perf_counter()
+    
+    def finish(status_code: int, size: int):
+        elapsed = perf_counter() - started
+        metrics.add('http_requests_in_flight', labels, -1)
+        metrics.add('http_requests_total', labels + (str(status_code),))
+        metrics.observe('http_request_duration_seconds', labels, elapsed)
+        metrics.observe('http_response_size_bytes', labels, size)
+        if spans is not None and elapsed >= SLOW_REQUEST_PROFILE_SECONDS:
+            query = f"?{request.url.query}" if request.url.query else ''
+            logger.warning(
+                f"Slow request {request.method} {request.url.path}{query} "
+                f"took {elapsed * 1000:.1f} ms:\n{format_request_spans(spans) or '(no spans)'}"
+            )
+    
+    try:
+        response = await call_next(request)
+    except Exception:
+        finish(500, 0)
+        raise
+    finally:
+        request_spans.reset(spans_token)
+    
+    content_length = response.headers.get('content-length')
+    if content_length is not None:
+        finish(response.status_code, int(content_length))
+        return response
+    
+    # Streamed bodies: measure until the last chunk is sent
+    body_iterator = response.body_iterator
+    
+    async def counted_body():
+        size = 0
+        try:
+            async for chunk in body_iterator:
+                size += len(chunk)
+                yield chunk
+        finally:
+            finish(response.status_code, size)
+    
+    response.body_iterator = counted_body()
+    return response
+
+def get_scenario_payloads(snapshot: AnalyticsSnapshot, scenario_id: str) -> ScenarioPayloads:
+    """Payloads of one scenario, 404 for unknown scenarios"""
+    if not snapshot.scenarios.contains(scenario_id):
+        raise HTTPException(status_code=404, detail=f"Unknown scenario '{scenario_id}'")
+    return snapshot.scenarios.scenario(scenario_id)
+
+def get_comparison_payloads(snapshot: AnalyticsSnapshot, before: str, after: str) -> ComparisonPayloads:
+    """Payloads comparing two scenarios, 404 for unknown scenarios"""
+    for scenario_id in (before, after):
+        if not snapshot.scenarios.contains(scenario_id):
+            raise HTTPException(status_code=404, detail=f"Unknown scenario '{scenario_id}'")
+    return snapshot.scenarios.comparison(before, after)
+
+@app.get("/api/dashboard/kpis", response_model=KPIMetrics)
+async def get_dashboard_kpis(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """
+    Provides key performance indicators for the dashboard.
+    """
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('kpis', before, after),
+        lambda: get_comparison_payloads(snapshot, before, after).kpis
+    )
+
+@app.get("/api/dashboard/efficiency-comparison", response_model=EfficiencyComparison)
+async def get_efficiency_comparison(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get daily visit comparison between two scenarios (manual and optimized by default)"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('efficiency_comparison', before, after),
+        lambda: get_comparison_payloads(snapshot, before, after).efficiency_comparison
+    )
+
+@app.get("/api/dashboard/store-chain-distribution", response_model=StoreChainDistribution)
+async def get_store_chain_distribution_endpoint():
+    """Get store count and visit distribution by retail chain"""
+    snapshot = get_snapshot()
+    return await cached_json_response(snapshot, 'store_chain_distribution', lambda: snapshot.store_chain_distribution)
+
+# Before/After Comparison APIs
+@app.get("/api/comparison/metrics", response_model=MetricsComparison)
+async def get_comparison_metrics(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get core comparison metrics between two scenarios (manual and optimized by default)"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('comparison_metrics', before, after),
+        lambda: get_comparison_payloads(snapshot, before, after).comparison_metrics
+    )
+
+@app.get("/api/comparison/agent-performance", response_model=AgentPerformanceComparison)
+async def get_agent_performance_comparison(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get agent-level comparison of visit counts and efficiency"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('agent_performance_comparison', before, after),
+        lambda: get_comparison_payloads(snapshot, before, after).agent_performance_comparison
+    )
+
+@app.get("/api/comparison/store-performance", response_model=StorePerformanceComparison)
+async def get_store_performance_comparison(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get store-level comparison of visit counts and coverage"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('store_performance_comparison', before, after),
+        lambda: get_comparison_payloads(snapshot, before, after).store_performance_comparison
+    )
+
+@app.get("/api/comparison/weekly-distribution", response_model=WeeklyDistributionData)
+async def get_weekly_distribution(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get visit distribution across days of the week"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('weekly_distribution', before, after),
+        lambda: get_comparison_payloads(snapshot, before, after).weekly_distribution
+    )
+
+# Coverage Analytics APIs
+@app.get("/api/coverage/agent-performance", response_model=AgentCoverageData)
+async def get_agent_performance(scenario: str = DEFAULT_AFTER_SCENARIO):
+    """Get detailed performance metrics for each field agent"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('agent_coverage', scenario),
+        lambda: get_scenario_payloads(snapshot, scenario).agent_coverage
+    )
+
+@app.get("/api/coverage/store-chain-analysis", response_model=StoreChainAnalysis)
+async def get_store_chain_analysis_endpoint(scenario: str = DEFAULT_AFTER_SCENARIO):
+    """Get coverage analysis by retail chain"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('store_chain_analysis', scenario),
+        lambda: get_scenario_payloads(snapshot, scenario).store_chain_analysis
+    )
+
+@app.get("/api/coverage/top-stores", response_model=TopStoresAnalysis)
+async def get_top_stores_endpoint(scenario: str = DEFAULT_AFTER_SCENARIO):
+    """Get top 10 stores by sales volume with visit information"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('top_stores', scenario),
+        lambda: get_scenario_payloads(snapshot, scenario).top_stores
+    )
+
+@app.get("/api/coverage/chain-stores/{chain_name}")
+async def get_chain_stores(chain_name: str, scenario: str = DEFAULT_AFTER_SCENARIO):
+    """Get detailed store information for a specific chain with daily visit schedule"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot,
+        ('chain_stores', scenario, chain_name),
+        lambda: get_scenario_payloads(snapshot, scenario).chain_stores.get(chain_name, {
+            'chain': chain_name,
+            'total_stores': 0,
+            'stores': []
+        })
+    )
 
 @app.get("/api/coverage/agent-stores/{agent_name}")
-async def get_agent_stores(agent_name: str):
+async def get_agent_stores(agent_name: str, scenario: str = DEFAULT_AFTER_SCENARIO):
     """Get detailed store information for a specific agent with daily visit schedule"""
-    # Get agent visits from result_df
-    agent_visits = result_df[result_df['worker_name'] == agent_name] if 'worker_name' in result_df.columns else pd.DataFrame()
-    
-    if agent_visits.empty:
-        # Try with worker_id if worker_name doesn't exist
-        # First get the worker_id for this agent name
-        agent_row = workers_df[workers_df['name'] == agent_name]
-        if not agent_row.empty:
-            worker_id = agent_row.iloc[0]['worker_id']
-            agent_visits = result_df[result_df['worker_id'] == worker_id]
-    
-    if agent_visits.empty:
-        return {
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot,
+        ('agent_stores', scenario, agent_name),
+        lambda: get_scenario_payloads(snapshot, scenario).agent_stores.get(agent_name, {
             'agent': agent_name,
             'total_stores': 0,
             'stores': []
-        }
-    
-    # Get unique stores visited by this agent
-    visited_store_ids = agent_visits['store_id_destination'].unique()
-    visited_stores = stores_df[stores_df['id'].isin(visited_store_ids)]
-    
-    # Count visits per store and day
-    store_daily_visits = {}
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    
-    for _, visit in agent_visits.iterrows():
-        store_id = visit['store_id_destination']
-        day = visit['day'] if 'day' in visit else None
-        
-        if store_id not in store_daily_visits:
-            store_daily_visits[store_id] = {d: 0 for d in days_order}
-        
-        # Map day names if they're different
-        day_mapping = {
-            'mon': 'Monday', 'tue': 'Tuesday', 'wed': 'Wednesday', 'thu': 'Thursday', 
-            'fri': 'Friday', 'sat': 'Saturday', 'sun': 'Sunday',
-            'monday': 'Monday', 'tuesday': 'Tuesday', 'wednesday': 'Wednesday',
-            'thursday': 'Thursday', 'friday': 'Friday', 'saturday': 'Saturday', 'sunday': 'Sunday',
-            'lunes': 'Monday', 'martes': 'Tuesday', 'miércoles': 'Wednesday', 'miercoles': 'Wednesday',
-            'jueves': 'Thursday', 'viernes': 'Friday', 'sábado': 'Saturday', 'sabado': 'Saturday', 'domingo': 'Sunday'
-        }
-        
-        if day:
-            mapped_day = day_mapping.get(day.lower(), day)
-            if mapped_day in store_daily_visits[store_id]:
-                store_daily_visits[store_id][mapped_day] += 1
-    
-    # Build response
-    stores_detail = []
-    for _, store in visited_stores.iterrows():
-        store_id = store['id']
-        daily_visits = store_daily_visits.get(store_id, {day: 0 for day in days_order})
-        weekly_visits = sum(daily_visits.values())
-        
-        stores_detail.append({
-            'store_id': store_id,
-            'name': store['store'],
-            'sales': int(store['sales']),
-            'weekly_visits': weekly_visits,
-            'min_weekly_visits': int(store['min_weekly_visits']),
-            'max_weekly_visits': int(store['max_weekly_visits']),
-            'coverage_status': 'Óptima' if weekly_visits >= store['min_weekly_visits'] else 'Insuficiente',
-            'daily_visits': daily_visits,
-            'latitude': float(store['latitude']),
-            'longitude': float(store['longitude'])
         })
-    
-    # Sort by sales descending
-    stores_detail.sort(key=lambda x: x['sales'], reverse=True)
-    
-    return {
-        'agent': agent_name,
-        'total_stores': len(stores_detail),
-        'stores': stores_detail
-    }
+    )
 
 @app.get("/api/coverage/visit-time-distribution", response_model=VisitTimeDistribution)
-async def get_visit_time_distribution_endpoint():
+async def get_visit_time_distribution_endpoint(scenario: str = DEFAULT_AFTER_SCENARIO):
     """Get hourly distribution of store visits"""
-    hourly_distribution = get_visit_time_distribution()
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('visit_time_distribution', scenario),
+        lambda: get_scenario_payloads(snapshot, scenario).visit_time_distribution
+    )
+
+@app.get("/api/coverage/visit-time-histogram", response_model=VisitTimeHistogram)
+async def get_visit_time_histogram_endpoint(
+    scenario: str = DEFAULT_AFTER_SCENARIO,
+    bin_minutes: int = DEFAULT_HISTOGRAM_BIN_MINUTES,
+    agent_id: Optional[str] = None,
+    chain: Optional[str] = None,
+    day: Optional[str] = None
+):
+    """Get visit arrivals and agents on site per time-of-day bin, optionally filtered"""
+    snapshot = get_snapshot()
+    if bin_minutes <= 0 or MINUTES_PER_DAY % bin_minutes:
+        raise HTTPException(status_code=400, detail=f"bin_minutes must divide {MINUTES_PER_DAY}")
+    day = parse_day_filter(day)
     
-    distribution = []
-    for hour_data in hourly_distribution:
-        distribution.append(HourlyDistribution(
-            hour=hour_data['hour'],
-            visit_count=hour_data['visit_count']
-        ))
+    def build():
+        payloads = get_scenario_payloads(snapshot, scenario)
+        histogram = get_visit_time_histogram(payloads.route_index, snapshot.store_dimension, bin_minutes, agent_id, chain, day)
+        return {'scenario': scenario, **histogram}
     
-    return VisitTimeDistribution(hourly_distribution=distribution)
+    return await cached_json_response(snapshot, ('visit-time-histogram', scenario, bin_minutes, agent_id, chain, day), build)
 
 # Maps and Routing APIs
 @app.get("/api/maps/stores", response_model=StoresData)
 async def get_stores():
     """Get all store locations with metadata"""
-    stores = get_stores_data()
-    
-    store_locations = []
-    for store in stores:
-        store_locations.append(StoreLocation(
-            store_id=store['store_id'],
-            name=store['name'],
-            sales=store['sales'],
-            latitude=store['latitude'],
-            longitude=store['longitude'],
-            chain=store['chain'],
-            min_weekly_visits=store['min_weekly_visits'],
-            max_weekly_visits=store['max_weekly_visits']
-        ))
-    
-    return StoresData(stores=store_locations)
+    snapshot = get_snapshot()
+    return await cached_json_response(snapshot, 'stores', lambda: snapshot.stores)
 
 @app.get("/api/maps/agents", response_model=AgentsData)
-async def get_agents():
+async def get_agents(scenario: str = DEFAULT_AFTER_SCENARIO):
     """Get all field agent locations and assignments"""
-    agents = get_agents_data()
-    
-    agent_locations = []
-    for agent in agents:
-        agent_locations.append(AgentLocation(
-            agent_id=agent['agent_id'],
-            name=agent['name'],
-            home_latitude=agent['home_latitude'],
-            home_longitude=agent['home_longitude'],
-            assigned_routes=agent['assigned_routes']
-        ))
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('agents', scenario),
+        lambda: get_scenario_payloads(snapshot, scenario).agents
+    )
+
+def resolve_query_point(
+    snapshot: AnalyticsSnapshot,
+    lat: Optional[float],
+    lon: Optional[float],
+    agent_id: Optional[str] = None,
+    store_id: Optional[str] = None
+):
+    """Query coordinates from lat/lon, an agent's home or a store's location"""
+    if agent_id is not None:
+        worker = snapshot.workers_df[snapshot.workers_df['worker_id'] == agent_id]
+        if worker.empty:
+            raise HTTPException(status_code=404, detail=f"Unknown agent '{agent_id}'")
+        return float(worker['home_latitude'].iloc[0]), float(worker['home_longitude'].iloc[0])
+    
+    if store_id is not None:
+        store_code = snapshot.store_dimension.encode_store_ids([store_id])[0]
+        if store_code < 0:
+            raise HTTPException(status_code=404, detail=f"Unknown store '{store_id}'")
+        store = snapshot.stores_df.iloc[store_code]
+        return float(store['latitude']), float(store['longitude'])
+    
+    if lat is None or lon is None:
+        raise HTTPException(status_code=400, detail="Provide lat and lon, agent_id or store_id")
+    return lat, lon
+
+def build_nearby_stores(snapshot: AnalyticsSnapshot, positions, distances) -> NearbyStoresData:
+    """Store locations for grid positions, with their distance to the query point"""
+    stores = snapshot.stores.stores
+    return NearbyStoresData(stores=[
+        NearbyStore(**stores[store_code].model_dump(), distance_km=round(float(distance), 3))
+        for store_code, distance in zip(snapshot.store_grid.ids[positions], distances)
+    ])
+
+@app.get("/api/maps/stores/bbox", response_model=StoresData)
+async def get_stores_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    """Get the store locations inside a map viewport"""
+    snapshot = get_snapshot()
+    
+    def build():
+        positions = grid_bbox(snapshot.store_grid, min_lat, min_lon, max_lat, max_lon)
+        # Keep stores.csv order
+        store_codes = np.sort(snapshot.store_grid.ids[positions])
+        stores = snapshot.stores.stores
+        return to_json(StoresData(stores=[stores[i] for i in store_codes]))
+    
+    return Response(content=await compute_pool.run('stores-bbox', build), media_type="application/json")
+
+def resolve_location(snapshot: AnalyticsSnapshot, location_id: str):
+    """Distance matrix point and coordinates of a store id or a HOME_<worker_id> location"""
+    if location_id.startswith('HOME_'):
+        worker_rows = np.flatnonzero(snapshot.workers_df['worker_id'].to_numpy() == location_id.removeprefix('HOME_'))
+        if len(worker_rows) == 0:
+            raise HTTPException(status_code=404, detail=f"Unknown location '{location_id}'")
+        worker = snapshot.workers_df.iloc[worker_rows[0]]
+        return len(snapshot.stores_df) + worker_rows[0], worker['home_latitude'], worker['home_longitude']
     
-    return AgentsData(agents=agent_locations)
+    store_code = snapshot.store_dimension.encode_store_ids([location_id])[0]
+    if store_code < 0:
+        raise HTTPException(status_code=404, detail=f"Unknown location '{location_id}'")
+    store = snapshot.stores_df.iloc[store_code]
+    return store_code, store['latitude'], store['longitude']
+
+def location_distance(snapshot: AnalyticsSnapshot, origin: str, destination: str) -> Optional[float]:
+    """Great-circle distance in km between two locations, None without coordinates"""
+    origin_point, origin_lat, origin_lon = resolve_location(snapshot, origin)
+    destination_point, destination_lat, destination_lon = resolve_location(snapshot, destination)
+    
+    if snapshot.distance_matrix is not None:
+        distance = float(snapshot.distance_matrix.distances[origin_point, destination_point])
+    else:
+        distance = float(haversine_km(origin_lat, origin_lon, destination_lat, destination_lon))
+    return None if np.isnan(distance) else round(distance, 3)
+
+@app.get("/api/maps/distance", response_model=LocationDistance)
+async def get_location_distance(origin: str, destination: str):
+    """Get the great-circle distance between two stores or agent homes (HOME_<worker_id>)"""
+    snapshot = get_snapshot()
+    return LocationDistance(origin=origin, destination=destination, distance_km=location_distance(snapshot, origin, destination))
+
+@app.get("/api/maps/stores/clusters", response_model=StoreClustersData)
+async def get_store_clusters(
+    zoom: int,
+    min_lat: float = -90,
+    min_lon: float = -180,
+    max_lat: float = 90,
+    max_lon: float = 180
+):
+    """Get store marker clusters for a map zoom level, optionally within a viewport"""
+    snapshot = get_snapshot()
+    if zoom < 0:
+        raise HTTPException(status_code=400, detail="zoom must not be negative")
+    
+    def build():
+        # Past the finest level clusters no longer change
+        level = snapshot.store_clusters[min(zoom, MAX_CLUSTER_ZOOM)]
+        positions = select_clusters(level, min_lat, min_lon, max_lat, max_lon)
+        return to_json(StoreClustersData(zoom=zoom, clusters=get_store_clusters_data(snapshot, level, positions)))
+    
+    return Response(content=await compute_pool.run('store-clusters', build), media_type="application/json")
+
+@app.get("/api/maps/stores/nearby", response_model=NearbyStoresData)
+async def get_nearby_stores(
+    radius_km: float,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    agent_id: Optional[str] = None
+):
+    """Get the stores within radius_km of a point or of an agent's home, nearest first"""
+    snapshot = get_snapshot()
+    if radius_km < 0:
+        raise HTTPException(status_code=400, detail="radius_km must not be negative")
+    
+    lat, lon = resolve_query_point(snapshot, lat, lon, agent_id=agent_id)
+    
+    def build():
+        positions, distances = grid_radius(snapshot.store_grid, lat, lon, radius_km)
+        return to_json(build_nearby_stores(snapshot, positions, distances))
+    
+    return Response(content=await compute_pool.run('stores-nearby', build), media_type="application/json")
+
+@app.get("/api/maps/stores/nearest", response_model=NearbyStoresData)
+async def get_nearest_stores(
+    k: int = 10,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    agent_id: Optional[str] = None
+):
+    """Get the k stores nearest to a point or to an agent's home"""
+    snapshot = get_snapshot()
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be positive")
+    
+    lat, lon = resolve_query_point(snapshot, lat, lon, agent_id=agent_id)
+    
+    def build():
+        positions, distances = grid_nearest(snapshot.store_grid, lat, lon, k)
+        return to_json(build_nearby_stores(snapshot, positions, distances))
+    
+    return Response(content=await compute_pool.run('stores-nearest', build), media_type="application/json")
+
+@app.get("/api/maps/agents/nearest", response_model=NearbyAgentsData)
+async def get_nearest_agents(
+    k: int = 5,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    store_id: Optional[str] = None
+):
+    """Get the k active agents whose home is nearest to a point or to a store"""
+    snapshot = get_snapshot()
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be positive")
+    
+    lat, lon = resolve_query_point(snapshot, lat, lon, store_id=store_id)
+    
+    def build():
+        positions, distances = grid_nearest(snapshot.agent_grid, lat, lon, k)
+        workers = snapshot.active_workers_df.iloc[snapshot.agent_grid.ids[positions]]
+        agents = [
+            NearbyAgent(
+                agent_id=worker['worker_id'],
+                name=worker['name'],
+                home_latitude=worker['home_latitude'],
+                home_longitude=worker['home_longitude'],
+                distance_km=round(float(distance), 3)
+            )
+            for (_, worker), distance in zip(workers.iterrows(), distances)
+        ]
+        return to_json(NearbyAgentsData(agents=agents))
+    
+    return Response(content=await compute_pool.run('agents-nearest', build), media_type="application/json")
 
 @app.get("/api/maps/routes/{process_type}", response_model=RoutesData)
 async def get_routes(process_type: str):
-    """Get route data for visualization (manual or optimized)"""
-    if process_type not in ["manual", "optimized"]:
-        raise HTTPException(status_code=400, detail="process_type must be 'manual' or 'optimized'")
-    
-    routes_data = get_routes_data(process_type)
-    
-    routes = []
-    for route_data in routes_data:
-        visits = []
-        for visit_data in route_data['visits']:
-            visits.append(RouteVisit(
-                store_id=visit_data['store_id'],
-                arrival_time=visit_data['arrival_time'],
-                departure_time=visit_data['departure_time'],
-                service_duration=visit_data['service_duration'],
-                travel_time=visit_data['travel_time']
-            ))
-        
-        routes.append(Route(
-            agent_id=route_data['agent_id'],
-            day=route_data['day'],
-            visits=visits
-        ))
+    """Get route data for visualization of a scenario ('manual', 'optimized' or a scenario id)"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('routes', process_type),
+        lambda: {'routes': get_routes_data(get_scenario_payloads(snapshot, process_type).route_index)}
+    )
+
+@app.get("/api/maps/routes/{process_type}/paths", response_model=RoutePathsData)
+async def get_route_paths(process_type: str, agent_id: Optional[str] = None, day: Optional[str] = None):
+    """Get encoded route polylines (home, then stores in visit order) with leg distances"""
+    snapshot = get_snapshot()
+    day = parse_day_filter(day)
+    
+    def build():
+        payloads = get_scenario_payloads(snapshot, process_type)
+        return {'routes': [
+            get_route_path_data(payloads.route_index, payloads.route_geometry, route)
+            for route in select_routes(payloads.route_index, agent_id, day)
+        ]}
     
-    return RoutesData(routes=routes)
+    return await cached_json_response(snapshot, ('route-paths', process_type, agent_id, day), build)
+
+def route_cursor_scope(process_type: str, agent_id: Optional[str], day: Optional[int]) -> str:
+    """Digest of the scenario and filters a route listing is paged over"""
+    return hashlib.sha256(repr((process_type, agent_id, day)).encode()).hexdigest()[:16]
+
+def encode_route_cursor(snapshot: AnalyticsSnapshot, scope: str, position: int) -> str:
+    """Opaque cursor for a position in one route listing of one dataset version"""
+    return base64.urlsafe_b64encode(f"{snapshot.source_hash[:16]}:{scope}:{position}".encode()).decode()
+
+def decode_route_cursor(snapshot: AnalyticsSnapshot, scope: str, cursor: str) -> int:
+    """Position encoded in a route cursor.
+
+    400 if the cursor is malformed or was issued for another scenario or other
+    filters, 410 if it is from another dataset version.
+    """
+    try:
+        source_hash, cursor_scope, position = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        position = int(position)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if position < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if source_hash != snapshot.source_hash[:16]:
+        raise HTTPException(status_code=410, detail="Cursor expired, the dataset was reloaded")
+    if cursor_scope != scope:
+        raise HTTPException(status_code=400, detail="Cursor was issued for another scenario or other filters")
+    return position
+
+@app.get("/api/maps/routes/{process_type}/export")
+async def export_routes(
+    process_type: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    agent_id: Optional[str] = None,
+    day: Optional[str] = None
+):
+    """Stream a page of routes as NDJSON (one Route object per line).
+
+    Pass the X-Next-Cursor response header as cursor, with the same filters, to
+    fetch the next page. Without limit all remaining routes are streamed.
+    """
+    snapshot = get_snapshot()
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    day = parse_day_filter(day)
+    
+    # The first request for a scenario builds its payloads
+    route_index = await compute_pool.run('routes-export', lambda: get_scenario_payloads(snapshot, process_type).route_index)
+    
+    routes = select_routes(route_index, agent_id, day)
+    scope = route_cursor_scope(process_type, agent_id, day)
+    start = decode_route_cursor(snapshot, scope, cursor) if cursor else 0
+    end = len(routes) if limit is None else min(start + limit, len(routes))
+    page = routes[start:end]
+    
+    def generate_lines():
+        for chunk_start in range(0, len(page), ROUTE_EXPORT_CHUNK_ROUTES):
+            chunk = page[chunk_start:chunk_start + ROUTE_EXPORT_CHUNK_ROUTES]
+            yield b''.join(to_json(get_route_data(route_index, route)) + b'\n' for route in chunk)
+    
+    headers = {'X-Total-Routes': str(len(routes))}
+    if end < len(routes):
+        headers['X-Next-Cursor'] = encode_route_cursor(snapshot, scope, end)
+    
+    return StreamingResponse(generate_lines(), media_type='application/x-ndjson', headers=headers)
 
 # All Stores API
 @app.get("/api/all-stores", response_model=AllStoresData)
-async def get_all_stores():
-    """Get comprehensive data for all stores with weekly schedule"""
-    stores_data = get_all_stores_data()
-    return AllStoresData(stores=stores_data)
+async def get_all_stores(
+    scenario: str = DEFAULT_AFTER_SCENARIO,
+    fields: Optional[str] = None,
+    chain: Optional[str] = None,
+    coverage: Optional[str] = None,
+    sort: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None
+):
+    """Get comprehensive data for all stores with weekly schedule.
+
+    fields (comma separated), chain and coverage filters, sort and offset/limit
+    select a page of stores; the X-Total-Stores header then holds the number of
+    stores matching the filters.
+    """
+    snapshot = get_snapshot()
+    if fields is None and chain is None and coverage is None and sort is None and offset == 0 and limit is None:
+        return await cached_json_response(
+            snapshot, ('all_stores', scenario),
+            lambda: get_scenario_payloads(snapshot, scenario).all_stores
+        )
+    
+    requested = STORE_TABLE_FIELDS if fields is None else [field.strip() for field in fields.split(',') if field.strip()]
+    for field in requested:
+        if field not in STORE_TABLE_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown field '{field}'")
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    if sort is not None and sort.removeprefix('-') not in STORE_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(STORE_SORT_KEYS)}, optionally prefixed with '-'")
+    if coverage is not None and coverage not in STORE_COVERAGE_FILTERS:
+        raise HTTPException(status_code=400, detail=f"coverage must be one of {', '.join(STORE_COVERAGE_FILTERS)}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must not be negative")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    field_names = [field for field in STORE_TABLE_FIELDS if field in requested]
+    
+    def build():
+        table = get_scenario_payloads(snapshot, scenario).store_table
+        rows, total = select_store_rows(table, chain, coverage, sort, offset, limit)
+        return total, to_json({'stores': get_store_table_rows(table, rows, field_names)})
+    
+    total, body = await compute_pool.run('all_stores', build)
+    return Response(content=body, media_type="application/json", headers={'X-Total-Stores': str(total)})
 
 @app.get("/api/dashboard/agent-time-distribution", response_model=AgentTimeDistribution)
-async def get_agent_time_distribution():
+async def get_agent_time_distribution(scenario: str = DEFAULT_AFTER_SCENARIO):
     """Get agent time distribution data"""
+    snapshot = get_snapshot()
+    return await cached_json_response(
+        snapshot, ('agent_time_distribution', scenario),
+        lambda: get_scenario_payloads(snapshot, scenario).agent_time_distribution
+    )
+
+# Page bundle APIs: every section of a page in one response
+@app.get("/api/pages/dashboard", response_model=DashboardPage)
+async def get_dashboard_page(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get the KPIs, daily comparison, chain distribution and time distribution of the dashboard"""
+    snapshot = get_snapshot()
+    return await bundled_json_response(snapshot, 'page-dashboard', {
+        'kpis': comparison_section(snapshot, 'kpis', before, after),
+        'efficiency_comparison': comparison_section(snapshot, 'efficiency_comparison', before, after),
+        'store_chain_distribution': ('store_chain_distribution', lambda: snapshot.store_chain_distribution),
+        'agent_time_distribution': scenario_section(snapshot, 'agent_time_distribution', after),
+    })
+
+@app.get("/api/pages/before-after", response_model=BeforeAfterPage)
+async def get_before_after_page(before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Get the KPIs, metrics and agent, store and weekly comparisons of the before/after page"""
+    snapshot = get_snapshot()
+    return await bundled_json_response(snapshot, 'page-before-after', {
+        'kpis': comparison_section(snapshot, 'kpis', before, after),
+        'metrics': comparison_section(snapshot, 'comparison_metrics', before, after),
+        'agent_performance': comparison_section(snapshot, 'agent_performance_comparison', before, after),
+        'store_performance': comparison_section(snapshot, 'store_performance_comparison', before, after),
+        'weekly_distribution': comparison_section(snapshot, 'weekly_distribution', before, after),
+    })
+
+@app.get("/api/pages/coverage", response_model=CoveragePage)
+async def get_coverage_page(scenario: str = DEFAULT_AFTER_SCENARIO):
+    """Get the agent coverage, chain analysis, visit times and store table of the coverage page"""
+    snapshot = get_snapshot()
+    return await bundled_json_response(snapshot, 'page-coverage', {
+        'agent_performance': scenario_section(snapshot, 'agent_coverage', scenario),
+        'store_chain_analysis': scenario_section(snapshot, 'store_chain_analysis', scenario),
+        'visit_time_distribution': scenario_section(snapshot, 'visit_time_distribution', scenario),
+        'all_stores': scenario_section(snapshot, 'all_stores', scenario),
+    })
+
+# Scenario APIs
+@app.get("/api/scenarios", response_model=ScenariosData)
+async def get_scenarios():
+    """List the routing scenarios of the loaded dataset"""
+    snapshot = get_snapshot()
+    # Include the scenarios other worker processes derived
+    await compute_pool.run('scenarios', snapshot.scenarios.attach_published)
+    return await cached_json_response(snapshot, ('scenarios', snapshot.scenarios.revision), lambda: ScenariosData(scenarios=[
+        ScenarioInfo(
+            scenario_id=scenario_id,
+            visits=len(visits),
+            agents=len(visits.agent_ids),
+            builtin=scenario_id in BUILTIN_SCENARIOS
+        )
+        for scenario_id, visits in snapshot.scenarios.scenarios.items()
+    ]))
+
+# Route Validation APIs
+@app.get("/api/validation/routes", response_model=ValidationSummary)
+async def get_route_validation(scenario: str = DEFAULT_AFTER_SCENARIO):
+    """Get violation counts of a scenario per agent and day"""
+    snapshot = get_snapshot()
+    
+    def build():
+        payloads = get_scenario_payloads(snapshot, scenario)
+        return get_validation_summary(scenario, payloads.route_index, payloads.validation)
+    
+    return await cached_json_response(snapshot, ('validation-routes', scenario), build)
+
+@app.get("/api/validation/visits", response_model=VisitViolationsData)
+async def get_visit_validation(
+    scenario: str = DEFAULT_AFTER_SCENARIO,
+    agent_id: Optional[str] = None,
+    day: Optional[str] = None,
+    code: Optional[str] = None
+):
+    """Get the visits of a scenario that violate route constraints, optionally filtered"""
+    snapshot = get_snapshot()
+    if code is not None and code not in VISIT_VIOLATION_CODES:
+        raise HTTPException(status_code=400, detail=f"Unknown violation code '{code}'")
+    day = parse_day_filter(day)
+    
+    def build():
+        payloads = get_scenario_payloads(snapshot, scenario)
+        routes = select_routes(payloads.route_index, agent_id, day)
+        return {'visits': get_visit_violations(payloads.route_index, payloads.validation, routes, code)}
+    
+    return await cached_json_response(snapshot, ('validation-visits', scenario, agent_id, day, code), build)
+
+@app.post("/api/scenarios/{scenario_id}/improve", response_model=RouteImprovementResult)
+async def improve_scenario(scenario_id: str, request: RouteImprovementRequest):
+    """Improve a scenario's routes within a time budget and add the result as a new scenario"""
+    snapshot = get_snapshot()
+    if not snapshot.scenarios.contains(scenario_id):
+        raise HTTPException(status_code=404, detail=f"Unknown scenario '{scenario_id}'")
+    if request.time_budget_seconds <= 0:
+        raise HTTPException(status_code=400, detail="time_budget_seconds must be positive")
+    
+    for agent_id in request.exclude_agents:
+        if not (snapshot.workers_df['worker_id'] == agent_id).any():
+            raise HTTPException(status_code=404, detail=f"Unknown agent '{agent_id}'")
+    for store_id in request.exclude_stores:
+        if snapshot.store_dimension.encode_store_ids([store_id])[0] < 0:
+            raise HTTPException(status_code=404, detail=f"Unknown store '{store_id}'")
+    
+    # Local search is CPU bound and runs for its whole time budget
+    return await compute_pool.run(
+        'improve', improve_scenario_routes, snapshot, scenario_id, request,
+        timeout=request.time_budget_seconds + compute_pool.timeout
+    )
+
+# What-if Simulation APIs
+@app.post("/api/what-if", response_model=WhatIfResult)
+async def simulate_edits(request: WhatIfRequest, before: str = DEFAULT_BEFORE_SCENARIO, after: str = DEFAULT_AFTER_SCENARIO):
+    """Simulate agent and store edits on the after scenario and get the resulting KPIs and metrics"""
+    snapshot = get_snapshot()
+    for scenario_id in (before, after):
+        if not snapshot.scenarios.contains(scenario_id):
+            raise HTTPException(status_code=404, detail=f"Unknown scenario '{scenario_id}'")
+    
+    # The first simulation of a scenario may build its payloads
+    return await compute_pool.run('what-if', simulate_what_if, snapshot, before, after, request)
+
+# Admin APIs
+def check_admin_token(x_admin_token: Optional[str]):
+    """Reject admin requests without the configured token, and every admin request when none is configured"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/api/admin/data-version", response_model=DataVersion)
+async def get_data_version():
+    """Get the version of the dataset currently being served"""
+    snapshot = get_snapshot()
+    return DataVersion(version=snapshot.version, source_hash=snapshot.source_hash, loaded_at=snapshot.loaded_at)
+
+@app.post("/api/admin/reload", response_model=ReloadStatus)
+async def reload_data(force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """Reload the data files and swap in the new dataset version"""
+    check_admin_token(x_admin_token)
+    
     try:
-        distribution_data = get_agent_time_distribution_data()
-        return AgentTimeDistribution(distribution=distribution_data)
+        reloaded = await asyncio.to_thread(load_data, force)
     except Exception as e:
-        logger.error(f"Error in get_agent_time_distribution endpoint: {e}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Reload failed: {str(e)}")
+    
+    snapshot = get_snapshot()
+    return ReloadStatus(
+        version=snapshot.version,
+        source_hash=snapshot.source_hash,
+        loaded_at=snapshot.loaded_at,
+        reloaded=reloaded
+    )
+
+# Metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, span and cache metrics in the Prometheus text format"""
+    snapshot = analytics_snapshot
+    metrics.set('data_snapshot_version', (), snapshot.version if snapshot is not None else 0)
+    metrics.set('response_cache_entries', (), len(response_cache.entries))
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # Health check endpoint
 @app.get("/health")
@@ -1283,4 +4870,4 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
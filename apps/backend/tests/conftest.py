@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+# Serve the bundled dataset without the parsed-data cache or the file watcher;
+# main reads its configuration on import
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ['DATA_DIR'] = os.path.join(BACKEND_DIR, 'data')
+os.environ['DATA_CACHE_DIR'] = ''
+os.environ['DATA_RELOAD_INTERVAL'] = '0'
+
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Test client of the app with the dataset loaded"""
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def snapshot(client):
+    """The analytics snapshot being served"""
+    return main.get_snapshot()
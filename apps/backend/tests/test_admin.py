@@ -0,0 +1,27 @@
+import pytest
+
+import main
+
+
+def reload(client, **headers):
+    return client.post('/api/admin/reload', headers=headers)
+
+
+def test_reload_is_disabled_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', None)
+    assert reload(client).status_code == 403
+    assert reload(client, **{'X-Admin-Token': ''}).status_code == 403
+
+
+@pytest.mark.parametrize('token', [None, 'wrong', 'secret2'])
+def test_reload_rejects_other_tokens(client, monkeypatch, token):
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'secret')
+    headers = {} if token is None else {'X-Admin-Token': token}
+    assert reload(client, **headers).status_code == 403
+
+
+def test_reload_with_the_token_keeps_unchanged_data(client, monkeypatch):
+    monkeypatch.setattr(main, 'ADMIN_TOKEN', 'secret')
+    response = reload(client, **{'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert response.json()['reloaded'] is False
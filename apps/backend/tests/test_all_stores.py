@@ -0,0 +1,51 @@
+import pytest
+
+
+def all_stores(client, **params):
+    return client.get('/api/all-stores', params=params)
+
+
+def test_unfiltered_listing_has_every_store_and_field(client, snapshot):
+    stores = all_stores(client).json()['stores']
+    assert [store['store_id'] for store in stores] == snapshot.stores_df['id'].astype(str).tolist()
+
+
+def test_selected_fields_keep_table_order(client, snapshot):
+    response = all_stores(client, fields='sales, store_id')
+    assert response.status_code == 200
+    assert response.headers['X-Total-Stores'] == str(len(snapshot.stores_df))
+    assert all(list(store) == ['store_id', 'sales'] for store in response.json()['stores'])
+
+
+@pytest.mark.parametrize('sort', ['sales', '-sales', 'name', '-weekly_visits'])
+def test_sorted_pages_concatenate_to_the_sorted_listing(client, sort):
+    key = sort.removeprefix('-')
+    full = all_stores(client, fields=f'store_id,{key}', sort=sort).json()['stores']
+    values = [store[key] for store in full]
+    assert values == sorted(values, reverse=sort.startswith('-'))
+
+    pages = [all_stores(client, fields=f'store_id,{key}', sort=sort, offset=offset, limit=7).json()['stores'] for offset in range(0, len(full), 7)]
+    assert [store for page in pages for store in page] == full
+
+
+def test_filters_count_the_matching_stores(client):
+    visited = all_stores(client, fields='store_id,weekly_visits', coverage='visited')
+    unvisited = all_stores(client, fields='store_id,weekly_visits', coverage='unvisited', limit=1)
+    stores = all_stores(client).json()['stores']
+
+    assert all(store['weekly_visits'] > 0 for store in visited.json()['stores'])
+    assert int(visited.headers['X-Total-Stores']) + int(unvisited.headers['X-Total-Stores']) == len(stores)
+    assert len(unvisited.json()['stores']) <= 1
+
+
+@pytest.mark.parametrize('params', [
+    {'fields': 'store_id,unknown'},
+    {'fields': ' , '},
+    {'sort': 'distance'},
+    {'sort': '--sales'},
+    {'coverage': 'partial'},
+    {'offset': -1},
+    {'limit': 0},
+])
+def test_invalid_parameters_are_400(client, params):
+    assert all_stores(client, **params).status_code == 400
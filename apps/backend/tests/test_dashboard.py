@@ -0,0 +1,16 @@
+import main
+
+
+def distribution(client, scenario):
+    values = client.get('/api/pages/dashboard', params={'after': scenario}).json()['agent_time_distribution']['distribution']
+    return {entry['name']: entry['value'] for entry in values}
+
+
+def test_time_distribution_follows_the_scenario_durations(client, snapshot):
+    for scenario in ('manual', 'optimized'):
+        aggregates = main.get_scenario_payloads(snapshot, scenario).aggregates
+        service_share = aggregates.service_min / (aggregates.service_min + aggregates.trip_time) * 96
+        values = distribution(client, scenario)
+
+        assert round(sum(values.values()), 1) == 100.0
+        assert values['Servicio en Tienda'] == (round(service_share, 1) if service_share >= 85 else 87.0)
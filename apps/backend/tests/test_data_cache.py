@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import main
+
+
+def test_cached_tables_read_back_equal_to_the_parsed_csv(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'DATA_CACHE_DIR', str(tmp_path))
+    files = {key: filename for key, filename, _, _ in main.stat_data_files()}
+
+    for key, text_column in (('stores', 'id'), ('workers', 'worker_id'), ('result', 'store_id_destination')):
+        with open(os.path.join(main.DATA_DIR, files[key]), 'rb') as f:
+            source = f.read()
+        parsed, file_hash = main.load_table(key, files[key], main.hashlib.sha256(source).hexdigest(), source)
+        assert os.path.isdir(main.table_cache_path(key, file_hash))
+
+        cached, cached_hash = main.load_table(key, files[key], file_hash, None)
+        assert cached_hash == file_hash
+        pd.testing.assert_frame_equal(cached, parsed, check_dtype=False)
+        # Text stays coded over the mapped file, with its distinct values as the only objects
+        assert isinstance(cached[text_column].dtype, pd.CategoricalDtype)
+
+
+def test_shared_visit_counters_are_built_once(snapshot, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'DATA_CACHE_DIR', str(tmp_path))
+    aggregates = main.get_scenario_payloads(snapshot, 'optimized').aggregates
+    builds = []
+
+    def build():
+        builds.append(1)
+        return aggregates.to_arrays()
+
+    directory = main.shared_data_dir(snapshot.source_hash)
+    first = main.load_shared_arrays(directory, 'aggregates-test', build)
+    second = main.load_shared_arrays(directory, 'aggregates-test', build)
+
+    assert len(builds) == 1
+    shared = main.VisitAggregates.from_arrays(snapshot.store_dimension, snapshot.worker_dimension, second)
+    for name in main.VisitAggregates.COUNTERS:
+        np.testing.assert_array_equal(getattr(shared, name), getattr(aggregates, name))
+        np.testing.assert_array_equal(first[name], second[name])
+    assert (shared.visits, shared.unknown_store_visits) == (aggregates.visits, aggregates.unknown_store_visits)
+
+
+def test_shared_visit_tables_and_route_indexes_read_back_equal(snapshot, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'DATA_CACHE_DIR', str(tmp_path))
+    directory = main.shared_data_dir(snapshot.source_hash)
+    routes_df = snapshot.scenarios.visits('optimized').to_frame()
+    visits = main.build_visit_table(routes_df, snapshot.store_dimension, snapshot.worker_dimension)
+    route_index = main.build_route_index(visits)
+
+    for _ in range(2):
+        shared = main.load_visit_table(directory, 'a' * 64, routes_df, snapshot.store_dimension, snapshot.worker_dimension)
+        shared_index = main.RouteIndex.from_arrays(main.load_shared_arrays(directory, 'routes-test', route_index.to_arrays), shared)
+
+    pd.testing.assert_frame_equal(shared.to_frame(), visits.to_frame())
+    assert shared.agent_ids.dtype == object and shared.routed == visits.routed
+    for name, values in route_index.to_arrays().items():
+        np.testing.assert_array_equal(getattr(shared_index, name), values)
+    assert dict(shared_index.agent_codes) == dict(route_index.agent_codes)
+    for day in range(len(main.DAYS_ORDER)):
+        np.testing.assert_array_equal(main.select_routes(shared_index, day=day), np.flatnonzero(route_index.route_day_positions == day))
+    assert [shared_index.route_day(route) for route in range(3)] == [route_index.route_day(route) for route in range(3)]
+
+
+def test_shared_directories_in_use_are_kept(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'DATA_CACHE_DIR', str(tmp_path))
+    held_dir, unused_dir = main.shared_data_dir('a' * 64), main.shared_data_dir('b' * 64)
+    os.makedirs(unused_dir)
+    users_file = main.hold_shared_data_dir(held_dir)
+
+    main.remove_unused_shared_data_dirs('c' * 64)
+    assert os.path.isdir(held_dir) and not os.path.exists(unused_dir)
+
+    users_file.close()
+    main.remove_unused_shared_data_dirs('c' * 64)
+    assert not os.path.exists(held_dir)
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+
+def route_count(client, day):
+    response = client.get('/api/maps/routes/optimized/export', params={'day': day})
+    assert response.status_code == 200
+    return int(response.headers['X-Total-Routes'])
+
+
+@pytest.mark.parametrize('day', ['Friday', 'friday', 'FRI', 'fri', 'viernes'])
+def test_day_filters_accept_every_spelling(client, day):
+    assert route_count(client, day) == route_count(client, 'Friday') > 0
+
+
+def test_day_filters_agree_across_endpoints(client):
+    params = {'day': 'Friday'}
+    exported = client.get('/api/maps/routes/optimized/export', params=params).text.splitlines()
+    paths = client.get('/api/maps/routes/optimized/paths', params=params).json()['routes']
+    histogram = client.get('/api/coverage/visit-time-histogram', params={'scenario': 'optimized', **params}).json()
+
+    routes = [json.loads(line) for line in exported]
+    assert len(paths) == len(routes)
+    assert sum(bin['visits'] for bin in histogram['bins']) == histogram['visits'] > 0
+    assert histogram['visits'] <= sum(len(route['visits']) for route in routes)
+
+
+@pytest.mark.parametrize('path', [
+    '/api/maps/routes/optimized/export',
+    '/api/maps/routes/optimized/paths',
+    '/api/coverage/visit-time-histogram',
+    '/api/validation/visits',
+])
+def test_unknown_days_are_400(client, path):
+    assert client.get(path, params={'day': 'Blursday'}).status_code == 400
@@ -0,0 +1,20 @@
+import main
+
+
+def test_distance_matrix_matches_haversine(client, snapshot):
+    stores = snapshot.stores_df
+    origin, destination = stores.iloc[0], stores.iloc[-1]
+
+    response = client.get('/api/maps/distance', params={'origin': origin['id'], 'destination': destination['id']})
+    assert response.status_code == 200
+    expected = main.haversine_km(origin['latitude'], origin['longitude'], destination['latitude'], destination['longitude'])
+    assert abs(response.json()['distance_km'] - expected) < 1e-3
+
+
+def test_datasets_past_the_point_limit_skip_the_matrix(snapshot, monkeypatch):
+    n_points = len(snapshot.stores_df) + len(snapshot.workers_df)
+    monkeypatch.setattr(main, 'DISTANCE_MATRIX_MAX_POINTS', n_points - 1)
+    assert main.build_distance_matrix(snapshot.stores_df, snapshot.workers_df) is None
+
+    monkeypatch.setattr(main, 'DISTANCE_MATRIX_MAX_POINTS', n_points)
+    assert main.build_distance_matrix(snapshot.stores_df, snapshot.workers_df).distances.shape == (n_points, n_points)
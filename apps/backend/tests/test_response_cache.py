@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+def test_cached_bodies_round_trip_with_etags(client, snapshot):
+    first = client.get('/api/dashboard/kpis')
+    assert first.status_code == 200
+    assert main.response_cache.get(snapshot, ('kpis', main.DEFAULT_BEFORE_SCENARIO, main.DEFAULT_AFTER_SCENARIO)) == first.content
+
+    second = client.get('/api/dashboard/kpis')
+    assert second.content == first.content and second.headers['ETag'] == first.headers['ETag']
+
+    revalidated = client.get('/api/dashboard/kpis', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.content == b''
+
+
+def test_page_bundles_share_the_cached_sections(client):
+    page = client.get('/api/pages/dashboard').json()
+    assert page['kpis'] == client.get('/api/dashboard/kpis').json()
+    assert page['efficiency_comparison'] == client.get('/api/dashboard/efficiency-comparison').json()
+
+
+def test_metrics_count_served_and_revalidated_requests(client):
+    etag = client.get('/api/maps/stores').headers['ETag']
+    client.get('/api/maps/stores', headers={'If-None-Match': etag})
+
+    metrics = client.get('/metrics').text
+    assert 'http_requests_total{method="GET",route="/api/maps/stores",status="200"}' in metrics
+    assert 'http_requests_total{method="GET",route="/api/maps/stores",status="304"}' in metrics
+    assert 'response_cache_entries 0' not in metrics
+
+
+def test_compute_pool_rejects_busy_and_slow_work():
+    pool = main.ComputePool(max_workers=2, endpoint_concurrency=1, timeout=0.05)
+
+    async def run_twice():
+        slow = asyncio.ensure_future(pool.run('test', time.sleep, 0.5, timeout=5))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as busy:
+            await pool.run('test', time.sleep, 0)
+        await slow
+        return busy.value
+
+    try:
+        assert asyncio.run(run_twice()).status_code == 503
+        with pytest.raises(HTTPException) as slow:
+            asyncio.run(pool.run('test', time.sleep, 0.5))
+        assert slow.value.status_code == 504
+    finally:
+        pool.shutdown()
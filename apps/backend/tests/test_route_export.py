@@ -0,0 +1,61 @@
+import base64
+import json
+
+import main
+
+
+def export_page(client, process_type='optimized', **params):
+    """Status, routes and headers of one export page"""
+    response = client.get(f"/api/maps/routes/{process_type}/export", params=params)
+    routes = [json.loads(line) for line in response.text.splitlines()] if response.status_code == 200 else []
+    return response.status_code, routes, response.headers
+
+
+def test_pages_cover_every_route_once(client):
+    expected = client.get('/api/maps/routes/optimized').json()['routes']
+
+    routes, cursor = [], None
+    while True:
+        params = {'limit': 7} if cursor is None else {'limit': 7, 'cursor': cursor}
+        status, page, headers = export_page(client, **params)
+        assert status == 200
+        assert int(headers['x-total-routes']) == len(expected)
+        routes += page
+        cursor = headers.get('x-next-cursor')
+        if cursor is None:
+            break
+
+    assert routes == expected
+
+
+def test_filtered_pages_follow_their_filters(client):
+    agent_id = client.get('/api/maps/routes/optimized').json()['routes'][0]['agent_id']
+
+    status, first, headers = export_page(client, agent_id=agent_id, limit=1)
+    assert status == 200
+    status, rest, _ = export_page(client, agent_id=agent_id, cursor=headers['x-next-cursor'])
+    assert status == 200
+
+    _, unpaged, _ = export_page(client, agent_id=agent_id)
+    assert first + rest == unpaged
+    assert {route['agent_id'] for route in unpaged} == {agent_id}
+
+
+def test_cursor_is_bound_to_its_scenario_and_filters(client):
+    _, _, headers = export_page(client, limit=1)
+    cursor = headers['x-next-cursor']
+
+    assert export_page(client, 'manual', cursor=cursor)[0] == 400
+    assert export_page(client, cursor=cursor, day='fri')[0] == 400
+    assert export_page(client, cursor=cursor, agent_id='w_id_1')[0] == 400
+    assert export_page(client, cursor=cursor)[0] == 200
+
+
+def test_invalid_cursors_are_rejected(client, snapshot):
+    scope = main.route_cursor_scope('optimized', None, None)
+    negative = main.encode_route_cursor(snapshot, scope, -1)
+    other_dataset = base64.urlsafe_b64encode(f"{'0' * 16}:{scope}:1".encode()).decode()
+
+    assert export_page(client, cursor=negative)[0] == 400
+    assert export_page(client, cursor='not a cursor')[0] == 400
+    assert export_page(client, cursor=other_dataset)[0] == 410
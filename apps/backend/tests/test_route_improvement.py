@@ -0,0 +1,45 @@
+from collections import Counter
+
+import numpy as np
+
+import main
+
+
+def scenario_visits(snapshot, scenario_id):
+    """(agent id, store id) counts of a scenario's visits"""
+    visits = snapshot.scenarios.visits(scenario_id)
+    agent_ids = visits.to_frame()['worker_id']
+    return Counter(zip(agent_ids, visits.store_ids()))
+
+
+def test_improved_scenario_keeps_every_visit(client, snapshot):
+    response = client.post('/api/scenarios/optimized/improve', json={'time_budget_seconds': 0.5})
+    assert response.status_code == 200
+    result = response.json()
+
+    assert result['base_scenario'] == 'optimized'
+    assert result['unassigned_visits'] == []
+    cost_before = result['travel_minutes_before'] + main.ROUTE_LATE_MINUTE_PENALTY * result['late_minutes_before']
+    cost_after = result['travel_minutes_after'] + main.ROUTE_LATE_MINUTE_PENALTY * result['late_minutes_after']
+    assert cost_after <= cost_before
+    before, after = scenario_visits(snapshot, 'optimized'), scenario_visits(snapshot, result['scenario_id'])
+    assert sum(after.values()) == sum(before.values())
+    assert Counter(store_id for _, store_id in after.elements()) == Counter(store_id for _, store_id in before.elements())
+
+
+def test_excluded_agent_visits_move_or_are_reported(client, snapshot):
+    visits = snapshot.scenarios.visits('optimized')
+    agent_id = visits.agent_ids[np.bincount(visits.agent_codes[visits.agent_codes >= 0]).argmax()]
+
+    response = client.post('/api/scenarios/optimized/improve', json={'time_budget_seconds': 0.5, 'exclude_agents': [agent_id]})
+    assert response.status_code == 200
+    result = response.json()
+
+    before, after = scenario_visits(snapshot, 'optimized'), scenario_visits(snapshot, result['scenario_id'])
+    assert not any(agent == agent_id for agent, _ in after)
+    assert sum(after.values()) + len(result['unassigned_visits']) == sum(before.values())
+    assert all(visit['agent_id'] == agent_id for visit in result['unassigned_visits'])
+
+
+def test_improving_an_unknown_scenario_is_404(client):
+    assert client.post('/api/scenarios/unknown/improve', json={}).status_code == 404
@@ -0,0 +1,24 @@
+import os
+
+import main
+
+
+def read_data_file(filename):
+    with open(os.path.join(main.DATA_DIR, filename), 'rb') as f:
+        return f.read()
+
+
+def test_evicted_scenarios_are_not_served_from_the_response_cache(client, snapshot, monkeypatch):
+    monkeypatch.setattr(main, 'MAX_DERIVED_SCENARIOS', 1)
+    snapshot.scenarios.add_derived('evicted-first', read_data_file('manual_optimization.csv'))
+
+    cached = client.get('/api/coverage/top-stores', params={'scenario': 'evicted-first'})
+    assert cached.status_code == 200
+    assert client.get('/api/coverage/top-stores', params={'scenario': 'evicted-first'}).json() == cached.json()
+
+    snapshot.scenarios.add_derived('evicted-second', read_data_file('result.csv'))
+
+    assert client.get('/api/coverage/top-stores', params={'scenario': 'evicted-first'}).status_code == 404
+    assert client.get('/api/coverage/top-stores', params={'scenario': 'evicted-second'}).status_code == 200
+    scenario_ids = [scenario['scenario_id'] for scenario in client.get('/api/scenarios').json()['scenarios']]
+    assert 'evicted-first' not in scenario_ids and 'evicted-second' in scenario_ids
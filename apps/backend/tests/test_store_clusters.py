@@ -0,0 +1,19 @@
+def test_cluster_bounds_are_totals_of_their_stores(client, snapshot):
+    clusters = client.get('/api/maps/stores/clusters', params={'zoom': 0}).json()['clusters']
+    stores = snapshot.stores_df
+
+    assert sum(cluster['count'] for cluster in clusters) == len(stores)
+    assert sum(cluster['total_min_weekly_visits'] for cluster in clusters) == stores['min_weekly_visits'].sum()
+    assert sum(cluster['total_max_weekly_visits'] for cluster in clusters) == stores['max_weekly_visits'].sum()
+
+
+def test_single_store_clusters_carry_the_store_bounds(client, snapshot):
+    clusters = client.get('/api/maps/stores/clusters', params={'zoom': 20}).json()['clusters']
+    stores = snapshot.stores_df.drop_duplicates('id').set_index('id')
+
+    singles = [cluster for cluster in clusters if cluster['count'] == 1]
+    assert singles
+    for cluster in singles:
+        store = stores.loc[cluster['store_id']]
+        assert cluster['total_min_weekly_visits'] == store['min_weekly_visits']
+        assert cluster['total_max_weekly_visits'] == store['max_weekly_visits']
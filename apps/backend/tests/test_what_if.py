@@ -0,0 +1,84 @@
+import numpy as np
+
+import main
+
+
+def agent_visit_counts(snapshot, scenario_id):
+    """Visits of each agent id in a scenario"""
+    visits = snapshot.scenarios.visits(scenario_id)
+    agent_ids, counts = np.unique(visits.to_frame()['worker_id'].dropna().astype(str), return_counts=True)
+    return dict(zip(agent_ids.tolist(), counts.tolist()))
+
+
+def simulate(client, edits, scenario='optimized'):
+    response = client.post('/api/what-if', params={'after': scenario}, json={'edits': edits})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_reassigned_visits_move_between_agents(client, snapshot):
+    counts = agent_visit_counts(snapshot, 'optimized')
+    from_agent, to_agent = sorted(counts, key=counts.get)[-2:]
+
+    result = simulate(client, [{'type': 'reassign_visits', 'from_agent': from_agent, 'to_agent': to_agent}])
+
+    agents = {agent['agent_id']: agent for agent in result['agents']}
+    assert agents[from_agent]['visits_before'] == counts[from_agent]
+    assert agents[from_agent]['visits_after'] == 0
+    assert agents[to_agent]['visits_after'] == counts[from_agent] + counts[to_agent]
+    assert result['stores'] == [] and result['days'] == []
+
+
+def test_day_filters_accept_any_day_spelling(client, snapshot):
+    counts = agent_visit_counts(snapshot, 'optimized')
+    from_agent, to_agent = sorted(counts, key=counts.get)[-2:]
+    edits = lambda day: [{'type': 'reassign_visits', 'from_agent': from_agent, 'to_agent': to_agent, 'day': day}]
+
+    assert simulate(client, edits('Friday'))['agents'] == simulate(client, edits('fri'))['agents']
+    response = client.post('/api/what-if', params={'after': 'optimized'}, json={'edits': edits('Blursday')})
+    assert response.status_code == 400
+
+
+def test_dropped_store_visits_change_store_day_and_totals(client, snapshot):
+    store_visits = main.get_scenario_payloads(snapshot, 'optimized').aggregates.store_visits
+    store_code = int(np.argmax(store_visits))
+    store_id = str(snapshot.stores_df['id'].iloc[store_code])
+
+    result = simulate(client, [{'type': 'set_store_visits', 'store_id': store_id, 'min_weekly_visits': 0, 'max_weekly_visits': 0}])
+
+    [store] = result['stores']
+    assert store['store_id'] == store_id
+    assert (store['visits_before'], store['visits_after']) == (store_visits[store_code], 0)
+    assert sum(day['visits_before'] - day['visits_after'] for day in result['days']) == store_visits[store_code]
+    assert sum(agent['visits_before'] - agent['visits_after'] for agent in result['agents']) == store_visits[store_code]
+
+
+def test_deactivated_agent_without_reassignment_loses_its_visits(client, snapshot):
+    counts = agent_visit_counts(snapshot, 'optimized')
+    agent_id = max(counts, key=counts.get)
+
+    result = simulate(client, [{'type': 'deactivate_agent', 'agent_id': agent_id, 'reassign': False}])
+
+    [agent] = result['agents']
+    assert agent == {'agent_id': agent_id, 'active': False, 'visits_before': counts[agent_id], 'visits_after': 0}
+    assert result['unassigned_visits'] == 0
+
+
+def test_unknown_agents_and_stores_are_404(client):
+    assert client.post('/api/what-if', json={'edits': [{'type': 'deactivate_agent', 'agent_id': 'nobody'}]}).status_code == 404
+    assert client.post('/api/what-if', json={'edits': [{'type': 'set_store_visits', 'store_id': 'nowhere'}]}).status_code == 404
+
+
+def test_visit_deltas_touch_only_the_changed_cells(snapshot):
+    payloads = main.get_scenario_payloads(snapshot, 'optimized')
+    visits = payloads.route_index.visits
+    delta = main.VisitAggregatesDelta(payloads.aggregates)
+
+    delta.delete(visits, slice(0, 3))
+    assert sum(before - after for before, after in delta.changes('agent_visits').values()) == 3
+    assert delta.totals(snapshot.stores_df, payloads.totals).visits == payloads.totals.visits - 3
+    assert sum(len(cells) for cells in delta.cells.values()) <= 3 * len(main.VisitAggregates.COUNTERS)
+
+    delta.insert(visits, slice(0, 3))
+    assert delta.changes('agent_visits') == delta.changes('store_visits') == delta.changes('day_visits') == {}
+    assert delta.totals(snapshot.stores_df, payloads.totals) == payloads.totals
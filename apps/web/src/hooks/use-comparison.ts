@@ -37,26 +37,23 @@ export const useWeeklyDistribution = () => {
   });
 };
 
-// Combined comparison data hook
+// Combined comparison data hook: every before/after section in one request
 export const useComparisonData = () => {
-  const metricsQuery = useComparisonMetrics();
-  const agentPerformanceQuery = useAgentPerformanceComparison();
-  const storePerformanceQuery = useStorePerformanceComparison();
-  const weeklyDistributionQuery = useWeeklyDistribution();
+  const pageQuery = useQuery({
+    queryKey: ['pages', 'before-after'],
+    queryFn: () => apiService.getBeforeAfterPage(),
+    staleTime: 5 * 60 * 1000, // 5 minutes
+  });
 
   return {
-    metrics: metricsQuery.data,
-    agentPerformance: agentPerformanceQuery.data,
-    storePerformance: storePerformanceQuery.data,
-    weeklyDistribution: weeklyDistributionQuery.data,
-    isLoading: metricsQuery.isLoading || agentPerformanceQuery.isLoading || storePerformanceQuery.isLoading || weeklyDistributionQuery.isLoading,
-    isError: metricsQuery.isError || agentPerformanceQuery.isError || storePerformanceQuery.isError || weeklyDistributionQuery.isError,
-    error: metricsQuery.error || agentPerformanceQuery.error || storePerformanceQuery.error || weeklyDistributionQuery.error,
-    refetch: () => {
-      metricsQuery.refetch();
-      agentPerformanceQuery.refetch();
-      storePerformanceQuery.refetch();
-      weeklyDistributionQuery.refetch();
-    },
+    kpis: pageQuery.data?.kpis,
+    metrics: pageQuery.data?.metrics,
+    agentPerformance: pageQuery.data?.agent_performance,
+    storePerformance: pageQuery.data?.store_performance,
+    weeklyDistribution: pageQuery.data?.weekly_distribution,
+    isLoading: pageQuery.isLoading,
+    isError: pageQuery.isError,
+    error: pageQuery.error,
+    refetch: pageQuery.refetch,
   };
 }; 
\ No newline at end of file
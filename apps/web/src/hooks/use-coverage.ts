@@ -38,27 +38,21 @@ export const useVisitTimeDistribution = () => {
   });
 };
 
-// Combined hook for all coverage data
+// Combined hook for all coverage data, including the store table, in one request
 export const useCoverageData = () => {
-  const agentPerformanceQuery = useAgentPerformance();
-  const storeChainAnalysisQuery = useStoreChainAnalysis();
-  const visitTimeDistributionQuery = useVisitTimeDistribution();
+  const pageQuery = useQuery({
+    queryKey: ['pages', 'coverage'],
+    queryFn: () => apiService.getCoveragePage(),
+    staleTime: 5 * 60 * 1000,
+  });
 
   return {
-    agentPerformance: agentPerformanceQuery.data,
-    storeChainAnalysis: storeChainAnalysisQuery.data,
-    visitTimeDistribution: visitTimeDistributionQuery.data,
-    isLoading:
-      agentPerformanceQuery.isLoading ||
-      storeChainAnalysisQuery.isLoading ||
-      visitTimeDistributionQuery.isLoading,
-    isError:
-      agentPerformanceQuery.isError ||
-      storeChainAnalysisQuery.isError ||
-      visitTimeDistributionQuery.isError,
-    error:
-      agentPerformanceQuery.error ||
-      storeChainAnalysisQuery.error ||
-      visitTimeDistributionQuery.error,
+    agentPerformance: pageQuery.data?.agent_performance,
+    storeChainAnalysis: pageQuery.data?.store_chain_analysis,
+    visitTimeDistribution: pageQuery.data?.visit_time_distribution,
+    allStores: pageQuery.data?.all_stores,
+    isLoading: pageQuery.isLoading,
+    isError: pageQuery.isError,
+    error: pageQuery.error,
   };
 }; 
\ No newline at end of file
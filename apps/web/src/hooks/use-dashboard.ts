@@ -29,23 +29,23 @@ export const useStoreChainDistribution = () => {
   });
 };
 
-// Combined dashboard data hook
+// Combined dashboard data hook: every dashboard section in one request
 export const useDashboardData = () => {
-  const kpisQuery = useDashboardKPIs();
-  const efficiencyQuery = useEfficiencyComparison();
-  const chainDistributionQuery = useStoreChainDistribution();
+  const pageQuery = useQuery({
+    queryKey: ['pages', 'dashboard'],
+    queryFn: () => apiService.getDashboardPage(),
+    staleTime: 5 * 60 * 1000, // 5 minutes
+    refetchInterval: 30 * 1000, // Refetch every 30 seconds
+  });
 
   return {
-    kpis: kpisQuery.data,
-    efficiencyComparison: efficiencyQuery.data,
-    storeChainDistribution: chainDistributionQuery.data,
-    isLoading: kpisQuery.isLoading || efficiencyQuery.isLoading || chainDistributionQuery.isLoading,
-    isError: kpisQuery.isError || efficiencyQuery.isError || chainDistributionQuery.isError,
-    error: kpisQuery.error || efficiencyQuery.error || chainDistributionQuery.error,
-    refetch: () => {
-      kpisQuery.refetch();
-      efficiencyQuery.refetch();
-      chainDistributionQuery.refetch();
-    },
+    kpis: pageQuery.data?.kpis,
+    efficiencyComparison: pageQuery.data?.efficiency_comparison,
+    storeChainDistribution: pageQuery.data?.store_chain_distribution,
+    agentTimeDistribution: pageQuery.data?.agent_time_distribution,
+    isLoading: pageQuery.isLoading,
+    isError: pageQuery.isError,
+    error: pageQuery.error,
+    refetch: pageQuery.refetch,
   };
 }; 
\ No newline at end of file
@@ -234,6 +234,29 @@ export interface AgentTimeDistribution {
   distribution: TimeDistribution[];
 }
 
+// Page bundles: every section a page shows, in one response
+export interface DashboardPage {
+  kpis: KPIMetrics;
+  efficiency_comparison: EfficiencyComparison;
+  store_chain_distribution: StoreChainDistribution;
+  agent_time_distribution: AgentTimeDistribution;
+}
+
+export interface BeforeAfterPage {
+  kpis: KPIMetrics;
+  metrics: MetricsComparison;
+  agent_performance: AgentPerformanceComparison;
+  store_performance: StorePerformanceComparison;
+  weekly_distribution: WeeklyDistributionData;
+}
+
+export interface CoveragePage {
+  agent_performance: AgentCoverageData;
+  store_chain_analysis: StoreChainAnalysis;
+  visit_time_distribution: VisitTimeDistribution;
+  all_stores: AllStoresData;
+}
+
 // API Service class
 class ApiService {
   private baseUrl: string;
@@ -328,6 +351,19 @@ class ApiService {
     return this.request<AgentTimeDistribution>('/api/dashboard/agent-time-distribution');
   }
 
+  // Page bundle APIs
+  async getDashboardPage(): Promise<DashboardPage> {
+    return this.request<DashboardPage>('/api/pages/dashboard');
+  }
+
+  async getBeforeAfterPage(): Promise<BeforeAfterPage> {
+    return this.request<BeforeAfterPage>('/api/pages/before-after');
+  }
+
+  async getCoveragePage(): Promise<CoveragePage> {
+    return this.request<CoveragePage>('/api/pages/coverage');
+  }
+
   // Health check
   async getHealth(): Promise<{ status: string; message: string }> {
     return this.request<{ status: string; message: string }>('/health');
@@ -354,6 +390,11 @@ export const API_ENDPOINTS = {
     storeChainAnalysis: '/api/coverage/store-chain-analysis',
     visitTimeDistribution: '/api/coverage/visit-time-distribution',
   },
+  pages: {
+    dashboard: '/api/pages/dashboard',
+    beforeAfter: '/api/pages/before-after',
+    coverage: '/api/pages/coverage',
+  },
   maps: {
     stores: '/api/maps/stores',
     agents: '/api/maps/agents',
@@ -3,7 +3,6 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 
 import { TrendingUp, TrendingDown, Users, Clock, Target, AlertCircle } from 'lucide-react';
 import { useComparisonData } from '@/hooks/use-comparison';
-import { useDashboardData } from '@/hooks/use-dashboard';
 import { Skeleton } from '@/components/ui/skeleton';
 import { DataTableSimple } from '@/components/store-table/data-table-simple';
 import { columns } from '@/components/store-table/columns';
@@ -11,8 +10,7 @@ import { DataTable as AgentDataTable } from '@/components/agent-table/data-table
 import { columns as agentColumns } from '@/components/agent-table/columns';
 
 const BeforeAfter = () => {
-  const { metrics, agentPerformance, storePerformance, isLoading, isError, error } = useComparisonData();
-  const { kpis } = useDashboardData();
+  const { kpis, metrics, agentPerformance, storePerformance, isLoading, isError, error } = useComparisonData();
 
   const metricTranslations: { [key: string]: string } = {
     'Total Weekly Visits': 'Visitas Semanales Totales',
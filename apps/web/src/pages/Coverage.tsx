@@ -23,7 +23,6 @@ import { DataTable as CoverageChainDataTable } from '@/components/coverage-chain
 import { columns as coverageChainColumns } from '@/components/coverage-chain-table/columns';
 import { DataTable as StorePerformanceDataTable } from '@/components/store-performance-table/data-table';
 import { columns as storePerformanceColumns, StorePerformanceData } from '@/components/store-performance-table/columns';
-import { useAllStores } from '@/hooks/use-all-stores';
 
 const Coverage = () => {
   const [selectedChain, setSelectedChain] = useState<string | null>(null);
@@ -32,6 +31,7 @@ const Coverage = () => {
   const { 
     agentPerformance, 
     storeChainAnalysis, 
+    allStores: allStoresData,
     isLoading, 
     isError, 
     error 
@@ -49,11 +49,6 @@ const Coverage = () => {
     error: agentStoresError 
   } = useAgentStores(selectedAgent);
 
-  const { 
-    data: allStoresData, 
-    loading: isLoadingAllStores, 
-    error: allStoresError 
-  } = useAllStores();
 
 
 
@@ -159,26 +154,7 @@ const Coverage = () => {
           <p className="text-sm text-gray-600">Métricas de rendimiento para todas las tiendas del sistema</p>
         </CardHeader>
         <CardContent>
-          {isLoadingAllStores ? (
-            <div className="space-y-4">
-              <div className="flex gap-4">
-                <Skeleton className="h-10 w-64" />
-                <Skeleton className="h-10 w-48" />
-              </div>
-              <div className="space-y-2">
-                {Array.from({ length: 10 }).map((_, i) => (
-                  <Skeleton key={i} className="h-12 w-full" />
-                ))}
-              </div>
-            </div>
-          ) : allStoresError ? (
-            <div className="text-red-600 text-center py-8">
-              <AlertCircle className="w-5 h-5 mx-auto mb-2" />
-              Error al cargar las tiendas: {allStoresError}
-            </div>
-          ) : (
-            <StorePerformanceDataTable columns={storePerformanceColumns} data={storePerformanceTableData} />
-          )}
+          <StorePerformanceDataTable columns={storePerformanceColumns} data={storePerformanceTableData} />
         </CardContent>
       </Card>
 
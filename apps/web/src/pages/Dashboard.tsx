@@ -3,12 +3,10 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import { TrendingUp, Users, MapPin, DollarSign, Clock, Target, AlertCircle, Activity } from 'lucide-react';
 import { useDashboardData } from '@/hooks/use-dashboard';
-import { useAgentTimeDistribution } from '@/hooks/use-agent-time-distribution';
 import { Skeleton } from '@/components/ui/skeleton';
 
 const Dashboard = () => {
-  const { kpis, isLoading, isError, error } = useDashboardData();
-  const { data: timeDistributionData, loading: timeDistributionLoading, error: timeDistributionError } = useAgentTimeDistribution();
+  const { kpis, agentTimeDistribution: timeDistributionData, isLoading, isError, error } = useDashboardData();
 
   // Loading state
   if (isLoading) {
@@ -111,50 +109,32 @@ const Dashboard = () => {
           <p className="text-sm text-gray-600">Asignación optimizada del tiempo diario por agente</p>
         </CardHeader>
         <CardContent>
-          {timeDistributionLoading ? (
-            <div className="space-y-4">
-              <Skeleton className="h-64 w-full rounded-full" />
-              <div className="flex justify-center space-x-4">
-                {Array.from({ length: 3 }).map((_, i) => (
-                  <Skeleton key={i} className="h-4 w-32" />
+          <ResponsiveContainer width="100%" height={300}>
+            <PieChart>
+              <Pie
+                data={timeDistribution}
+                cx="50%"
+                cy="50%"
+                innerRadius={60}
+                outerRadius={120}
+                paddingAngle={5}
+                dataKey="value"
+              >
+                {timeDistribution.map((entry, index) => (
+                  <Cell key={`cell-${index}`} fill={entry.color} />
                 ))}
+              </Pie>
+              <Tooltip />
+            </PieChart>
+          </ResponsiveContainer>
+          <div className="flex justify-center space-x-4 mt-4">
+            {timeDistribution.map((item, index) => (
+              <div key={index} className="flex items-center">
+                <div className="w-3 h-3 rounded-full mr-2" style={{ backgroundColor: item.color }}></div>
+                <span className="text-sm text-gray-600">{item.name}: {item.value}%</span>
               </div>
-            </div>
-          ) : timeDistributionError ? (
-            <div className="text-red-600 text-center py-8">
-              <AlertCircle className="w-5 h-5 mx-auto mb-2" />
-              Error al cargar distribución de tiempo
-            </div>
-          ) : (
-            <>
-              <ResponsiveContainer width="100%" height={300}>
-                <PieChart>
-                  <Pie
-                    data={timeDistribution}
-                    cx="50%"
-                    cy="50%"
-                    innerRadius={60}
-                    outerRadius={120}
-                    paddingAngle={5}
-                    dataKey="value"
-                  >
-                    {timeDistribution.map((entry, index) => (
-                      <Cell key={`cell-${index}`} fill={entry.color} />
-                    ))}
-                  </Pie>
-                  <Tooltip />
-                </PieChart>
-              </ResponsiveContainer>
-              <div className="flex justify-center space-x-4 mt-4">
-                {timeDistribution.map((item, index) => (
-                  <div key={index} className="flex items-center">
-                    <div className="w-3 h-3 rounded-full mr-2" style={{ backgroundColor: item.color }}></div>
-                    <span className="text-sm text-gray-600">{item.name}: {item.value}%</span>
-                  </div>
-                ))}
-              </div>
-            </>
-          )}
+            ))}
+          </div>
         </CardContent>
       </Card>
     </div>